@@ -0,0 +1,111 @@
+"""Benchmark homology clustering on a synthetic ortholog graph.
+
+Compares the union-find engine in `geneweaver.aon.load.homology` with the clustering
+loop of the previous `geneweaver.aon.load.agr.load.add_homology`, run over the same
+in-memory edges so that only the clustering itself is measured.
+
+Usage:
+    python benchmarks/homology_clustering.py --genes 500000 --edges 3000000
+"""
+
+import argparse
+import random
+import time
+from typing import Dict, List, Tuple
+
+from geneweaver.aon.load.homology import HomologyClusters
+
+
+def synthetic_edges(
+    n_genes: int, n_edges: int, cluster_size: int, seed: int
+) -> List[Tuple[int, int, str]]:
+    """Build ortholog edges that mostly connect genes within small families.
+
+    :param n_genes: The number of genes.
+    :param n_edges: The number of ortholog edges.
+    :param cluster_size: The typical size of a gene family.
+    :param seed: The random seed.
+    :return: `(from_gene, to_gene, source)` tuples.
+    """
+    rng = random.Random(seed)
+    edges = []
+    for _ in range(n_edges):
+        from_gene = rng.randrange(n_genes)
+        family_start = from_gene - from_gene % cluster_size
+        if rng.random() < 0.001:
+            to_gene = rng.randrange(n_genes)
+        else:
+            to_gene = min(family_start + rng.randrange(cluster_size), n_genes - 1)
+        edges.append((from_gene + 1, to_gene + 1, "AGR"))
+    return edges
+
+
+def legacy_clusters(edges: List[Tuple[int, int, str]]) -> Dict[int, List[int]]:
+    """Cluster edges with the loop of the previous `add_homology` implementation.
+
+    :param edges: `(from_gene, to_gene, source)` tuples.
+    :return: The `hom_id -> genes` map it produced.
+    """
+    curr_hom_id = 0
+    existing_cluster_key = {}
+    homologs = {}
+    source_key = {}
+    for from_gene, to_gene, source in edges:
+        if from_gene in existing_cluster_key.keys():
+            hom_id = existing_cluster_key[from_gene]
+            homologs[hom_id].append(to_gene)
+            existing_cluster_key[to_gene] = curr_hom_id
+            source_key[to_gene] = source
+        if to_gene in existing_cluster_key.keys():
+            hom_id = existing_cluster_key[to_gene]
+            homologs[hom_id].append(from_gene)
+            existing_cluster_key[from_gene] = curr_hom_id
+            source_key[from_gene] = source
+        if (
+            to_gene not in existing_cluster_key.keys()
+            and from_gene not in existing_cluster_key.keys()
+        ):
+            curr_hom_id += 1
+            homologs[curr_hom_id] = [from_gene, to_gene]
+            existing_cluster_key[to_gene] = curr_hom_id
+            existing_cluster_key[from_gene] = curr_hom_id
+            source_key[to_gene] = source
+            source_key[from_gene] = source
+    return {hom_id: list(set(genes)) for hom_id, genes in homologs.items()}
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--genes", type=int, default=500000)
+    parser.add_argument("--edges", type=int, default=3000000)
+    parser.add_argument("--cluster-size", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    edges = synthetic_edges(args.genes, args.edges, args.cluster_size, args.seed)
+
+    start = time.perf_counter()
+    legacy = legacy_clusters(edges)
+    legacy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    clusters = HomologyClusters()
+    clusters.add_edges(edges)
+    rows = list(clusters.rows())
+    union_find_seconds = time.perf_counter() - start
+
+    legacy_rows = sum(len(genes) for genes in legacy.values())
+    print(f"edges: {len(edges)}")
+    print(
+        f"legacy:     {legacy_seconds:8.2f}s  {len(legacy)} clusters, "
+        f"{legacy_rows} rows (a gene can be in several clusters)"
+    )
+    print(
+        f"union-find: {union_find_seconds:8.2f}s  "
+        f"{len({r[0] for r in rows})} clusters, {len(rows)} rows"
+    )
+
+
+if __name__ == "__main__":
+    main()
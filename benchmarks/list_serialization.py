@@ -0,0 +1,114 @@
+"""Benchmark serializing a page of orthologs, as the list endpoints do.
+
+Compares loading model instances and rendering them with `jsonable_encoder` and
+`JSONResponse`, the previous path, with selecting the columns of
+`geneweaver.aon.service.rows.OrthologRow` and rendering them with `ORJSONResponse`.
+Both run on an in-memory SQLite table, with a fresh session per repetition, so the
+times include the query, the row building and the rendering.
+
+Usage:
+    python benchmarks/list_serialization.py --rows 100 1000 10000 --repeat 20
+"""
+
+import argparse
+import random
+import time
+from typing import Callable
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from geneweaver.aon.models import Ortholog
+from geneweaver.aon.service.rows import ORTHOLOG_COLUMNS, OrthologRow, to_rows
+from sqlalchemy import Engine, create_engine
+from sqlalchemy.orm import Session
+
+
+def synthetic_engine(n_rows: int, seed: int) -> Engine:
+    """Create an in-memory database of random orthologs.
+
+    :param n_rows: The number of orthologs.
+    :param seed: The random seed.
+    :return: The engine.
+    """
+    rng = random.Random(seed)
+    engine = create_engine("sqlite://")
+    Ortholog.__table__.create(engine)
+    with Session(engine) as session:
+        session.add_all(
+            Ortholog(
+                ort_id=i,
+                from_gene=rng.randrange(n_rows),
+                to_gene=rng.randrange(n_rows),
+                ort_is_best=rng.random() < 0.5,
+                ort_is_best_revised=rng.random() < 0.5,
+                ort_is_best_is_adjusted=rng.random() < 0.5,
+                ort_num_possible_match_algorithms=rng.randrange(1, 13),
+                ort_source_name="AGR",
+            )
+            for i in range(1, n_rows + 1)
+        )
+        session.commit()
+    return engine
+
+
+def model_page(engine: Engine) -> bytes:
+    """Render a page through model instances and `jsonable_encoder`.
+
+    :param engine: The engine.
+    :return: The response body.
+    """
+    with Session(engine) as session:
+        orthologs = session.query(Ortholog).order_by(Ortholog.ort_id).all()
+        return JSONResponse(jsonable_encoder(orthologs)).body
+
+
+def row_page(engine: Engine) -> bytes:
+    """Render a page through projected rows and orjson.
+
+    :param engine: The engine.
+    :return: The response body.
+    """
+    with Session(engine) as session:
+        query = session.query(Ortholog).order_by(Ortholog.ort_id)
+        orthologs = to_rows(OrthologRow, query.with_entities(*ORTHOLOG_COLUMNS))
+        return ORJSONResponse(orthologs).body
+
+
+def best_of(render: Callable[[Engine], bytes], engine: Engine, repeat: int) -> float:
+    """Time the fastest of several renders.
+
+    :param render: The render function.
+    :param engine: The engine.
+    :param repeat: The number of repetitions.
+    :return: The fastest time, in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render(engine)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8}  {'models':>10}  {'rows+orjson':>12}  {'speedup':>7}")
+    for n_rows in args.rows:
+        engine = synthetic_engine(n_rows, args.seed)
+        model_seconds = best_of(model_page, engine, args.repeat)
+        row_seconds = best_of(row_page, engine, args.repeat)
+        print(
+            f"{n_rows:>8}  {model_seconds * 1000:>8.2f}ms  "
+            f"{row_seconds * 1000:>10.2f}ms  {model_seconds / row_seconds:>6.1f}x"
+        )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
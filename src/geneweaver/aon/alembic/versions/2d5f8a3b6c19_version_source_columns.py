@@ -0,0 +1,38 @@
+"""Adds the content hash and source ETag to the shared schema_version table.
+
+This is the head of the `versions` branch, which migrates the shared `versions`
+schema on its own, see `gwaon setup version-table`. Run it before deploying code
+that reads these columns: every query on `schema_version` selects them.
+
+Revision ID: 2d5f8a3b6c19
+Revises: 4297df5638d7
+Create Date: 2024-05-06 10:41:27.503118
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "2d5f8a3b6c19"
+down_revision = "4297df5638d7"
+branch_labels = ("versions",)
+depends_on = None
+
+COLUMNS = ("content_hash", "source_etag")
+
+
+def upgrade() -> None:
+    """Add the content_hash and source_etag columns."""
+    for column_name in COLUMNS:
+        op.execute(
+            "ALTER TABLE versions.schema_version "
+            f"ADD COLUMN IF NOT EXISTS {column_name} VARCHAR"
+        )
+
+
+def downgrade() -> None:
+    """Remove the content_hash and source_etag columns."""
+    for column_name in COLUMNS:
+        op.execute(
+            f"ALTER TABLE versions.schema_version DROP COLUMN IF EXISTS {column_name}"
+        )
@@ -0,0 +1,67 @@
+"""Adds secondary indexes for the service read paths.
+
+Tenants loaded before this revision are upgraded with `gwaon setup tenant-schemas`.
+
+Revision ID: b8e4d1c9f27a
+Revises: 666568a64356
+Create Date: 2024-05-13 09:22:48.117402
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b8e4d1c9f27a"
+down_revision = "666568a64356"
+branch_labels = None
+depends_on = None
+
+# (table, name, columns), frozen as of this revision. Schemas created with deferred
+# constraints get the same indexes from `geneweaver.aon.load.constraints.INDEXES`.
+INDEXES = [
+    # get_orthologs by gene, optionally filtered to best/revised orthologs
+    (
+        "ort_ortholog",
+        "ix_ort_ortholog_from_gene_best",
+        ("from_gene", "ort_is_best", "ort_is_best_revised"),
+    ),
+    (
+        "ort_ortholog",
+        "ix_ort_ortholog_to_gene_best",
+        ("to_gene", "ort_is_best", "ort_is_best_revised"),
+    ),
+    # the algorithm join, from either side, answered from the index alone
+    (
+        "ora_ortholog_algorithms",
+        "ix_ora_ortholog_algorithms_ort_alg",
+        ("ort_id", "alg_id"),
+    ),
+    (
+        "ora_ortholog_algorithms",
+        "ix_ora_ortholog_algorithms_alg_ort",
+        ("alg_id", "ort_id"),
+    ),
+    # get_genes by species and prefix, and by prefix alone
+    ("gn_gene", "ix_gn_gene_sp_id_prefix", ("sp_id", "gn_prefix")),
+    ("gn_gene", "ix_gn_gene_prefix", ("gn_prefix",)),
+    # get_homologs by gene, and by species and source
+    ("hom_homology", "ix_hom_homology_gn_id", ("gn_id",)),
+    ("hom_homology", "ix_hom_homology_sp_id_source", ("sp_id", "hom_source_name")),
+]
+
+
+def upgrade() -> None:
+    """Create the read path indexes."""
+    for table, name, columns in INDEXES:
+        op.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ({", ".join(columns)})'
+        )
+
+
+def downgrade() -> None:
+    """Drop the read path indexes.
+
+    They may not exist if constraints were deferred and never built.
+    """
+    for _, name, _ in INDEXES:
+        op.execute(f'DROP INDEX IF EXISTS "{name}"')
@@ -0,0 +1,81 @@
+"""Creates the bulk loaded tables without constraints, when asked to.
+
+With `-x defer_constraints=true`, the bulk loaded tables (`gn_gene`,
+`ort_ortholog`, `ora_ortholog_algorithms` and `hom_homology`) are recreated, still
+empty, without primary keys, unique constraints, foreign keys or indexes. These are
+then built once the data is loaded, see `geneweaver.aon.load.constraints`. Without
+it, this revision does nothing.
+
+Revision ID: e3b7a915c2d4
+Revises: b8e4d1c9f27a
+Create Date: 2024-05-20 14:03:51.630285
+
+"""
+
+import sqlalchemy as sa
+from alembic import context, op
+
+# revision identifiers, used by Alembic.
+revision = "e3b7a915c2d4"
+down_revision = "b8e4d1c9f27a"
+branch_labels = None
+depends_on = None
+
+# In the order they can be dropped, referencing tables first.
+BULK_TABLES = ("ora_ortholog_algorithms", "hom_homology", "ort_ortholog", "gn_gene")
+
+
+def _defer_constraints() -> bool:
+    """Check if constraints on the bulk loaded tables should be deferred."""
+    x_arguments = context.get_x_argument(as_dictionary=True)
+    return x_arguments.get("defer_constraints", "false").lower() == "true"
+
+
+def upgrade() -> None:
+    """Recreate the bulk loaded tables bare, if constraints are deferred.
+
+    When using this function, you should specify a schema with:
+        `-x tenant=$SCHEMA_NAME`
+
+    Ids are identity columns so that they are still generated without a primary key.
+    """
+    if not _defer_constraints():
+        return
+    for table in BULK_TABLES:
+        op.drop_table(table)
+
+    op.create_table(
+        "gn_gene",
+        sa.Column("gn_id", sa.Integer(), sa.Identity(), nullable=False),
+        sa.Column("gn_ref_id", sa.String()),
+        sa.Column("gn_prefix", sa.String()),
+        sa.Column("sp_id", sa.Integer()),
+    )
+    op.create_table(
+        "ort_ortholog",
+        sa.Column("ort_id", sa.Integer(), sa.Identity(), nullable=False),
+        sa.Column("from_gene", sa.Integer()),
+        sa.Column("to_gene", sa.Integer()),
+        sa.Column("ort_is_best", sa.Boolean()),
+        sa.Column("ort_is_best_revised", sa.Boolean()),
+        sa.Column("ort_is_best_is_adjusted", sa.Boolean()),
+        sa.Column("ort_num_possible_match_algorithms", sa.Integer()),
+        sa.Column("ort_source_name", sa.VARCHAR()),
+    )
+    op.create_table(
+        "ora_ortholog_algorithms",
+        sa.Column("ora_id", sa.Integer(), sa.Identity(), nullable=False),
+        sa.Column("alg_id", sa.Integer()),
+        sa.Column("ort_id", sa.Integer()),
+    )
+    op.create_table(
+        "hom_homology",
+        sa.Column("hom_id", sa.Integer()),
+        sa.Column("gn_id", sa.Integer()),
+        sa.Column("sp_id", sa.Integer()),
+        sa.Column("hom_source_name", sa.VARCHAR()),
+    )
+
+
+def downgrade() -> None:
+    """Leave the tables in place, they are removed by revision 666568a64356."""
@@ -1,17 +1,21 @@
 """The root of the GeneWeaver AON API."""
 
-from fastapi import APIRouter, Depends, FastAPI
+from fastapi import APIRouter, Depends, FastAPI, Request
+from fastapi.responses import JSONResponse
 from geneweaver.aon import __version__
 from geneweaver.aon import dependencies as deps
 from geneweaver.aon.controller import (
     algorithms,
+    export,
     genes,
     homologs,
     orthologs,
     species,
     versions,
 )
+from geneweaver.aon.core.cache import ResponseCache, ResponseCacheMiddleware
 from geneweaver.aon.core.config import config
+from geneweaver.aon.service.utils import InvalidCursorError
 
 app = FastAPI(
     title="GeneWeaver AON API",
@@ -23,6 +27,24 @@ app = FastAPI(
     prefix=config.API_PREFIX,
 )
 
+if config.RESPONSE_CACHE_ENABLED:
+    app.add_middleware(
+        ResponseCacheMiddleware,
+        cache=ResponseCache(config.RESPONSE_CACHE_MAX_BYTES),
+        api_prefix=config.API_PREFIX,
+        code_version=__version__,
+        max_age=config.RESPONSE_CACHE_MAX_AGE,
+    )
+
+
+@app.exception_handler(InvalidCursorError)
+async def invalid_cursor_handler(
+    request: Request, exc: InvalidCursorError
+) -> JSONResponse:
+    """Respond to an invalid paging cursor with a 400 error."""
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
+
+
 app.include_router(versions.router, prefix=config.API_PREFIX, tags=["versions"])
 
 api_router = APIRouter()
@@ -32,6 +54,7 @@ api_router.include_router(species.router, tags=["species"])
 api_router.include_router(genes.router, tags=["genes"])
 api_router.include_router(orthologs.router, tags=["orthologs"])
 api_router.include_router(homologs.router, tags=["homologs"])
+api_router.include_router(export.router, tags=["export"])
 
 versioned_api_router = APIRouter(tags=["versioned"])
 versioned_api_router.include_router(
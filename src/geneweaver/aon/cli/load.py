@@ -2,7 +2,6 @@
 
 from argparse import Namespace
 from datetime import datetime
-from gzip import BadGzipFile
 from pathlib import Path
 from typing import Optional, Tuple
 
@@ -17,16 +16,45 @@ from geneweaver.aon.core.schema_version import (
     mark_schema_version_load_complete,
     set_up_sessionmanager,
 )
+from geneweaver.aon.embedded.snapshot import snapshot_path
+from geneweaver.aon.enum import HomologyBackend, LoadBackend
 from geneweaver.aon.load import agr, geneweaver
+from geneweaver.aon.load import constraints as constraints_module
+from geneweaver.aon.load import homology as homology_module
 from geneweaver.aon.models import Version
+from geneweaver.aon.service import snapshot as snapshot_module
 from rich.progress import Progress
+from sqlalchemy.orm import Session
 
 cli = typer.Typer(no_args_is_help=True, rich_markup_mode="rich")
 
 
 @cli.command()
-def get_data(release: Optional[str] = None) -> Tuple[str, str]:
-    """Get the latest Alliance of Genome Resources data."""
+def get_release(release: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """Find the Alliance of Genome Resources release without downloading it.
+
+    :param release: The release, defaults to the latest release.
+    :return: The release and the ETag of its orthology file.
+    """
+    if release is None:
+        release = agr.sources.latest_agr_release()
+    remote_file = agr.sources.find_agr_orthology_file(release)
+    typer.echo(f"Release: {release}, ETag: {remote_file.etag}")
+    return release, remote_file.etag
+
+
+@cli.command()
+def get_data(
+    release: Optional[str] = None, unzip: Optional[bool] = None
+) -> Tuple[str, str, str]:
+    """Get the latest Alliance of Genome Resources data.
+
+    Unless `--unzip` is given (or `AGR_UNZIP` is set), the compressed file is kept
+    as is and read directly by the loader.
+
+    :return: The orthology file, the release and the SHA-256 of the download.
+    """
+    unzip = config.AGR_UNZIP if unzip is None else unzip
     download_msg = "Downloading Alliance of Genome Resources data: "
     with Progress(transient=True) as progress:
         download = progress.add_task(download_msg + "Determining version", total=None)
@@ -34,52 +62,116 @@ def get_data(release: Optional[str] = None) -> Tuple[str, str]:
             release = agr.sources.latest_agr_release()
 
         progress.update(download, description=download_msg + f"Release: {release}")
-        data_increment = 28
-        still_downloading = True
-        while still_downloading:
-            try:
-                url = agr.sources.format_agr_orthology_download_url(
-                    release, data_increment
-                )
+        progress.update(download, description=download_msg + "Finding Data File")
+        remote_file = agr.sources.find_agr_orthology_file(release)
 
-                progress.update(download, description=download_msg + "Downloading Data")
+        progress.update(download, description=download_msg + "Downloading Data")
+        orthology_file = agr.sources.fetch_agr_orthology_data(
+            remote_file, config.AGR_CACHE_DIR
+        )
+        content_hash = agr.sources.read_checksum(orthology_file)
 
-                zipped_file = agr.sources.download_agr_orthology_data(url)
-                progress.update(download, description=download_msg + "Unzipping Data")
+        if unzip:
+            progress.update(download, description=download_msg + "Unzipping Data")
+            orthology_file = agr.sources.unzip_file(orthology_file)
 
-                orthology_file = agr.sources.unzip_file(zipped_file)
-            except BadGzipFile as e:
-                progress.update(download, description=download_msg + f"Error: {e}")
-                data_increment = data_increment - 1
-                if data_increment < 0:
-                    raise e
-                continue
-            still_downloading = False
         progress.update(download, completed=True, description=download_msg + "Complete")
 
     orthology_file = Path(orthology_file).resolve()
 
     typer.echo(orthology_file)
-    return str(orthology_file), release
+    return str(orthology_file), release, content_hash
+
+
+def _loaded_version(
+    db: Session, release: str, etag: Optional[str], content_hash: Optional[str]
+) -> Tuple[Optional[Version], bool]:
+    """Find the version of a release that was loaded from the same file.
+
+    If a content hash is given it is compared with the recorded one, otherwise an
+    ETag is compared with the recorded ETag. Versions loaded before these were
+    recorded always match.
+
+    :param db: A session on the AON database.
+    :param release: The AGR release version.
+    :param etag: The ETag of the release's orthology file.
+    :param content_hash: The SHA-256 of the release's orthology file.
+    :return: The matching version, if any, and whether the release has any version.
+    """
+    versions = db.query(Version).filter(Version.agr_version == release).all()
+
+    if content_hash is not None:
+        versions_with_content = [
+            v for v in versions if v.content_hash in (None, content_hash)
+        ]
+    elif etag is not None:
+        versions_with_content = [v for v in versions if v.source_etag in (None, etag)]
+    else:
+        versions_with_content = versions
+    return next(iter(versions_with_content), None), bool(versions)
 
 
 @cli.command()
-def agr_release_exists(release: str) -> bool:
-    """Check if the Alliance of Genome Resources release exists."""
-    db = SessionLocal()
-    version = db.query(Version).filter(Version.agr_version == release).first()
-    db.close()
+def agr_release_exists(
+    release: str, etag: Optional[str] = None, content_hash: Optional[str] = None
+) -> bool:
+    """Check if the Alliance of Genome Resources release exists.
+
+    A release is only considered loaded if its file has not been re-published since,
+    see `_loaded_version`. This only reads the versions table.
+
+    :param release: The AGR release version.
+    :param etag: The ETag of the release's orthology file.
+    :param content_hash: The SHA-256 of the release's orthology file.
+    :return: True if the release, with this content, is already in the database.
+    """
+    with SessionLocal() as db:
+        version, release_loaded = _loaded_version(db, release, etag, content_hash)
+
     if version:
         print(f"Release {release} exists in the database.")
         return True
+    elif release_loaded:
+        print(f"Release {release} has been re-published since it was loaded.")
+        return False
     else:
         print(f"Release {release} does not exist in the database.")
         return False
 
 
 @cli.command()
-def create_schema(release: str) -> Tuple[str, int]:
-    """Create the database schema."""
+def create_schema(
+    release: str,
+    content_hash: Optional[str] = None,
+    etag: Optional[str] = None,
+    defer_constraints: Optional[bool] = None,
+) -> Optional[Tuple[str, int]]:
+    """Create the database schema.
+
+    Nothing is created if the release is already loaded from the same file. If the
+    file was re-published with the same content, its new ETag is recorded on the
+    loaded version, so that the next check does not download it again.
+
+    :param release: The AGR release version.
+    :param content_hash: The SHA-256 of the orthology file that will be loaded.
+    :param etag: The ETag of the orthology file that will be loaded.
+    :param defer_constraints: Create the bulk loaded tables without constraints,
+        to be built by `constraints` after the load, defaults to
+        `config.LOAD_DEFER_CONSTRAINTS`.
+    :return: The schema name and id, or None if the release already exists.
+    """
+    if defer_constraints is None:
+        defer_constraints = config.LOAD_DEFER_CONSTRAINTS
+
+    with SessionLocal() as db:
+        version, _ = _loaded_version(db, release, etag, content_hash)
+        if version is not None:
+            if etag is not None and version.source_etag != etag:
+                version.source_etag = etag
+                db.commit()
+            print(f"Release {release} already exists.")
+            return None
+
     with Progress() as progress:
         db_creation_msg = "Creating database schema"
         progress.add_task(db_creation_msg, total=None)
@@ -92,20 +184,24 @@ def create_schema(release: str) -> Tuple[str, int]:
         script_location = (Path(__file__).parent.parent / "alembic").resolve()
         alembic_cfg = Config(
             file_=str(script_location / "alembic.ini"),
-            cmd_opts=Namespace(x=[f"tenant={schema_name}"]),
+            cmd_opts=Namespace(
+                x=[
+                    f"tenant={schema_name}",
+                    f"defer_constraints={str(defer_constraints).lower()}",
+                ]
+            ),
         )
         alembic_cfg.set_main_option("script_location", str(script_location))
         alembic_cfg.set_main_option("sqlalchemy.url", config.DB.URI)
-        command.upgrade(alembic_cfg, "head")
-
-        if agr_release_exists(release):
-            raise typer.Exit("Release already exists")
+        command.upgrade(alembic_cfg, "heads")
 
         db = SessionLocal()
         version = Version(
             schema_name=schema_name,
             agr_version=release,
             load_complete=False,
+            content_hash=content_hash,
+            source_etag=etag,
         )
         db.add(version)
         db.commit()
@@ -117,38 +213,59 @@ def create_schema(release: str) -> Tuple[str, int]:
         return schema_name, schema_id
 
 
-def load_agr(orthology_file: str, schema_id: int) -> bool:
+def load_agr(
+    orthology_file: str, schema_id: int, backend: Optional[LoadBackend] = None
+) -> bool:
     """Load the Alliance of Genome Resources data.
 
     :param orthology_file: The path to the orthology file.
     :param schema_id: The schema id.
+    :param backend: How to write orthologs, defaults to `config.LOAD_BACKEND`.
     """
+    backend = config.LOAD_BACKEND if backend is None else backend
     version = get_schema_version(schema_id)
     schema_name = version.schema_name
     session, _ = set_up_sessionmanager(version)
 
     with Progress() as progress:
         db_load_msg = "Loading AGR data into the database: "
-        db_load = progress.add_task(db_load_msg + "Adding Species", total=1000)
+        db_load = progress.add_task(db_load_msg + "Parsing File", total=1000)
+
+        orthology = agr.parse.parse_orthology_file(orthology_file)
+        progress.update(db_load, advance=5, description=db_load_msg + "Adding Species")
 
         db = session()
 
-        agr.load.init_species(db, orthology_file, schema_name)
+        agr.load.init_species(db, orthology, schema_name)
         progress.update(
             db_load, advance=5, description=db_load_msg + "Adding Algorithms"
         )
 
-        agr.load.add_algorithms(db, orthology_file)
+        agr.load.add_algorithms(db, orthology)
         progress.update(db_load, advance=5, description=db_load_msg + "Adding Genes")
 
-        agr.load.add_genes(db, orthology_file)
+        agr.load.add_genes(db, orthology)
         progress.update(
             db_load, advance=5, description=db_load_msg + "Adding Orthologs"
         )
 
-        for batch in agr.load.get_ortholog_batches(orthology_file, 10000):
-            agr.load.add_ortholog_batch(db, batch)
-            progress.update(db_load, advance=10)
+        if backend == LoadBackend.COPY:
+            with psycopg.connect(
+                config.DB.URI.replace("postgresql+psycopg", "postgresql")
+            ) as connection:
+                resolver = agr.resolve.IdResolver.from_connection(
+                    connection, schema_name, orthology.genes
+                )
+                for batch in agr.load.get_ortholog_batches(orthology, 100000):
+                    agr.bulk.copy_ortholog_batch(
+                        connection, schema_name, batch, resolver
+                    )
+                    progress.update(db_load, advance=100)
+        else:
+            resolver = agr.resolve.IdResolver.from_session(db, orthology.genes)
+            for batch in agr.load.get_ortholog_batches(orthology, 10000):
+                agr.load.add_ortholog_batch(db, batch, resolver)
+                progress.update(db_load, advance=10)
 
         progress.console.print("AGR data loaded.")
 
@@ -162,20 +279,29 @@ def complete(
     release: Optional[str] = None,
     orthology_file: Optional[Path] = None,
     schema_id: Optional[int] = None,
+    backend: LoadBackend = config.LOAD_BACKEND,
 ) -> None:
     """Load the Alliance of Genome Resources data."""
+    content_hash = None
     if orthology_file is None:
-        orthology_file, release = get_data(release)
+        orthology_file, release, content_hash = get_data(release)
 
     if not schema_id:
-        schema_name, schema_id = create_schema(release)
+        created = create_schema(release, content_hash)
+        if created is None:
+            return
+        schema_name, schema_id = created
 
-    load_agr(orthology_file, schema_id)
+    load_agr(orthology_file, schema_id, backend)
 
     gw(schema_id)
 
     homology(schema_id)
 
+    constraints(schema_id)
+
+    snapshot(schema_id)
+
     mark_schema_version_load_complete(schema_id)
 
 
@@ -225,29 +351,109 @@ def gw(schema_id: int) -> bool:
 
 
 @cli.command()
-def homology(schema_id: int) -> bool:
+def homology(schema_id: int, backend: Optional[HomologyBackend] = None) -> bool:
     """Load homology data into the AON database.
 
     :param schema_id: The schema id.
+    :param backend: Where to compute the clusters, in Python or in the database,
+        defaults to `config.HOMOLOGY_BACKEND`.
     :return: True if successful.
     """
+    backend = config.HOMOLOGY_BACKEND if backend is None else backend
     version = get_schema_version(schema_id)
-    session, _ = set_up_sessionmanager(version)
 
     with Progress() as progress:
         db_load_msg = "Loading data into the database: "
         db_load = progress.add_task(db_load_msg + "Connecting...", total=None)
 
-        db = session()
+        with psycopg.connect(
+            config.DB.URI.replace("postgresql+psycopg", "postgresql")
+        ) as connection:
+            progress.update(
+                db_load, completed=True, description=db_load_msg + "Loading Homology"
+            )
 
-        progress.update(
-            db_load, completed=True, description=db_load_msg + "Loading Homology"
+            if backend == HomologyBackend.SQL:
+                homology_module.add_homology_in_database(
+                    connection, version.schema_name
+                )
+            else:
+                homology_module.add_homology(connection, version.schema_name)
+
+        progress.update(db_load, completed=True, description=db_load_msg + "Complete")
+
+    return True
+
+
+@cli.command()
+def constraints(schema_id: int, parallelism: Optional[int] = None) -> bool:
+    """Build the constraints and indexes of a loaded schema, then analyze it.
+
+    Safe to run more than once, only missing constraints and indexes are built.
+
+    :param schema_id: The schema id.
+    :param parallelism: The number of concurrent connections, defaults to
+        `config.CONSTRAINT_BUILD_PARALLELISM`.
+    :return: True if successful.
+    """
+    parallelism = (
+        config.CONSTRAINT_BUILD_PARALLELISM if parallelism is None else parallelism
+    )
+    version = get_schema_version(schema_id)
+
+    def connect() -> psycopg.Connection:
+        return psycopg.connect(
+            config.DB.URI.replace("postgresql+psycopg", "postgresql"), autocommit=True
         )
 
-        agr.load.add_homology(db)
+    with Progress() as progress:
+        db_load_msg = "Building constraints: "
+        db_load = progress.add_task(db_load_msg + version.schema_name, total=None)
 
-        progress.update(db_load, completed=True, description=db_load_msg + "Complete")
+        built = constraints_module.build_constraints(
+            connect, version.schema_name, parallelism
+        )
 
-        db.close()
+        progress.update(
+            db_load,
+            completed=True,
+            description=db_load_msg + f"Complete, built {len(built)}",
+        )
 
     return True
+
+
+@cli.command()
+def snapshot(schema_id: int, path: Optional[Path] = None) -> Optional[Path]:
+    """Write the snapshot file of a loaded schema version.
+
+    API workers map the snapshot into memory, rather than each reading the
+    version's orthologs from the database.
+
+    :param schema_id: The schema id.
+    :param path: Where to write the snapshot, defaults to a file in
+        `config.SNAPSHOT_DIR`.
+    :return: The snapshot path, or None if there is nowhere to write it.
+    """
+    version = get_schema_version(schema_id)
+    if path is None:
+        if config.SNAPSHOT_DIR is None:
+            typer.echo("SNAPSHOT_DIR is not set, not writing a snapshot.")
+            return None
+        path = snapshot_path(config.SNAPSHOT_DIR, version.schema_name)
+
+    session, _ = set_up_sessionmanager(version)
+    with Progress() as progress:
+        snapshot_msg = "Writing snapshot: "
+        write = progress.add_task(snapshot_msg + str(path), total=None)
+
+        with session() as db:
+            size = snapshot_module.create_snapshot(db, version.id, path)
+
+        progress.update(
+            write,
+            completed=True,
+            description=snapshot_msg + f"Complete, {size} bytes",
+        )
+
+    return path
@@ -1,11 +1,15 @@
 """CLI to load the database."""
 
+from argparse import Namespace
 from pathlib import Path
+from typing import List, Optional
 
 import typer
 from alembic import command
 from alembic.config import Config
 from geneweaver.aon.core.config import config
+from geneweaver.aon.core.database import SessionLocal
+from geneweaver.aon.models import Version
 from rich.progress import Progress
 
 cli = typer.Typer(no_args_is_help=True, rich_markup_mode="rich")
@@ -13,7 +17,11 @@ cli = typer.Typer(no_args_is_help=True, rich_markup_mode="rich")
 
 @cli.command()
 def version_table() -> bool:
-    """Create the database schema."""
+    """Create or upgrade the shared versions table.
+
+    Run this before deploying a new version of the service, the models read every
+    column of the table.
+    """
     with Progress() as progress:
         db_creation_msg = "Creating database versions table"
         progress.add_task(db_creation_msg, total=None)
@@ -24,6 +32,39 @@ def version_table() -> bool:
         )
         alembic_cfg.set_main_option("script_location", str(script_location))
         alembic_cfg.set_main_option("sqlalchemy.url", config.DB.URI)
-        command.upgrade(alembic_cfg, "4297df5638d7")
+        command.upgrade(alembic_cfg, "versions@head")
 
     return True
+
+
+@cli.command()
+def tenant_schemas(schema_names: Optional[List[str]] = None) -> List[str]:
+    """Upgrade loaded tenant schemas to the latest tenant migrations.
+
+    Tenant schemas are only migrated when they are created, so run this after
+    deploying a version that adds a tenant migration, such as the read path indexes
+    of revision b8e4d1c9f27a. Schemas already at the latest revision are unchanged.
+
+    :param schema_names: The schemas to upgrade, defaults to every loaded version.
+    :return: The upgraded schema names.
+    """
+    if not schema_names:
+        with SessionLocal() as db:
+            schema_names = [
+                v.schema_name for v in db.query(Version).order_by(Version.id)
+            ]
+
+    script_location = (Path(__file__).parent.parent / "alembic").resolve()
+    with Progress() as progress:
+        upgrade = progress.add_task("Upgrading tenant schemas", total=len(schema_names))
+        for schema_name in schema_names:
+            alembic_cfg = Config(
+                file_=str(script_location / "alembic.ini"),
+                cmd_opts=Namespace(x=[f"tenant={schema_name}"]),
+            )
+            alembic_cfg.set_main_option("script_location", str(script_location))
+            alembic_cfg.set_main_option("sqlalchemy.url", config.DB.URI)
+            command.upgrade(alembic_cfg, "heads")
+            progress.update(upgrade, advance=1)
+
+    return schema_names
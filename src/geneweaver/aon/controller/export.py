@@ -0,0 +1,115 @@
+"""API endpoints for bulk exports of a schema version."""
+
+from functools import partial
+from typing import Callable, Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from geneweaver.aon import dependencies as deps
+from geneweaver.aon.enum import ExportFormat
+from geneweaver.aon.models import Gene, Homology, Ortholog
+from geneweaver.aon.service import export as export_service
+from geneweaver.aon.service import genes as genes_service
+from geneweaver.aon.service import homologs as homologs_service
+from geneweaver.aon.service import orthologs as orthologs_service
+from sqlalchemy import Select
+
+router = APIRouter(prefix="/export", tags=["export"])
+
+ORTHOLOG_COLUMNS = (
+    Ortholog.ort_id,
+    Ortholog.from_gene,
+    Ortholog.to_gene,
+    Ortholog.ort_is_best,
+    Ortholog.ort_is_best_revised,
+    Ortholog.ort_is_best_is_adjusted,
+    Ortholog.ort_num_possible_match_algorithms,
+    Ortholog.ort_source_name,
+)
+HOMOLOG_COLUMNS = (
+    Homology.hom_id,
+    Homology.gn_id,
+    Homology.sp_id,
+    Homology.hom_source_name,
+)
+GENE_COLUMNS = (Gene.gn_id, Gene.gn_ref_id, Gene.gn_prefix, Gene.sp_id)
+
+
+def _export_response(
+    session_manager: deps.sessionmaker,
+    build_query: Callable[[], Select],
+    columns: tuple,
+    export_format: ExportFormat,
+    name: str,
+) -> StreamingResponse:
+    """Stream a query as a file download."""
+    filename = f"{name}.{export_format.value}"
+    return StreamingResponse(
+        export_service.export_query(
+            session_manager, build_query, columns, export_format
+        ),
+        media_type=export_service.MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/orthologs")
+def export_orthologs(
+    from_species: Optional[int] = None,
+    to_species: Optional[int] = None,
+    from_gene_id: Optional[int] = None,
+    to_gene_id: Optional[int] = None,
+    algorithm_id: Optional[int] = deps.DEFAULT_ALGORITHM_ID,
+    best: Optional[bool] = None,
+    revised: Optional[bool] = None,
+    export_format: ExportFormat = ExportFormat.NDJSON,
+    session_manager: deps.sessionmaker = Depends(deps.session_manager),
+):
+    """Export all orthologs matching the filters."""
+    query = partial(
+        orthologs_service.orthologs_query,
+        from_species=from_species,
+        to_species=to_species,
+        from_gene_id=from_gene_id,
+        to_gene_id=to_gene_id,
+        algorithm_id=algorithm_id,
+        best=best,
+        revised=revised,
+    )
+    return _export_response(
+        session_manager, query, ORTHOLOG_COLUMNS, export_format, "orthologs"
+    )
+
+
+@router.get("/homologs")
+def export_homologs(
+    source_name: Optional[str] = None,
+    species_id: Optional[int] = None,
+    gene_id: Optional[int] = None,
+    export_format: ExportFormat = ExportFormat.NDJSON,
+    session_manager: deps.sessionmaker = Depends(deps.session_manager),
+):
+    """Export all homologs matching the filters."""
+    query = partial(
+        homologs_service.homologs_query,
+        source_name=source_name,
+        species_id=species_id,
+        gene_id=gene_id,
+    )
+    return _export_response(
+        session_manager, query, HOMOLOG_COLUMNS, export_format, "homologs"
+    )
+
+
+@router.get("/genes")
+def export_genes(
+    species_id: Optional[int] = None,
+    prefix: Optional[str] = None,
+    export_format: ExportFormat = ExportFormat.NDJSON,
+    session_manager: deps.sessionmaker = Depends(deps.session_manager),
+):
+    """Export all genes matching the filters."""
+    query = partial(genes_service.genes_query, species_id=species_id, prefix=prefix)
+    return _export_response(
+        session_manager, query, GENE_COLUMNS, export_format, "genes"
+    )
@@ -1,27 +1,55 @@
 """Controller definitions for the Genes API."""
 
-from typing import Optional
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
+from fastapi.responses import ORJSONResponse
 from geneweaver.aon import dependencies as deps
 from geneweaver.aon.enum import ReferenceGeneIDType
 from geneweaver.aon.service import convert as convert_service
 from geneweaver.aon.service import genes as genes_service
+from geneweaver.aon.service.rows import GeneRow
 
 router = APIRouter(prefix="/genes")
 
 
-@router.get("")
-def get_genes(
+async def _genes_parameters(
     species_id: Optional[int] = None,
     prefix: Optional[str] = None,
     paging_params: dict = Depends(deps.paging_parameters),
+) -> dict:
+    """Get the filters and paging parameters of a genes query."""
+    return {"species_id": species_id, "prefix": prefix, **paging_params}
+
+
+def _genes_response(genes: List[GeneRow], params: dict) -> Response:
+    """Build the response to a genes query."""
+    return deps.page_response(genes, genes_service.PAGING_KEYS, params["limit"])
+
+
+def get_genes(
+    params: dict = Depends(_genes_parameters),
     db: deps.Session = Depends(deps.session),
 ):
     """Get all genes."""
-    return genes_service.get_genes(
-        db, species_id=species_id, prefix=prefix, **paging_params
-    )
+    return _genes_response(genes_service.get_genes(db, **params), params)
+
+
+async def get_genes_async(
+    params: dict = Depends(_genes_parameters),
+    db: deps.AsyncSession = Depends(deps.async_session),
+):
+    """Get all genes."""
+    return _genes_response(await genes_service.get_genes_async(db, **params), params)
+
+
+router.add_api_route(
+    "",
+    get_genes_async if deps.DB_ASYNC else get_genes,
+    methods=["GET"],
+    name="get_genes",
+    response_class=ORJSONResponse,
+)
 
 
 @router.get("/prefixes")
@@ -30,13 +58,26 @@ def get_gene_prefixes(db: deps.Session = Depends(deps.session)):
     return genes_service.gene_prefixes(db)
 
 
-@router.get("/{gene_id}")
 def get_gene(gene_id: int, db: deps.Session = Depends(deps.session)):
     """Get gene by id."""
     return genes_service.gene_by_id(db, gene_id)
 
 
-@router.get("/by-ref-id/{ref_id}")
+async def get_gene_async(
+    gene_id: int, db: deps.AsyncSession = Depends(deps.async_session)
+):
+    """Get gene by id."""
+    return await genes_service.gene_by_id_async(db, gene_id)
+
+
+router.add_api_route(
+    "/{gene_id}",
+    get_gene_async if deps.DB_ASYNC else get_gene,
+    methods=["GET"],
+    name="get_gene",
+)
+
+
 def get_gene_by_ref_id(
     ref_id: str,
     ref_id_type: ReferenceGeneIDType = ReferenceGeneIDType.AON,
@@ -46,3 +87,22 @@ def get_gene_by_ref_id(
     if ref_id_type == ReferenceGeneIDType.GW:
         ref_id = convert_service.ode_ref_to_agr(db, ref_id)
     return genes_service.gene_by_ref_id(db, ref_id)
+
+
+async def get_gene_by_ref_id_async(
+    ref_id: str,
+    ref_id_type: ReferenceGeneIDType = ReferenceGeneIDType.AON,
+    db: deps.AsyncSession = Depends(deps.async_session),
+):
+    """Get gene by reference id."""
+    if ref_id_type == ReferenceGeneIDType.GW:
+        ref_id = await convert_service.ode_ref_to_agr_async(db, ref_id)
+    return await genes_service.gene_by_ref_id_async(db, ref_id)
+
+
+router.add_api_route(
+    "/by-ref-id/{ref_id}",
+    get_gene_by_ref_id_async if deps.DB_ASYNC else get_gene_by_ref_id,
+    methods=["GET"],
+    name="get_gene_by_ref_id",
+)
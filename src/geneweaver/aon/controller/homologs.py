@@ -1,31 +1,63 @@
 """Controller definition for the homologs API."""
 
-from typing import Optional
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import ORJSONResponse
 from geneweaver.aon import dependencies as deps
 from geneweaver.aon.service import homologs as homologs_service
+from geneweaver.aon.service.rows import HomologRow
 
 router = APIRouter(prefix="/homologs", tags=["homologs"])
 
 
-@router.get("/")
-def get_homologs(
+async def _homologs_parameters(
     source_name: Optional[str] = None,
     species_id: Optional[int] = None,
     gene_id: Optional[int] = None,
     paging: dict = Depends(deps.paging_parameters),
+) -> dict:
+    """Get the filters and paging parameters of a homologs query."""
+    return {
+        "source_name": source_name,
+        "species_id": species_id,
+        "gene_id": gene_id,
+        **paging,
+    }
+
+
+def _homologs_response(homologs: List[HomologRow], params: dict) -> Response:
+    """Build the response to a homologs query."""
+    if not homologs:
+        raise HTTPException(404, detail="Could not find any homologs")
+
+    return deps.page_response(homologs, homologs_service.PAGING_KEYS, params["limit"])
+
+
+def get_homologs(
+    params: dict = Depends(_homologs_parameters),
     db: deps.Session = Depends(deps.session),
 ):
     """Get homolog by id."""
-    homologs = homologs_service.get_homologs(
-        db, source_name=source_name, species_id=species_id, gene_id=gene_id, **paging
-    )
+    return _homologs_response(homologs_service.get_homologs(db, **params), params)
 
-    if not homologs:
-        raise HTTPException(404, detail="Could not find any homologs")
 
-    return homologs
+async def get_homologs_async(
+    params: dict = Depends(_homologs_parameters),
+    db: deps.AsyncSession = Depends(deps.async_session),
+):
+    """Get homolog by id."""
+    homologs = await homologs_service.get_homologs_async(db, **params)
+    return _homologs_response(homologs, params)
+
+
+router.add_api_route(
+    "/",
+    get_homologs_async if deps.DB_ASYNC else get_homologs,
+    methods=["GET"],
+    name="get_homologs",
+    response_class=ORJSONResponse,
+)
 
 
 @router.get("/sources")
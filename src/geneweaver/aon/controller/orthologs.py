@@ -1,16 +1,18 @@
 """API endpoints for orthologs."""
 
-from typing import Optional
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import ORJSONResponse
 from geneweaver.aon import dependencies as deps
+from geneweaver.aon.schemas import GeneTranslationRequest
 from geneweaver.aon.service import orthologs as orthologs_service
+from geneweaver.aon.service.rows import OrthologRow
 
 router = APIRouter(prefix="/orthologs", tags=["orthologs"])
 
 
-@router.get("/")
-def get_orthologs(
+async def _orthologs_parameters(
     from_species: Optional[int] = None,
     to_species: Optional[int] = None,
     from_gene_id: Optional[int] = None,
@@ -19,19 +21,68 @@ def get_orthologs(
     best: Optional[bool] = None,
     revised: Optional[bool] = None,
     paging_params: dict = Depends(deps.paging_parameters),
+) -> dict:
+    """Get the filters and paging parameters of an orthologs query."""
+    return {
+        "from_species": from_species,
+        "to_species": to_species,
+        "from_gene_id": from_gene_id,
+        "to_gene_id": to_gene_id,
+        "algorithm_id": algorithm_id,
+        "best": best,
+        "revised": revised,
+        **paging_params,
+    }
+
+
+def _orthologs_response(orthologs: List[OrthologRow], params: dict) -> Response:
+    """Build the response to an orthologs query."""
+    return deps.page_response(orthologs, orthologs_service.PAGING_KEYS, params["limit"])
+
+
+def get_orthologs(
+    params: dict = Depends(_orthologs_parameters),
     db: deps.Session = Depends(deps.session),
 ):
     """Get orthologs with optional filtering."""
-    return orthologs_service.get_orthologs(
+    return _orthologs_response(orthologs_service.get_orthologs(db, **params), params)
+
+
+async def get_orthologs_async(
+    params: dict = Depends(_orthologs_parameters),
+    db: deps.AsyncSession = Depends(deps.async_session),
+):
+    """Get orthologs with optional filtering."""
+    orthologs = await orthologs_service.get_orthologs_async(db, **params)
+    return _orthologs_response(orthologs, params)
+
+
+router.add_api_route(
+    "/",
+    get_orthologs_async if deps.DB_ASYNC else get_orthologs,
+    methods=["GET"],
+    name="get_orthologs",
+    response_class=ORJSONResponse,
+)
+
+
+@router.post("/translate")
+def translate_genes(
+    translation: GeneTranslationRequest,
+    db: deps.Session = Depends(deps.session),
+):
+    """Translate a set of genes to their orthologs in one request.
+
+    The result has one entry per requested reference id, in the same order.
+    """
+    return orthologs_service.translate_genes(
         db,
-        from_species=from_species,
-        to_species=to_species,
-        from_gene_id=from_gene_id,
-        to_gene_id=to_gene_id,
-        algorithm_id=algorithm_id,
-        best=best,
-        revised=revised,
-        **paging_params,
+        translation.ref_ids,
+        ref_id_type=translation.ref_id_type,
+        to_species=translation.to_species,
+        algorithm_id=translation.algorithm_id,
+        best=translation.best,
+        revised=translation.revised,
     )
 
 
@@ -3,6 +3,7 @@
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from geneweaver.aon import dependencies as deps
 from geneweaver.aon.service import genes as genes_service
 from geneweaver.aon.service import homologs as homologs_service
@@ -35,7 +36,7 @@ def get_geneweaver_id(species_id: int, db: deps.Session = Depends(deps.session))
     return species_service.convert_species_agr_to_ode(db, species_id)
 
 
-@router.get("/{species_id}/genes")
+@router.get("/{species_id}/genes", response_class=ORJSONResponse)
 def get_species_genes(
     species_id: int,
     paging: dict = Depends(deps.paging_parameters),
@@ -45,10 +46,10 @@ def get_species_genes(
     genes = genes_service.get_genes(db, species_id=species_id, **paging)
     if not genes:
         raise HTTPException(404, detail="Could not find any genes with that species")
-    return genes
+    return deps.page_response(genes, genes_service.PAGING_KEYS, paging["limit"])
 
 
-@router.get("/{species_id}/homologs")
+@router.get("/{species_id}/homologs", response_class=ORJSONResponse)
 def get_species_homology(
     species_id: int,
     paging: dict = Depends(deps.paging_parameters),
@@ -59,4 +60,6 @@ def get_species_homology(
     if not homologs:
         raise HTTPException(404, detail="Could not find any homologs with that species")
     else:
-        return homologs
+        return deps.page_response(
+            homologs, homologs_service.PAGING_KEYS, paging["limit"]
+        )
@@ -29,4 +29,16 @@ def current_default_version(
     This endpoint returns the default schema version ID. This is the version
     of the schema that the API will use if no version is specified.
     """
-    return request.app.default_schema_version_id
+    return deps.request_default_version(request.scope).version_id
+
+
+@router.get("/session-managers")
+def session_manager_stats(request: Request) -> dict:
+    """Get the session manager cache metrics.
+
+    Session managers are created the first time a version is requested, and
+    evicted when too many versions are in use or a version has been idle for a
+    while. This endpoint returns the cache hits, misses and evictions since the
+    process started, and the current and maximum number of cached versions.
+    """
+    return request.app.session_managers.stats()
@@ -0,0 +1,291 @@
+"""HTTP response caching for immutable schema versions.
+
+A schema version never changes once its load is complete, so a response is fully
+determined by the version id, the route, the query parameters and the code that
+produced it. The middleware derives a strong ETag from exactly those, which means:
+
+- `If-None-Match` can be answered with 304 before the request reaches its
+  endpoint, and so without touching the database,
+- responses are kept in an in-process LRU of serialized bodies, bounded by a byte
+  budget, and served from there on repeated requests.
+
+Versioned routes (`/{version_id}/...`) get a long lived, immutable `Cache-Control`.
+Unversioned routes follow the default version, so their key includes the default
+version id at the time of the request, and clients are asked to revalidate.
+
+Only requests that match a route, for a version the schema version registry still
+knows, are answered from the cache or with a 304. Anything else, a version that
+was deleted for example, goes through to the application and gets its 404.
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from geneweaver.aon.core.schema_version import request_default_version
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+Headers = List[Tuple[bytes, bytes]]
+
+# Top level routes that are never cached, either because they change (the version
+# list) or because they are too large to hold in memory (exports).
+UNCACHED_ROUTES = frozenset(("versions", "export", "docs", "redoc", "openapi.json"))
+
+UNVERSIONED_CACHE_CONTROL = "no-cache"
+
+
+class CachedResponse(NamedTuple):
+    """A serialized response."""
+
+    headers: Headers
+    body: bytes
+
+
+class ResponseCache:
+    """An LRU of serialized responses, bounded by the total size of their bodies."""
+
+    def __init__(self, max_bytes: int) -> None:
+        """Initialize an empty cache.
+
+        :param max_bytes: The memory budget for cached response bodies.
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+
+    def __len__(self) -> int:
+        """Get the number of cached responses."""
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """Get a cached response, marking it as recently used.
+
+        :param key: The cache key.
+        :return: The response, or None if it is not cached.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        """Cache a response, evicting the least recently used ones to make space.
+
+        Responses larger than the whole budget are not cached.
+
+        :param key: The cache key.
+        :param entry: The response.
+        """
+        if len(entry.body) > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous.body)
+        self._entries[key] = entry
+        self.size += len(entry.body)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted.body)
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        self._entries.clear()
+        self.size = 0
+
+
+def normalize_query_string(query_string: bytes) -> str:
+    """Sort the query parameters, so equivalent queries share a cache key.
+
+    :param query_string: The raw query string.
+    :return: The normalized query string.
+    """
+    params = parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)
+    return urlencode(sorted(params))
+
+
+def make_etag(*parts: object) -> str:
+    """Build a strong ETag from the values that determine a response.
+
+    :param parts: The values.
+    :return: The quoted ETag.
+    """
+    digest = hashlib.sha256("\x1f".join(str(p) for p in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag."""
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (c.strip() for c in if_none_match.split(","))
+    return any(c.removeprefix("W/") == etag for c in candidates)
+
+
+def _header(headers: Iterable[Tuple[bytes, bytes]], name: bytes) -> Optional[str]:
+    """Get a request header from an ASGI scope's headers."""
+    for key, value in headers:
+        if key.lower() == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _has_route(app: object, scope: Scope) -> bool:
+    """Check if a request matches a route of an application, method included."""
+    router = getattr(app, "router", None)
+    return router is not None and any(
+        route.matches(scope)[0] == Match.FULL for route in router.routes
+    )
+
+
+class ResponseCacheMiddleware:
+    """ASGI middleware that caches GET responses of immutable schema versions."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        cache: ResponseCache,
+        api_prefix: str,
+        code_version: str,
+        max_age: int,
+    ) -> None:
+        """Wrap an application.
+
+        :param app: The ASGI application.
+        :param cache: The response cache to use.
+        :param api_prefix: The prefix of the API routes.
+        :param code_version: The application version, part of every ETag.
+        :param max_age: The max-age of responses on versioned routes, in seconds.
+        """
+        self.app = app
+        self.cache = cache
+        self.api_prefix = api_prefix.rstrip("/")
+        self.code_version = code_version
+        self.versioned_cache_control = f"public, max-age={max_age}, immutable"
+
+    def _resolve(self, scope: Scope) -> Optional[Tuple[str, str, str]]:
+        """Get the cache key, ETag and Cache-Control of a request.
+
+        :param scope: The ASGI scope.
+        :return: The key, ETag and Cache-Control, or None if the request is not
+            cacheable.
+        """
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return None
+        path: str = scope["path"]
+        if not path.startswith(self.api_prefix + "/"):
+            return None
+        segments = path[len(self.api_prefix) + 1 :].split("/")
+
+        app = scope.get("app")
+        if segments[0].isdigit():
+            version_id = int(segments[0])
+            route = segments[1] if len(segments) > 1 else ""
+            # The registry is only read from memory here, it is reloaded by the
+            # requests that reach the application.
+            version = app.version_registry.cached(version_id)
+            complete_versions = getattr(app, "complete_version_ids", ())
+            if (
+                version is None
+                or not version.load_complete
+                or version_id not in complete_versions
+            ):
+                return None
+            cache_control = self.versioned_cache_control
+        else:
+            default_version = request_default_version(scope)
+            route = segments[0]
+            if default_version is None or default_version.version_id is None:
+                return None
+            version_id = default_version.version_id
+            cache_control = UNVERSIONED_CACHE_CONTROL
+
+        if route in UNCACHED_ROUTES or not _has_route(app, scope):
+            return None
+
+        query = normalize_query_string(scope.get("query_string", b""))
+        key = f"{version_id}\x1f{path}\x1f{query}"
+        etag = make_etag(self.code_version, version_id, path, query)
+        return key, etag, cache_control
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """Handle a request."""
+        resolved = self._resolve(scope)
+        if resolved is None:
+            await self.app(scope, receive, send)
+            return
+        key, etag, cache_control = resolved
+        cache_headers = [
+            (b"etag", etag.encode()),
+            (b"cache-control", cache_control.encode()),
+        ]
+
+        if_none_match = _header(scope["headers"], b"if-none-match")
+        if if_none_match is not None and _etag_matches(if_none_match, etag):
+            await send(
+                {"type": "http.response.start", "status": 304, "headers": cache_headers}
+            )
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": cached.headers,
+                }
+            )
+            body = b"" if scope["method"] == "HEAD" else cached.body
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        await self.app(
+            scope,
+            receive,
+            self._capturing_send(
+                send, key, cache_headers, store=scope["method"] == "GET"
+            ),
+        )
+
+    def _capturing_send(
+        self, send: Send, key: str, cache_headers: Headers, store: bool
+    ) -> Send:
+        """Wrap `send` to add the cache headers to, and cache, a 200 response.
+
+        :param send: The ASGI send function.
+        :param key: The cache key of the response.
+        :param cache_headers: The ETag and Cache-Control headers.
+        :param store: Whether to store the body, False for HEAD requests.
+        :return: The wrapped send function.
+        """
+        headers: Headers = []
+        chunks: List[bytes] = []
+        state = {"cacheable": False, "size": 0}
+
+        async def capturing_send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                if message["status"] == 200:
+                    headers.extend(
+                        (k, v)
+                        for k, v in message.get("headers", [])
+                        if k.lower() not in (b"etag", b"cache-control")
+                    )
+                    headers.extend(cache_headers)
+                    message = {**message, "headers": headers}
+                    state["cacheable"] = store
+            elif message["type"] == "http.response.body" and state["cacheable"]:
+                body = message.get("body", b"")
+                state["size"] += len(body)
+                if state["size"] > self.cache.max_bytes:
+                    state["cacheable"] = False
+                    chunks.clear()
+                else:
+                    chunks.append(body)
+                    if not message.get("more_body", False):
+                        self.cache.put(key, CachedResponse(headers, b"".join(chunks)))
+            await send(message)
+
+        return capturing_send
@@ -3,6 +3,7 @@
 import logging
 from typing import Any, Dict, Optional
 
+from geneweaver.aon.enum import HomologyBackend, LoadBackend
 from geneweaver.db.core.settings_class import Settings as DBSettings
 from pydantic import BaseSettings, validator
 
@@ -21,9 +22,42 @@ class Config(BaseSettings):
     API_PREFIX: str = "/aon/api"
     DEFAULT_SCHEMA: Optional[str] = None
     DEFAULT_ALGORITHM_ID: Optional[int] = 2
+    # The most genes a single translation request can ask for, enough for a whole
+    # gene set.
+    TRANSLATE_MAX_REF_IDS: int = 50000
     TEMPORAL_NAMESPACE: str = "agr-load-data"
     TEMPORAL_TASK_QUEUE: str = "geneweaver-aon-tasks"
     TEMPORAL_URI: str = "localhost:7233"
+    LOAD_BACKEND: LoadBackend = LoadBackend.COPY
+    HOMOLOGY_BACKEND: HomologyBackend = HomologyBackend.PYTHON
+    AGR_UNZIP: bool = False
+    AGR_CACHE_DIR: str = ".agr_cache"
+    # Create the bulk loaded tables of a new schema without constraints or indexes,
+    # and build them once the data is loaded.
+    LOAD_DEFER_CONSTRAINTS: bool = False
+    CONSTRAINT_BUILD_PARALLELISM: int = 4
+    # Cache the responses of complete schema versions in memory, and answer
+    # revalidations with 304.
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    RESPONSE_CACHE_MAX_AGE: int = 365 * 24 * 60 * 60
+    # Seconds between reloads of the in-memory schema version map, and the minimum
+    # seconds between early reloads caused by a lookup of an unknown version.
+    SCHEMA_VERSION_TTL: int = 60
+    SCHEMA_VERSION_NEGATIVE_TTL: int = 10
+    # Seconds between checks for newly completed versions in a running API process,
+    # 0 to only pick up new versions on restart.
+    SCHEMA_VERSION_WATCH_INTERVAL: int = 30
+    # Hold the orthologs of the default version in memory, and answer gene keyed
+    # ortholog queries from there rather than from the database.
+    ORTHOLOG_GRAPH_ENABLED: bool = False
+    # Where snapshot files of loaded versions are written, and read by API workers
+    # instead of building the ortholog graph themselves. Unset to disable.
+    SNAPSHOT_DIR: Optional[str] = None
+    # Session managers of non-default versions are created on first use, and kept
+    # for at most this many versions, each until it has been idle this long.
+    SESSION_MANAGER_CACHE_SIZE: int = 8
+    SESSION_MANAGER_IDLE_SECONDS: int = 60 * 60
 
     DB_HOST: Optional[str] = None
     DB_USERNAME: str = ""
@@ -31,6 +65,15 @@ class Config(BaseSettings):
     DB_NAME: Optional[str] = None
     DB_PORT: int = 5432
     DB: Optional[DBSettings] = None
+    # Each physical database (AON and GeneWeaver) has one connection pool, shared by
+    # every schema version, so these cap the connections per database per process.
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT: int = 30
+    # Serve the ortholog, gene and homolog listing routes from `async def` handlers
+    # on an async engine, rather than from sync handlers in the threadpool. The async
+    # engines have their own pools, of the same sizes, and need greenlet installed.
+    DB_ASYNC: bool = False
 
     @validator("DB", pre=True)
     def assemble_aon_db_settings(
@@ -0,0 +1,74 @@
+"""Rules to convert gene reference IDs between the Geneweaver and AON formats.
+
+These do not touch a database, and are shared by `geneweaver.aon.service.convert` and
+`geneweaver.aon.embedded`, so this module must only depend on the standard library.
+
+AGR references are the Geneweaver reference with a source database prefix, so the
+AGR to Geneweaver direction is a string rewrite. The other direction depends on the
+source of the reference, which Geneweaver keeps in its gene table: without it, the
+candidate AGR forms of a reference are tried against the genes of a snapshot, see
+`agr_ref_candidates` and `geneweaver.aon.embedded.client.SnapshotClient`.
+"""
+
+from typing import List, Sequence, Tuple
+
+# prefixes added to Geneweaver references to match the AGR format, by the name of
+# their source's `geneweaver.core.enum.GeneIdentifier`
+AGR_PREFIXES_BY_GDB_NAME = {
+    "WORMBASE": "WB:",
+    "SGD": "SGD:",
+    "FLYBASE": "FB:",
+    "ZFIN": "ZFIN:",
+}
+AGR_PREFIXES_TO_ADD = tuple(AGR_PREFIXES_BY_GDB_NAME.values())
+
+# genes with these prefixes will have the prefix removed
+GDB_PREFIXES_TO_REMOVE = frozenset(p.rstrip(":") for p in AGR_PREFIXES_TO_ADD)
+
+
+def agr_refs_to_ode(gn_ref_ids: Sequence[str]) -> List[str]:
+    """Convert many gene reference IDs from AGR to Geneweaver format.
+
+    :param gn_ref_ids: The gene reference IDs in AGR format.
+    :return: The gene reference IDs in Geneweaver format, in the same order as
+        `gn_ref_ids`.
+    """
+    refs = []
+    for ref in gn_ref_ids:
+        prefix, colon, local_id = ref.partition(":")
+        if prefix == "RGD":
+            # RGD only requires removing the colon
+            ref = ref.replace(":", "")
+        elif colon and prefix in GDB_PREFIXES_TO_REMOVE:
+            ref = local_id
+        # all other gene ref ids are returned the same
+        refs.append(ref)
+    return refs
+
+
+def agr_ref_to_ode(gn_ref_id: str) -> str:
+    """Convert a gene reference ID from AGR to Geneweaver format.
+
+    All gene ref ids in AGR contain the gene source database prefix followed by a colon,
+    but geneweaver only has some genes in this format. This function adjusts the ref ids
+    to match the geneweaver format.
+
+    :param gn_ref_id: The gene reference ID in AGR format.
+    :return: The gene reference ID in Geneweaver format.
+    """
+    return agr_refs_to_ode([gn_ref_id])[0]
+
+
+def agr_ref_candidates(ode_ref: str) -> Tuple[str, ...]:
+    """Get the AGR references a Geneweaver reference may correspond to.
+
+    The reference itself comes first, as most sources share the AGR format.
+
+    :param ode_ref: The gene reference ID from Geneweaver.
+    :return: The candidate AGR reference IDs, in the order to try them.
+    """
+    candidates = [ode_ref]
+    if ode_ref.startswith("RGD") and ":" not in ode_ref:
+        candidates.append("RGD:" + ode_ref[3:])
+    candidates.extend(prefix + ode_ref for prefix in AGR_PREFIXES_TO_ADD)
+    return tuple(candidates)
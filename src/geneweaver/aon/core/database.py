@@ -1,22 +1,92 @@
-"""Root database module, for uses other than the FastAPI application."""
+"""Root database module, for uses other than the FastAPI application.
+
+There is one engine, and so one connection pool, per physical database. Schema
+versions share the AON engine, and select their tenant schema per connection with a
+`schema_translate_map`, see `geneweaver.aon.core.schema_version`. With
+`config.DB_ASYNC`, each database also has an async engine, used by the async routes.
+"""
+
+from typing import TYPE_CHECKING, Optional
 
 from geneweaver.aon.core.config import config
-from sqlalchemy import create_engine
+from geneweaver.db.core.settings_class import Settings as DBSettings
+from sqlalchemy import Engine, create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine
+
 BaseAGR = declarative_base()
 BaseGW = declarative_base()
 
+
+def _create_engine(settings: Optional[DBSettings]) -> Optional[Engine]:
+    """Create the pooled engine for a database.
+
+    :param settings: The database settings.
+    :return: The engine, or None if the database is not configured.
+    """
+    if settings is None:
+        return None
+    return create_engine(
+        settings.URI,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+    )
+
+
+def _create_async_engine(settings: Optional[DBSettings]) -> Optional["AsyncEngine"]:
+    """Create the pooled async engine for a database, if the async stack is enabled.
+
+    :param settings: The database settings.
+    :return: The engine, or None if the database is not configured or
+        `config.DB_ASYNC` is off.
+    """
+    if settings is None or not config.DB_ASYNC:
+        return None
+    # Imported here, as SQLAlchemy's asyncio extension requires greenlet.
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    # The psycopg dialect of the URI selects its async variant here.
+    return create_async_engine(
+        settings.URI,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+    )
+
+
+agr_engine = _create_engine(config.DB)
+gw_engine = _create_engine(config.GW_DB)
+
+agr_async_engine = _create_async_engine(config.DB)
+gw_async_engine = _create_async_engine(config.GW_DB)
+
 binds = {}
-if config.DB is not None:
-    agr_engine = create_engine(config.DB.URI)
+if agr_engine is not None:
     binds[BaseAGR] = agr_engine
 
-if config.GW_DB is not None:
-    gw_engine = create_engine(config.GW_DB.URI)
+if gw_engine is not None:
     binds[BaseGW] = gw_engine
 
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 SessionLocal.configure(binds=binds)
+
+
+def dispose_engines() -> None:
+    """Close every pooled connection of the shared engines."""
+    for engine in (agr_engine, gw_engine):
+        if engine is not None:
+            engine.dispose()
+
+
+async def dispose_async_engines() -> None:
+    """Close every pooled connection of the shared async engines."""
+    for engine in (agr_async_engine, gw_async_engine):
+        if engine is not None:
+            await engine.dispose()
@@ -1,63 +1,182 @@
-"""Utilities for getting and setting up schema version db connections."""
+"""Utilities for getting and setting up schema version db connections.
+
+Every query here goes through the process-wide AON engine, so looking up versions
+never opens a connection pool of its own. The API keeps the versions in a
+`SchemaVersionRegistry`, so that resolving a version id on a request, including an
+unknown one, is usually answered from memory.
+"""
 
 import logging
-from typing import List, Optional, Tuple
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional, Tuple
 
+from geneweaver.aon.core import database
 from geneweaver.aon.core.config import config
 from geneweaver.aon.core.database import BaseAGR, BaseGW
-from geneweaver.aon.models import Version
-from sqlalchemy import Engine, create_engine
+from geneweaver.aon.models import Gene, Version
+from sqlalchemy import Engine, select
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session, sessionmaker
+from starlette.types import Scope
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
 
 logger = logging.getLogger("uvicorn.error")
 
+# The key of the schema version id in the `info` of the sessions of a version.
+SCHEMA_VERSION_INFO_KEY = "schema_version_id"
+
+
+def _session() -> Session:
+    """Open a session on the shared AON engine."""
+    return Session(bind=database.agr_engine)
+
 
 def get_latest_schema_version() -> Optional[Version]:
     """Get the latest schema version."""
-    engine = create_engine(config.DB.URI)
-    session = Session(bind=engine)
-    version = (
-        session.query(Version)
-        .filter(Version.load_complete == True)  # noqa: E712
-        .order_by(Version.id.desc())
-        .first()
-    )
-    session.close()
-    return version
+    with _session() as session:
+        return (
+            session.query(Version)
+            .filter(Version.load_complete == True)  # noqa: E712
+            .order_by(Version.id.desc())
+            .first()
+        )
 
 
 def get_schema_versions() -> List[Version]:
     """Get all schema versions."""
-    engine = create_engine(config.DB.URI)
-    session = Session(bind=engine)
-    versions = (
-        session.query(Version)
-        .filter(Version.load_complete == True)  # noqa: E712
-        .order_by(Version.id.desc())
-        .all()
-    )
-    session.close()
-    return versions
+    with _session() as session:
+        return (
+            session.query(Version)
+            .filter(Version.load_complete == True)  # noqa: E712
+            .order_by(Version.id.desc())
+            .all()
+        )
+
+
+def get_all_schema_versions() -> List[Version]:
+    """Get all schema versions, including those that are still loading."""
+    with _session() as session:
+        return session.query(Version).order_by(Version.id.desc()).all()
 
 
 def get_schema_version(version_id: int) -> Optional[Version]:
     """Get a schema version by ID."""
-    engine = create_engine(config.DB.URI)
-    session = Session(bind=engine)
-    version = session.query(Version).get(version_id)
-    session.close()
-    return version
+    with _session() as session:
+        return session.get(Version, version_id)
 
 
 def mark_schema_version_load_complete(version_id: int) -> None:
     """Mark a schema version as loaded."""
-    engine = create_engine(config.DB.URI)
-    session = Session(bind=engine)
-    version = session.query(Version).get(version_id)
-    version.load_complete = True
-    session.add(version)
-    session.commit()
-    session.close()
+    with _session() as session:
+        version = session.get(Version, version_id)
+        version.load_complete = True
+        session.add(version)
+        session.commit()
+
+
+class SchemaVersionRegistry:
+    """An in-memory map of the schema versions, shared by the whole process.
+
+    The map is reloaded, with a single query, once it is older than `ttl` seconds.
+    A lookup of an id that is not in the map may be a version created since the
+    last reload, so it triggers an early reload, but at most once every
+    `negative_ttl` seconds: in between, misses are answered from memory, and a
+    flood of requests for bogus version ids does not reach the database.
+
+    If a reload fails, the previous map is kept and served until the next attempt.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        negative_ttl: float,
+        loader: Callable[[], List[Version]] = get_all_schema_versions,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize an empty registry, loaded on first use.
+
+        :param ttl: The maximum age of the map, in seconds.
+        :param negative_ttl: The minimum time between reloads caused by a miss.
+        :param loader: Loads every schema version.
+        :param clock: The monotonic clock used to age the map.
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._loader = loader
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._versions: Dict[int, Version] = {}
+        self._loaded_at: Optional[float] = None
+
+    def refresh(self) -> None:
+        """Reload every schema version now."""
+        with self._lock:
+            self._load()
+
+    def _load(self) -> None:
+        """Reload the map, keeping the previous one if it has been loaded before."""
+        try:
+            versions = self._loader()
+        except SQLAlchemyError:
+            if self._loaded_at is None:
+                raise
+            logger.exception("Failed to reload schema versions, serving stale ones.")
+        else:
+            self._versions = {version.id: version for version in versions}
+        self._loaded_at = self._clock()
+
+    def _refresh_if_older_than(self, max_age: float) -> None:
+        """Reload the map if it is older than `max_age` seconds."""
+        if self._loaded_at is not None and self._clock() - self._loaded_at < max_age:
+            return
+        with self._lock:
+            # Another thread may have reloaded while this one waited for the lock.
+            if self._loaded_at is None or self._clock() - self._loaded_at >= max_age:
+                self._load()
+
+    def get(self, version_id: int) -> Optional[Version]:
+        """Get a schema version by ID.
+
+        :param version_id: The schema version ID.
+        :return: The schema version, or None if it does not exist.
+        """
+        self._refresh_if_older_than(self.ttl)
+        version = self._versions.get(version_id)
+        if version is None:
+            self._refresh_if_older_than(self.negative_ttl)
+            version = self._versions.get(version_id)
+        return version
+
+    def cached(self, version_id: int) -> Optional[Version]:
+        """Get a schema version by ID from the in-memory map, without reloading it.
+
+        :param version_id: The schema version ID.
+        :return: The schema version, or None if it was not in the map when it was
+            last loaded.
+        """
+        return self._versions.get(version_id)
+
+    def complete_versions(self) -> List[Version]:
+        """Get the schema versions that have finished loading, latest first."""
+        self._refresh_if_older_than(self.ttl)
+        return sorted(
+            (v for v in self._versions.values() if v.load_complete),
+            key=lambda v: v.id,
+            reverse=True,
+        )
+
+    def latest_complete(self) -> Optional[Version]:
+        """Get the latest schema version that has finished loading."""
+        return next(iter(self.complete_versions()), None)
+
+
+registry = SchemaVersionRegistry(
+    ttl=config.SCHEMA_VERSION_TTL, negative_ttl=config.SCHEMA_VERSION_NEGATIVE_TTL
+)
 
 
 def set_up_sessionmanager(
@@ -65,37 +184,236 @@ def set_up_sessionmanager(
 ) -> Tuple[sessionmaker, Tuple[Engine, Engine]]:
     """Set up the session manager.
 
+    No connection pool is created: the engines returned share the pools of the
+    process-wide engines in `geneweaver.aon.core.database`, and only differ in the
+    schema the AON tables are translated to. Dispose those with
+    `database.dispose_engines` rather than disposing the returned engines.
+
+    :param version: The schema version to use.
+    :return: The session manager, and the AON and GeneWeaver engines it uses.
+    """
+    gw_engine = database.gw_engine
+    if version is not None:
+        engine = database.agr_engine.execution_options(
+            schema_translate_map={None: version.schema_name}
+        )
+    else:
+        engine = database.agr_engine
+    session = sessionmaker(
+        autocommit=False,
+        autoflush=False,
+        bind=engine,
+        info={SCHEMA_VERSION_INFO_KEY: None if version is None else version.id},
+    )
+    session.configure(binds={BaseAGR: engine, BaseGW: gw_engine})
+    return session, (engine, gw_engine)
+
+
+def set_up_async_sessionmanager(
+    version: Optional[Version],
+) -> Tuple["async_sessionmaker", Tuple["AsyncEngine", "AsyncEngine"]]:
+    """Set up the async session manager, over the shared async engines.
+
+    This is the async counterpart of `set_up_sessionmanager`, and only available
+    with `config.DB_ASYNC`.
+
     :param version: The schema version to use.
-    :return: The session manager.
+    :return: The session manager, and the AON and GeneWeaver engines it uses.
     """
-    gw_engine = create_engine(config.GW_DB.URI)
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    gw_engine = database.gw_async_engine
     if version is not None:
-        engine = create_engine(config.DB.URI).execution_options(
+        engine = database.agr_async_engine.execution_options(
             schema_translate_map={None: version.schema_name}
         )
     else:
-        engine = create_engine(config.DB.URI)
-    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        engine = database.agr_async_engine
+    session = async_sessionmaker(
+        autoflush=False,
+        bind=engine,
+        info={SCHEMA_VERSION_INFO_KEY: None if version is None else version.id},
+    )
     session.configure(binds={BaseAGR: engine, BaseGW: gw_engine})
     return session, (engine, gw_engine)
 
 
-def set_up_sessionmanager_by_schema(
-    schema_versions: list[Version],
-) -> dict[str, sessionmaker]:
-    """Set up the session manager by schema version.
+class SessionManagerCache:
+    """A bounded LRU of per-version session managers, created on first use.
+
+    Session managers are cheap, as every version shares the pools of the
+    process-wide engines, so this bounds the number of versions an API process keeps
+    state for rather than the number of connections. Entries are evicted when the
+    cache is full, or when they have not been used for `idle_seconds`. The pinned
+    version, the default one, is never evicted.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        idle_seconds: float,
+        factory: Callable[
+            [Optional[Version]], Tuple[sessionmaker, Tuple[Engine, Engine]]
+        ] = set_up_sessionmanager,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Initialize an empty cache.
+
+        :param max_size: The maximum number of unpinned session managers.
+        :param idle_seconds: The time after which an unused session manager is
+            evicted.
+        :param factory: Creates the session manager of a version.
+        :param clock: The monotonic clock used to find idle entries.
+        """
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self._factory = factory
+        self._clock = clock
+        self._lock = threading.Lock()
+        # version id -> (session manager, time of last use), least recent first
+        self._entries: "OrderedDict[Optional[int], Tuple[sessionmaker, float]]" = (
+            OrderedDict()
+        )
+        self._pinned: Dict[Optional[int], sessionmaker] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        """Get the number of session managers held, pinned ones included."""
+        return len(self._entries) + len(self._pinned)
+
+    def __contains__(self, version_id: Optional[int]) -> bool:
+        """Check whether a version's session manager is held."""
+        return version_id in self._entries or version_id in self._pinned
+
+    def get(self, version: Optional[Version]) -> sessionmaker:
+        """Get the session manager of a version, creating it if needed.
+
+        :param version: The schema version, or None for the unversioned tables.
+        :return: The session manager.
+        """
+        key = None if version is None else version.id
+        with self._lock:
+            manager = self._pinned.get(key)
+            if manager is not None:
+                self.hits += 1
+                return manager
+            now = self._clock()
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                logger.info(f"Setting up session manager for schema version {key}.")
+                manager, _ = self._factory(version)
+            else:
+                self.hits += 1
+                manager = entry[0]
+            self._entries[key] = (manager, now)
+            self._evict(now)
+            return manager
+
+    def pin(self, version: Optional[Version]) -> sessionmaker:
+        """Pre-warm the session manager of a version and exempt it from eviction.
+
+        Only one version is pinned at a time, the previously pinned one goes back
+        into the LRU as its most recently used entry.
+
+        :param version: The schema version, or None for the unversioned tables.
+        :return: The session manager.
+        """
+        key = None if version is None else version.id
+        with self._lock:
+            now = self._clock()
+            for pinned_key, pinned in self._pinned.items():
+                if pinned_key != key:
+                    self._entries[pinned_key] = (pinned, now)
+            manager = self._pinned.get(key)
+            if manager is None:
+                entry = self._entries.get(key)
+                manager = entry[0] if entry is not None else self._factory(version)[0]
+            self._entries.pop(key, None)
+            self._pinned = {key: manager}
+            self._evict(now)
+            return manager
+
+    def _evict(self, now: float) -> None:
+        """Evict the entries over the size limit, and those that are idle."""
+        while self._entries:
+            key, (_, last_used) = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_size and (
+                now - last_used < self.idle_seconds
+            ):
+                break
+            del self._entries[key]
+            self.evictions += 1
+            logger.info(f"Evicted session manager for schema version {key}.")
+
+    def stats(self) -> Dict[str, int]:
+        """Get the cache metrics.
+
+        :return: The hits, misses, evictions, current size and maximum size.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self),
+            "max_size": self.max_size,
+        }
+
+
+def warm_session_manager(session_manager: sessionmaker) -> None:
+    """Check out a connection through a session manager and query its schema.
+
+    This fails if the version's tables cannot be read, and leaves a live
+    connection in the shared pool for the version's first request.
+
+    :param session_manager: The session manager of a version.
+    """
+    with session_manager() as session:
+        session.execute(select(Gene.gn_id).limit(1)).all()
+
+
+async def warm_async_session_manager(session_manager: "async_sessionmaker") -> None:
+    """Check out a connection through an async session manager.
+
+    The async counterpart of `warm_session_manager`.
+
+    :param session_manager: The async session manager of a version.
+    """
+    async with session_manager() as session:
+        (await session.execute(select(Gene.gn_id).limit(1))).all()
+
+
+class DefaultVersion(NamedTuple):
+    """The version unversioned routes are served from, and its session managers.
+
+    The tuple is replaced as a whole when the default version changes, so readers
+    never see the id of one version with the session manager of another. The async
+    session manager is only set with `config.DB_ASYNC`.
+    """
+
+    version_id: Optional[int]
+    session: sessionmaker
+    async_session: Optional["async_sessionmaker"] = None
+
+
+DEFAULT_VERSION_STATE_KEY = "default_version"
+
+
+def request_default_version(scope: Scope) -> Optional[DefaultVersion]:
+    """Get the default version a request is served from.
+
+    The application's default version is captured the first time this is called
+    for a request, and the same one is returned for the rest of it, so a request
+    in flight when the default changes is served entirely from the old version.
 
-    :param schema_versions: The schema versions to use.
-    :return: The session manager by schema version.
+    :param scope: The ASGI scope of the request.
+    :return: The default version, or None if the application has none.
     """
-    session_managers = {}
-    engines = {}
-    if len(schema_versions) == 0:
-        schema_versions.append(None)
-    for version in schema_versions:
-        version_id = None if version is None else version.id
-        logger.info(f"Setting up session manager for schema version {version_id}.")
-        session_managers[version_id], engines[version_id] = set_up_sessionmanager(
-            version
+    state = scope.setdefault("state", {})
+    if DEFAULT_VERSION_STATE_KEY not in state:
+        state[DEFAULT_VERSION_STATE_KEY] = getattr(
+            scope.get("app"), "default_version", None
         )
-    return session_managers, engines
+    return state[DEFAULT_VERSION_STATE_KEY]
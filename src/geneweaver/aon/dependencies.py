@@ -1,26 +1,156 @@
 """Dependency injection for the AON FastAPI application."""
 
+import asyncio
+import contextlib
 import logging
 from contextlib import asynccontextmanager
-from typing import Annotated, Optional, Union
+from typing import (
+    TYPE_CHECKING,
+    Annotated,
+    Any,
+    AsyncIterator,
+    List,
+    Optional,
+    Sequence,
+    Union,
+)
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
 from geneweaver.aon.core.config import config
+from geneweaver.aon.core.database import dispose_async_engines, dispose_engines
 from geneweaver.aon.core.schema_version import (
-    get_latest_schema_version,
-    get_schema_version,
-    get_schema_versions,
-    set_up_sessionmanager,
-    set_up_sessionmanager_by_schema,
+    DefaultVersion,
+    SessionManagerCache,
+    registry,
+    request_default_version,
+    set_up_async_sessionmanager,
+    warm_async_session_manager,
+    warm_session_manager,
 )
-from sqlalchemy.orm import Session, sessionmaker
+from geneweaver.aon.embedded.snapshot import snapshot_path
+from geneweaver.aon.models import Version
+from geneweaver.aon.service import ortholog_graph, snapshot
+from geneweaver.aon.service.utils import Cursor, decode_cursor, next_cursor
+from sqlalchemy.orm import Session, close_all_sessions, sessionmaker
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
 
 logger = logging.getLogger("uvicorn.error")
 
 DEFAULT_ALGORITHM_ID = config.DEFAULT_ALGORITHM_ID
+# Whether the hot routes are served by their async handlers, see `async_session`.
+DB_ASYNC = config.DB_ASYNC
 
 Session = Session
 
+try:
+    from sqlalchemy.ext.asyncio import AsyncSession
+except ImportError:
+    # SQLAlchemy's asyncio extension needs greenlet, which only `config.DB_ASYNC`
+    # requires.
+    AsyncSession = None
+
+
+def _configured_default_version(complete_versions: List[Version]) -> Optional[Version]:
+    """Pick the default version among the completed ones, latest first."""
+    if config.DEFAULT_SCHEMA is None:
+        return next(iter(complete_versions), None)
+    return next(
+        (v for v in complete_versions if v.schema_name == config.DEFAULT_SCHEMA),
+        None,
+    )
+
+
+def _load_ortholog_graph(version: Version, session_manager: sessionmaker) -> bool:
+    """Load a version's ortholog graph, from its snapshot file if there is one."""
+    path = None
+    if config.SNAPSHOT_DIR is not None:
+        path = snapshot_path(config.SNAPSHOT_DIR, version.schema_name)
+    return snapshot.load_graph(version.id, session_manager, path)
+
+
+def register_new_versions(
+    app: FastAPI, loop: Optional[asyncio.AbstractEventLoop] = None
+) -> List[int]:
+    """Make versions completed since startup available to a running application.
+
+    Each new version's session manager is created and warmed up before the version
+    is announced, and the default version is switched, if the new one should be the
+    default, only once it is warm. Requests already in flight keep the default
+    version they started with, see `request_default_version`.
+
+    This blocks, so it is run in a worker thread. Async connections belong to the
+    event loop they were opened on, so with `config.DB_ASYNC` the new default
+    version's async session manager is warmed on `loop`, the application's loop.
+
+    :param app: The FastAPI application.
+    :param loop: The event loop the application runs on.
+    :return: The IDs of the newly registered versions.
+    """
+    app.version_registry.refresh()
+    complete_versions = app.version_registry.complete_versions()
+    new_versions = [
+        v for v in complete_versions if v.id not in app.complete_version_ids
+    ]
+    for version in new_versions:
+        logger.info(f"Warming up new schema version {version.id}.")
+        warm_session_manager(app.session_managers.get(version))
+    if new_versions:
+        # Replaced, not mutated, so readers always see a whole set.
+        app.complete_version_ids = app.complete_version_ids | {
+            v.id for v in new_versions
+        }
+
+    default_version = _configured_default_version(complete_versions)
+    if (
+        default_version is not None
+        and default_version.id != app.default_version.version_id
+    ):
+        session_manager = app.session_managers.pin(default_version)
+        warm_session_manager(session_manager)
+        async_session_manager = _pin_async_session_manager(app, default_version)
+        if async_session_manager is not None and loop is not None:
+            asyncio.run_coroutine_threadsafe(
+                warm_async_session_manager(async_session_manager), loop
+            ).result()
+        if config.ORTHOLOG_GRAPH_ENABLED:
+            _load_ortholog_graph(default_version, session_manager)
+        app.default_version = DefaultVersion(
+            default_version.id, session_manager, async_session_manager
+        )
+        logger.info(f"Switched default schema version to {default_version.id}.")
+        if config.ORTHOLOG_GRAPH_ENABLED:
+            ortholog_graph.retain_graphs([default_version.id])
+    return [v.id for v in new_versions]
+
+
+def _pin_async_session_manager(
+    app: FastAPI, version: Optional[Version]
+) -> Optional["async_sessionmaker"]:
+    """Pin the async session manager of the default version, with `DB_ASYNC`."""
+    if app.async_session_managers is None:
+        return None
+    return app.async_session_managers.pin(version)
+
+
+async def watch_schema_versions(app: FastAPI, interval: float) -> None:
+    """Register newly completed versions, every `interval` seconds, until cancelled.
+
+    :param app: The FastAPI application.
+    :param interval: The number of seconds between checks.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(
+                register_new_versions, app, asyncio.get_running_loop()
+            )
+        except Exception:
+            # A failed check, e.g. during a database outage, is retried next time.
+            logger.exception("Failed to register new schema versions.")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> None:
@@ -29,34 +159,65 @@ async def lifespan(app: FastAPI) -> None:
     :param app: The FastAPI application (dependency injection).
     """
     logger.info("Setting up DB connection pools.")
-    schema_versions = get_schema_versions()
-    app.session_managers, app.engines = set_up_sessionmanager_by_schema(schema_versions)
-
-    if config.DEFAULT_SCHEMA is None:
-        default_schema_version = get_latest_schema_version()
-        default_version_id = (
-            None if default_schema_version is None else default_schema_version.id
+    app.version_registry = registry
+    registry.refresh()
+    schema_versions = registry.complete_versions()
+    # Only versions that have finished loading are immutable, and so cacheable.
+    app.complete_version_ids = {v.id for v in schema_versions}
+    app.session_managers = SessionManagerCache(
+        max_size=config.SESSION_MANAGER_CACHE_SIZE,
+        idle_seconds=config.SESSION_MANAGER_IDLE_SECONDS,
+    )
+    app.async_session_managers = None
+    if config.DB_ASYNC:
+        app.async_session_managers = SessionManagerCache(
+            max_size=config.SESSION_MANAGER_CACHE_SIZE,
+            idle_seconds=config.SESSION_MANAGER_IDLE_SECONDS,
+            factory=set_up_async_sessionmanager,
         )
-        logger.info(
-            f"Using latest schema version as default: {default_schema_version}."
-        )
-    else:
-        default_version_id = next(
-            (v.id for v in schema_versions if v.schema_name == config.DEFAULT_SCHEMA),
-            None,
+
+    default_schema_version = _configured_default_version(schema_versions)
+    logger.info(f"Using schema version as default: {default_schema_version}.")
+    # Other versions are set up on first use, only the default one is pre-warmed.
+    app.default_version = DefaultVersion(
+        None if default_schema_version is None else default_schema_version.id,
+        app.session_managers.pin(default_schema_version),
+        _pin_async_session_manager(app, default_schema_version),
+    )
+    if app.default_version.async_session is not None:
+        await warm_async_session_manager(app.default_version.async_session)
+
+    graph_loader = None
+    if config.ORTHOLOG_GRAPH_ENABLED and default_schema_version is not None:
+        # Built in the background, ortholog queries use the database until it is.
+        graph_loader = asyncio.create_task(
+            asyncio.to_thread(
+                _load_ortholog_graph,
+                default_schema_version,
+                app.default_version.session,
+            )
         )
 
-    app.default_schema_version_id = default_version_id
-    app.session = app.session_managers[default_version_id]
+    watcher = None
+    if config.SCHEMA_VERSION_WATCH_INTERVAL > 0:
+        watcher = asyncio.create_task(
+            watch_schema_versions(app, config.SCHEMA_VERSION_WATCH_INTERVAL)
+        )
 
     yield
 
+    if graph_loader is not None:
+        graph_loader.cancel()
+    if watcher is not None:
+        watcher.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await watcher
+
     logger.info("Closing DB connection pools.")
-    for session in app.session_managers.values():
-        session.close_all()
-    for engine, gw_engine in app.engines.values():
-        engine.dispose()
-        gw_engine.dispose()
+    close_all_sessions()
+    # Every version shares the same pools, so they are disposed once.
+    dispose_engines()
+    await dispose_async_engines()
 
 
 def version_id(version_id: int, request: Request) -> None:
@@ -65,43 +226,114 @@ def version_id(version_id: int, request: Request) -> None:
     request.state.schema_version_id = version_id
 
 
-def session(request: Request) -> sessionmaker:
-    """Get a session from the connection pool."""
+def session_manager(request: Request) -> sessionmaker:
+    """Get the session manager of the version a request is for.
+
+    Streaming responses open their session from this themselves, so that it stays
+    open for as long as the body is being sent.
+    """
     try:
         schema_version = request.state.schema_version_id
-        try:
-            _session = request.app.session_managers[schema_version]()
-        except KeyError as e:
-            version = get_schema_version(schema_version)
-            if version is not None and version.id not in request.app.session_managers:
-                (
-                    request.app.session_managers[version.id],
-                    request.app.engines[version.id],
-                ) = set_up_sessionmanager(version)
-                _session = request.app.session_managers[version.id]()
-            else:
-                raise HTTPException(
-                    status_code=404, detail="Schema version not found."
-                ) from e
     except AttributeError:
-        _session = request.app.session()
+        return request_default_version(request.scope).session
+    # Answered from memory, so unknown versions cost no database round trip.
+    version = request.app.version_registry.get(schema_version)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Schema version not found.")
+    return request.app.session_managers.get(version)
+
+
+def session(request: Request) -> sessionmaker:
+    """Get a session from the connection pool."""
+    _session = session_manager(request)()
 
     yield _session
 
     _session.close()
 
 
+async def async_session(request: Request) -> AsyncIterator[AsyncSession]:
+    """Get an async session from the async connection pool, with `DB_ASYNC`."""
+    try:
+        schema_version = request.state.schema_version_id
+    except AttributeError:
+        _session = request_default_version(request.scope).async_session()
+    else:
+        # Known versions are answered from memory, and refreshed by the version
+        # watcher. A reload queries the database, so a miss is looked up off the
+        # event loop.
+        registry = request.app.version_registry
+        version = registry.cached(schema_version)
+        if version is None:
+            version = await asyncio.to_thread(registry.get, schema_version)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Schema version not found.")
+        _session = request.app.async_session_managers.get(version)()
+
+    try:
+        yield _session
+    finally:
+        await _session.close()
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
 async def paging_parameters(
     start: Annotated[Optional[int], "The item to start at (the offset)."] = None,
     limit: Annotated[int, "The number of records per page."] = 100,
-) -> dict[str, Union[int, str]]:
+    cursor: Annotated[
+        Optional[str], "The cursor returned in the X-Next-Cursor header."
+    ] = None,
+) -> dict[str, Union[int, str, Cursor]]:
     """Get the paging parameters.
 
+    Pages can be selected with an offset (`start`), or with the cursor returned with
+    the previous page, which stays fast however deep the page is.
+
     :param start: The item to start at (the offset).
     :param limit: The number of records per page.
+    :param cursor: The cursor returned in the X-Next-Cursor header.
     :return: The paging parameters.
     """
     return {
         "start": start,
         "limit": limit,
+        "cursor": None if cursor is None else decode_cursor(cursor),
     }
+
+
+def set_next_cursor(
+    response: Response,
+    items: Sequence[Any],
+    keys: Sequence[str],
+    limit: Optional[int],
+) -> None:
+    """Set the X-Next-Cursor header, if there is a page after this one.
+
+    :param response: The response to set the header on.
+    :param items: The items of the current page.
+    :param keys: The names of the key attributes the items are ordered by.
+    :param limit: The page size.
+    """
+    cursor = next_cursor(items, keys, limit)
+    if cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+
+
+def page_response(
+    items: Sequence[Any], keys: Sequence[str], limit: Optional[int]
+) -> ORJSONResponse:
+    """Serialize a page of rows with orjson, with its X-Next-Cursor header.
+
+    Returning the response skips FastAPI's `jsonable_encoder`, so this is for the
+    dataclass rows of `service.rows`, which orjson serializes natively.
+
+    :param items: The rows of the current page.
+    :param keys: The names of the key attributes the rows are ordered by.
+    :param limit: The page size.
+    :return: The response.
+    """
+    response = ORJSONResponse(items)
+    set_next_cursor(response, items, keys, limit)
+    return response
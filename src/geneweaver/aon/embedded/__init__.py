@@ -0,0 +1,117 @@
+"""Query the AON offline, from a snapshot file.
+
+The functions here mirror those of `geneweaver.aon.service`, without their database
+session argument, and read a snapshot written by `gwaon load snapshot`. Nothing is
+imported or mapped until the first query, and this package does not depend on
+SQLAlchemy, the API or the loaders.
+
+The snapshot is the one set with `set_snapshot`, or else the one named by the
+`GENEWEAVER_AON_SNAPSHOT` environment variable. Use
+`geneweaver.aon.embedded.client.SnapshotClient` directly to query several snapshots.
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, List, Optional, Union
+
+from geneweaver.aon.core.convert_rules import agr_ref_to_ode, agr_refs_to_ode
+
+if TYPE_CHECKING:
+    from geneweaver.aon.embedded.client import (
+        Gene,
+        Homolog,
+        Ortholog,
+        SnapshotClient,
+    )
+
+SNAPSHOT_ENV_VAR = "GENEWEAVER_AON_SNAPSHOT"
+
+__all__ = [
+    "SNAPSHOT_ENV_VAR",
+    "agr_ref_to_ode",
+    "agr_refs_to_ode",
+    "gene_by_id",
+    "gene_by_ref_id",
+    "get_client",
+    "get_genes",
+    "get_homologs",
+    "get_orthologs",
+    "ode_ref_to_agr",
+    "ode_refs_to_agr",
+    "set_snapshot",
+]
+
+_client: Optional["SnapshotClient"] = None
+_client_lock = threading.Lock()
+
+
+def set_snapshot(path: Union[str, Path, None]) -> None:
+    """Set the snapshot the module level functions query.
+
+    :param path: The snapshot path, or None to fall back to the environment.
+    """
+    global _client
+    with _client_lock:
+        if path is None:
+            _client = None
+        else:
+            from geneweaver.aon.embedded.client import SnapshotClient
+
+            _client = SnapshotClient(Path(path))
+
+
+def get_client() -> "SnapshotClient":
+    """Get the client of the default snapshot.
+
+    :return: The client.
+    :raises RuntimeError: If no snapshot was set and the environment names none.
+    """
+    global _client
+    if _client is None:
+        path = os.environ.get(SNAPSHOT_ENV_VAR)
+        if not path:
+            raise RuntimeError(
+                f"No snapshot, call set_snapshot or set {SNAPSHOT_ENV_VAR}."
+            )
+        from geneweaver.aon.embedded.client import SnapshotClient
+
+        with _client_lock:
+            if _client is None:
+                _client = SnapshotClient(Path(path))
+    return _client
+
+
+def get_orthologs(**filters: Any) -> List["Ortholog"]:  # noqa: ANN401
+    """Get orthologs, see `SnapshotClient.get_orthologs`."""
+    return get_client().get_orthologs(**filters)
+
+
+def get_homologs(**filters: Any) -> List["Homolog"]:  # noqa: ANN401
+    """Get homologs, see `SnapshotClient.get_homologs`."""
+    return get_client().get_homologs(**filters)
+
+
+def get_genes(**filters: Any) -> List["Gene"]:  # noqa: ANN401
+    """Get genes, see `SnapshotClient.get_genes`."""
+    return get_client().get_genes(**filters)
+
+
+def gene_by_id(gene_id: int) -> Optional["Gene"]:
+    """Get a gene by id, see `SnapshotClient.gene_by_id`."""
+    return get_client().gene_by_id(gene_id)
+
+
+def gene_by_ref_id(ref_id: str) -> List["Gene"]:
+    """Get a gene by reference id, see `SnapshotClient.gene_by_ref_id`."""
+    return get_client().gene_by_ref_id(ref_id)
+
+
+def ode_refs_to_agr(ode_refs: List[str]) -> List[str]:
+    """Convert reference IDs to AGR format, see `SnapshotClient.ode_refs_to_agr`."""
+    return get_client().ode_refs_to_agr(ode_refs)
+
+
+def ode_ref_to_agr(ode_ref: str) -> str:
+    """Convert a reference ID to AGR format, see `SnapshotClient.ode_ref_to_agr`."""
+    return get_client().ode_ref_to_agr(ode_ref)
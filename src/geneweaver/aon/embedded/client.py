@@ -0,0 +1,323 @@
+"""Query a snapshot file with the same functions as `geneweaver.aon.service`."""
+
+import threading
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from geneweaver.aon.core.convert_rules import agr_ref_candidates, agr_refs_to_ode
+from geneweaver.aon.embedded.graph import OrthologIndex, csr_range
+from geneweaver.aon.embedded.snapshot import Snapshot, StringTable
+
+Cursor = Tuple[int, ...]
+
+
+class InvalidCursorError(ValueError):
+    """A paging cursor that was not created for the query it is used with."""
+
+
+class Gene(NamedTuple):
+    """A gene, with the columns of `geneweaver.aon.models.Gene`."""
+
+    gn_id: int
+    gn_ref_id: str
+    gn_prefix: str
+    sp_id: int
+
+
+class Ortholog(NamedTuple):
+    """An ortholog, with the columns of `geneweaver.aon.models.Ortholog`."""
+
+    ort_id: int
+    from_gene: int
+    to_gene: int
+    ort_is_best: Optional[bool]
+    ort_is_best_revised: Optional[bool]
+    ort_is_best_is_adjusted: Optional[bool]
+    ort_num_possible_match_algorithms: Optional[int]
+    ort_source_name: str
+
+
+class Homolog(NamedTuple):
+    """A homolog, with the columns of `geneweaver.aon.models.Homology`."""
+
+    hom_id: int
+    gn_id: int
+    sp_id: int
+    hom_source_name: str
+
+
+def _check_cursor(cursor: Optional[Cursor], length: int) -> None:
+    """Check that a cursor has one value per paging key."""
+    if cursor is not None and len(cursor) != length:
+        raise InvalidCursorError("Invalid cursor.")
+
+
+def _page(start: Optional[int], limit: Optional[int]) -> Tuple[int, Optional[int]]:
+    """Get the slice bounds of a page."""
+    first = start or 0
+    return first, None if limit is None else first + limit
+
+
+class SnapshotClient:
+    """The genes, orthologs and homologs of a snapshot file.
+
+    The file is mapped on first use and its arrays are read in place, so a client
+    costs little more than the pages of the file it touches.
+    """
+
+    def __init__(self, path: Path, verify: bool = False) -> None:
+        """Create a client, without opening the snapshot yet.
+
+        :param path: The snapshot path.
+        :param verify: Whether to check the checksum of the snapshot when opening it,
+            which reads the whole file.
+        """
+        self.path = Path(path)
+        self.verify = verify
+        self._snapshot: Optional[Snapshot] = None
+        self._orthologs: Optional[OrthologIndex] = None
+        self._lock = threading.Lock()
+
+    @property
+    def snapshot(self) -> Snapshot:
+        """Get the snapshot, mapping it on first use."""
+        if self._snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = Snapshot(self.path, verify=self.verify)
+        return self._snapshot
+
+    @property
+    def orthologs(self) -> OrthologIndex:
+        """Get the ortholog index of the snapshot."""
+        if self._orthologs is None:
+            self._orthologs = OrthologIndex.from_snapshot(self.snapshot)
+        return self._orthologs
+
+    @property
+    def version_id(self) -> int:
+        """Get the schema version id the snapshot was written for."""
+        return self.snapshot.version_id
+
+    def _strings(self, name: str) -> StringTable:
+        return self.snapshot.strings(name)
+
+    def _gene(self, gn_id: int) -> Gene:
+        prefix = self.snapshot["gene_prefix"][gn_id]
+        return Gene(
+            gn_id=gn_id,
+            gn_ref_id=self._strings("gene_ref_ids")[gn_id],
+            gn_prefix=self._strings("gene_prefix_names")[prefix],
+            sp_id=self.snapshot["gene_species"][gn_id],
+        )
+
+    def _gene_exists(self, gn_id: int) -> bool:
+        offsets = self.snapshot["gene_ref_ids.offsets"]
+        return 0 < gn_id + 1 < len(offsets) and offsets[gn_id] != offsets[gn_id + 1]
+
+    def gene_by_id(self, gene_id: int) -> Optional[Gene]:
+        """Get a gene by id.
+
+        :param gene_id: The gene id to search for.
+        :return: The gene with the id, or None.
+        """
+        return self._gene(gene_id) if self._gene_exists(gene_id) else None
+
+    def gene_by_ref_id(self, ref_id: str) -> List[Gene]:
+        """Get a gene by reference id.
+
+        :param ref_id: The reference id to search for.
+        :return: The gene with the reference id.
+        """
+        order, ref_ids = self.snapshot["gene_ref_order"], self._strings("gene_ref_ids")
+        # Binary search for the first gene with the reference, in reference order.
+        position, end = 0, len(order)
+        while position < end:
+            middle = (position + end) // 2
+            if ref_ids[order[middle]] < ref_id:
+                position = middle + 1
+            else:
+                end = middle
+        genes = []
+        while position < len(order) and ref_ids[order[position]] == ref_id:
+            genes.append(self._gene(order[position]))
+            position += 1
+        return genes
+
+    def get_genes(
+        self,
+        species_id: Optional[int] = None,
+        prefix: Optional[str] = None,
+        start: Optional[int] = None,
+        limit: Optional[int] = 1000,
+        cursor: Optional[Cursor] = None,
+    ) -> List[Gene]:
+        """Get all genes with optional filtering.
+
+        :param species_id: The species id to filter by.
+        :param prefix: The gene prefix to filter by.
+        :param start: The start index for paging.
+        :param limit: The limit for paging.
+        :param cursor: The key of the last gene of the previous page.
+        :return: All genes with optional filtering.
+        """
+        _check_cursor(cursor, 1)
+        species, prefixes = self.snapshot["gene_species"], self.snapshot["gene_prefix"]
+        prefix_names = self._strings("gene_prefix_names")
+        prefix_index = (
+            None
+            if prefix is None
+            else next((i for i, name in enumerate(prefix_names) if name == prefix), -1)
+        )
+        first_id = 0 if cursor is None else cursor[0] + 1
+        matches = (
+            gn_id
+            for gn_id in range(max(first_id, 0), len(species))
+            if self._gene_exists(gn_id)
+            and (species_id is None or species[gn_id] == species_id)
+            and (prefix_index is None or prefixes[gn_id] == prefix_index)
+        )
+        first, last = _page(start, limit)
+        return [self._gene(gn_id) for gn_id in islice(matches, first, last)]
+
+    def get_orthologs(
+        self,
+        from_species: Optional[int] = None,
+        to_species: Optional[int] = None,
+        from_gene_id: Optional[int] = None,
+        to_gene_id: Optional[int] = None,
+        algorithm_id: Optional[int] = None,
+        possible_match_algorithms: Optional[int] = None,
+        best: Optional[bool] = None,
+        revised: Optional[bool] = None,
+        start: Optional[int] = None,
+        limit: Optional[int] = 1000,
+        cursor: Optional[Cursor] = None,
+    ) -> List[Ortholog]:
+        """Get orthologs with dynamic optional filters.
+
+        :param from_species: The species to get orthologs from.
+        :param to_species: The species to get orthologs to.
+        :param from_gene_id: The gene id to get orthologs from.
+        :param to_gene_id: The gene id to get orthologs to.
+        :param algorithm_id: The algorithm id to get orthologs from.
+        :param possible_match_algorithms: The number of possible match algorithms.
+        :param best: The best orthologs.
+        :param revised: The revised orthologs.
+        :param start: The start index for paging.
+        :param limit: The limit for paging.
+        :param cursor: The key of the last ortholog of the previous page.
+        :return: The orthologs for the provided query.
+        """
+        _check_cursor(cursor, 1)
+        index = self.orthologs
+        matches = index.find(
+            from_species=from_species,
+            to_species=to_species,
+            from_gene_id=from_gene_id,
+            to_gene_id=to_gene_id,
+            algorithm_id=algorithm_id,
+            possible_match_algorithms=possible_match_algorithms,
+            best=best,
+            revised=revised,
+            start=start,
+            limit=limit,
+            after_ort_id=None if cursor is None else cursor[0],
+        )
+        return [Ortholog(*index.edge(i)) for i in matches]
+
+    def get_homologs(
+        self,
+        homolog_id: Optional[int] = None,
+        source_name: Optional[str] = None,
+        species_id: Optional[int] = None,
+        gene_id: Optional[int] = None,
+        start: Optional[int] = None,
+        limit: Optional[int] = 1000,
+        cursor: Optional[Cursor] = None,
+    ) -> List[Homolog]:
+        """Get homologs with optional filters.
+
+        Results are ordered by `hom_id` then `gn_id`, as they are from the database.
+
+        :param homolog_id: The homolog ID.
+        :param source_name: The source name.
+        :param species_id: The species ID.
+        :param gene_id: The gene ID.
+        :param start: The start index for paging.
+        :param limit: The number of results to return.
+        :param cursor: The key of the last homolog of the previous page.
+        :return: The homologs with optional filters.
+        """
+        _check_cursor(cursor, 2)
+        snapshot = self.snapshot
+        hom_ids, genes = snapshot["homology_ids"], snapshot["homology_genes"]
+        sources, species = snapshot["homology_sources"], snapshot["gene_species"]
+        source_names = self._strings("homology_source_names")
+
+        if homolog_id is not None:
+            rows: Iterable[int] = csr_range(snapshot["homology_offsets"], homolog_id)
+        elif gene_id is not None:
+            gene_rows = snapshot["gene_homology_rows"]
+            rows = (
+                gene_rows[i]
+                for i in csr_range(snapshot["gene_homology_offsets"], gene_id)
+            )
+        else:
+            rows = range(len(hom_ids))
+
+        checks: List[Callable[[int], bool]] = []
+        if gene_id is not None:
+            checks.append(lambda i: genes[i] == gene_id)
+        if source_name is not None:
+            source = next(
+                (s for s, name in enumerate(source_names) if name == source_name), -1
+            )
+            checks.append(lambda i: sources[i] == source)
+        if species_id is not None:
+            checks.append(lambda i: species[genes[i]] == species_id)
+        if cursor is not None:
+            checks.append(lambda i: (hom_ids[i], genes[i]) > cursor)
+
+        # Rows are stored in (hom_id, gn_id) order, and a gene's rows in hom_id order.
+        matches = [i for i in rows if all(check(i) for check in checks)]
+        first, last = _page(start, limit)
+        return [
+            Homolog(hom_ids[i], genes[i], species[genes[i]], source_names[sources[i]])
+            for i in matches[first:last]
+        ]
+
+    def ode_refs_to_agr(self, ode_refs: Iterable[str]) -> List[str]:
+        """Convert many gene reference IDs from Geneweaver to AGR format.
+
+        Each reference becomes the first of its candidate AGR forms that is a gene of
+        the snapshot, or is returned unchanged if none is.
+
+        :param ode_refs: The gene reference IDs from Geneweaver.
+        :return: The gene reference IDs in AGR format, in the same order as `ode_refs`.
+        """
+        converted: Dict[str, str] = {}
+        refs = []
+        for ode_ref in ode_refs:
+            if ode_ref not in converted:
+                converted[ode_ref] = next(
+                    (
+                        ref
+                        for ref in agr_ref_candidates(ode_ref)
+                        if self.gene_by_ref_id(ref)
+                    ),
+                    ode_ref,
+                )
+            refs.append(converted[ode_ref])
+        return refs
+
+    def ode_ref_to_agr(self, ode_ref: str) -> str:
+        """Convert a gene reference ID from Geneweaver to AGR format.
+
+        :param ode_ref: The gene reference ID from Geneweaver.
+        :return: The gene reference ID in AGR format.
+        """
+        return self.ode_refs_to_agr([ode_ref])[0]
+
+    agr_refs_to_ode = staticmethod(agr_refs_to_ode)
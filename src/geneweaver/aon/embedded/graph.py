@@ -0,0 +1,384 @@
+"""The ortholog graph of a schema version, as compact arrays.
+
+- Edges are stored in CSR (compressed sparse row) layout: the edges of a gene are
+  the contiguous slice `from_offsets[gn_id]:from_offsets[gn_id + 1]`, ordered by
+  `ort_id`, and a second CSR index over `to_gene` serves the reverse lookup.
+- The best, revised and adjusted flags are packed as bits of one byte per edge,
+  with a second bit each for NULL, and a NULL number of possible match algorithms
+  is stored as `NUM_POSSIBLE_NULL`, so that edges read back as the database rows.
+- The algorithms of an edge are a bitmask, one bit per algorithm.
+
+The arrays are either built in memory, or zero-copy views of a snapshot file, see
+`geneweaver.aon.embedded.snapshot`.
+"""
+
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from geneweaver.aon.embedded.snapshot import Snapshot
+
+FLAG_IS_BEST = 1
+FLAG_IS_BEST_REVISED = 2
+FLAG_IS_BEST_IS_ADJUSTED = 4
+FLAG_IS_BEST_NULL = 8
+FLAG_IS_BEST_REVISED_NULL = 16
+FLAG_IS_BEST_IS_ADJUSTED_NULL = 32
+
+# the largest unsigned 16 bit value, far above any number of algorithms
+NUM_POSSIBLE_NULL = 0xFFFF
+
+MAX_ALGORITHMS = 64
+
+# OrthologIndex attribute -> snapshot section
+SNAPSHOT_SECTIONS = {
+    "ort_ids": "ortholog_ids",
+    "from_genes": "ortholog_from_genes",
+    "to_genes": "ortholog_to_genes",
+    "flags": "ortholog_flags",
+    "algorithms": "ortholog_algorithms",
+    "num_possible": "ortholog_num_possible",
+    "sources": "ortholog_sources",
+    "from_offsets": "ortholog_from_offsets",
+    "to_offsets": "ortholog_to_offsets",
+    "to_edges": "ortholog_to_edges",
+}
+
+EdgeRow = Tuple[
+    int,
+    int,
+    int,
+    Optional[bool],
+    Optional[bool],
+    Optional[bool],
+    Optional[int],
+    str,
+    Optional[Sequence[int]],
+]
+Edge = Tuple[
+    int, int, int, Optional[bool], Optional[bool], Optional[bool], Optional[int], str
+]
+
+
+def _flag(value: Optional[bool], flag: int, null_flag: int) -> int:
+    """Get the bits of a nullable boolean column."""
+    if value is None:
+        return null_flag
+    return flag if value else 0
+
+
+def _flag_value(flags: int, flag: int, null_flag: int) -> Optional[bool]:
+    """Read a nullable boolean column back from its bits."""
+    if flags & null_flag:
+        return None
+    return bool(flags & flag)
+
+
+def csr_offsets(keys: Sequence[int], size: int) -> array:
+    """Build the CSR offsets of rows grouped by an integer key.
+
+    The rows of key `k` are `offsets[k]:offsets[k + 1]` once the rows are grouped
+    by key, see `csr_rows`.
+
+    :param keys: The key of each row.
+    :param size: One more than the largest key.
+    :return: The `size + 1` offsets.
+    """
+    offsets = array("q", [0]) * (size + 1)
+    for key in keys:
+        offsets[key + 1] += 1
+    for key in range(size):
+        offsets[key + 1] += offsets[key]
+    return offsets
+
+
+def csr_rows(keys: Sequence[int], offsets: Sequence[int]) -> array:
+    """Group row indexes by key, keeping the rows of each key in order.
+
+    :param keys: The key of each row.
+    :param offsets: The CSR offsets of the keys, from `csr_offsets`.
+    :return: The row indexes, grouped by key.
+    """
+    rows = array("q", [0]) * len(keys)
+    position = array("q", offsets)
+    for row, key in enumerate(keys):
+        rows[position[key]] = row
+        position[key] += 1
+    return rows
+
+
+def csr_range(offsets: Sequence[int], key: int) -> range:
+    """Get the rows of a key in a CSR index, empty if the key is out of range.
+
+    :param offsets: The CSR offsets.
+    :param key: The key.
+    :return: The range of row positions.
+    """
+    if key < 0 or key + 1 >= len(offsets):
+        return range(0)
+    return range(offsets[key], offsets[key + 1])
+
+
+class OrthologIndex:
+    """The orthologs of a schema version, in CSR layout."""
+
+    def __init__(
+        self,
+        gene_species: Iterable[Tuple[int, int]],
+        edges: Iterable[EdgeRow],
+        algorithm_ids: Iterable[int],
+    ) -> None:
+        """Build the index.
+
+        :param gene_species: `(gn_id, sp_id)` tuples of every gene.
+        :param edges: `(ort_id, from_gene, to_gene, ort_is_best, ort_is_best_revised,
+            ort_is_best_is_adjusted, ort_num_possible_match_algorithms,
+            ort_source_name, alg_ids)` tuples, ordered by `from_gene` then `ort_id`.
+        :param algorithm_ids: The ids of every algorithm.
+        :raises ValueError: If there are more algorithms than fit in the bitmask.
+        """
+        self.algorithm_bits: Dict[int, int] = {
+            alg_id: bit for bit, alg_id in enumerate(sorted(algorithm_ids))
+        }
+        if len(self.algorithm_bits) > MAX_ALGORITHMS:
+            raise ValueError(f"More than {MAX_ALGORITHMS} algorithms.")
+
+        self.gene_species = array("q")
+        for gn_id, sp_id in gene_species:
+            if gn_id >= len(self.gene_species):
+                self.gene_species.extend([0] * (gn_id + 1 - len(self.gene_species)))
+            self.gene_species[gn_id] = sp_id
+
+        self.ort_ids = array("q")
+        self.from_genes = array("q")
+        self.to_genes = array("q")
+        self.flags = array("B")
+        self.algorithms = array("Q")
+        self.num_possible = array("H")
+        self.sources = array("B")
+        self.source_names: List[str] = []
+        self._add_edges(edges)
+
+        num_genes = max(
+            len(self.gene_species),
+            max(self.from_genes, default=-1) + 1,
+            max(self.to_genes, default=-1) + 1,
+        )
+        self.from_offsets = csr_offsets(self.from_genes, num_genes)
+        self.to_offsets = csr_offsets(self.to_genes, num_genes)
+        self.to_edges = csr_rows(self.to_genes, self.to_offsets)
+
+    @classmethod
+    def from_snapshot(
+        cls: Type["OrthologIndex"], snapshot: Snapshot
+    ) -> "OrthologIndex":
+        """Get the index stored in a snapshot, without copying its arrays.
+
+        :param snapshot: The snapshot.
+        :return: The index, backed by the snapshot's memory map.
+        """
+        index = cls.__new__(cls)
+        index.algorithm_bits = {
+            alg_id: bit for bit, alg_id in enumerate(snapshot["algorithm_ids"])
+        }
+        index.gene_species = snapshot["gene_species"]
+        for attribute, section in SNAPSHOT_SECTIONS.items():
+            setattr(index, attribute, snapshot[section])
+        index.source_names = list(snapshot.strings("ortholog_source_names"))
+        return index
+
+    def sections(self) -> Dict[str, array]:
+        """Get the arrays of the index, by snapshot section name.
+
+        The source names are left to the caller, as they are not an array.
+
+        :return: The snapshot sections.
+        """
+        sections = {
+            "algorithm_ids": array("q", sorted(self.algorithm_bits)),
+            "gene_species": self.gene_species,
+        }
+        for attribute, section in SNAPSHOT_SECTIONS.items():
+            sections[section] = getattr(self, attribute)
+        return sections
+
+    def __len__(self) -> int:
+        """Get the number of orthologs."""
+        return len(self.ort_ids)
+
+    def _add_edges(self, edges: Iterable[EdgeRow]) -> None:
+        """Append the edges to the per-edge arrays."""
+        bits = self.algorithm_bits
+        source_index: Dict[str, int] = {}
+        for (
+            ort_id,
+            from_gene,
+            to_gene,
+            is_best,
+            is_best_revised,
+            is_best_is_adjusted,
+            num_possible,
+            source_name,
+            alg_ids,
+        ) in edges:
+            self.ort_ids.append(ort_id)
+            self.from_genes.append(from_gene)
+            self.to_genes.append(to_gene)
+            self.flags.append(
+                _flag(is_best, FLAG_IS_BEST, FLAG_IS_BEST_NULL)
+                | _flag(
+                    is_best_revised, FLAG_IS_BEST_REVISED, FLAG_IS_BEST_REVISED_NULL
+                )
+                | _flag(
+                    is_best_is_adjusted,
+                    FLAG_IS_BEST_IS_ADJUSTED,
+                    FLAG_IS_BEST_IS_ADJUSTED_NULL,
+                )
+            )
+            mask = 0
+            for alg_id in alg_ids or ():
+                mask |= 1 << bits[alg_id]
+            self.algorithms.append(mask)
+            self.num_possible.append(
+                NUM_POSSIBLE_NULL if num_possible is None else num_possible
+            )
+            source = source_index.get(source_name)
+            if source is None:
+                source = source_index[source_name] = len(self.source_names)
+                self.source_names.append(source_name)
+            self.sources.append(source)
+
+    def find(
+        self,
+        from_species: Optional[int] = None,
+        to_species: Optional[int] = None,
+        from_gene_id: Optional[int] = None,
+        to_gene_id: Optional[int] = None,
+        algorithm_id: Optional[int] = None,
+        possible_match_algorithms: Optional[int] = None,
+        best: Optional[bool] = None,
+        revised: Optional[bool] = None,
+        start: Optional[int] = None,
+        limit: Optional[int] = None,
+        after_ort_id: Optional[int] = None,
+    ) -> List[int]:
+        """Find the orthologs matching the filters of `get_orthologs`.
+
+        Queries on a from or to gene only look at that gene's edges, other queries
+        scan every edge.
+
+        :param from_species: The species to get orthologs from.
+        :param to_species: The species to get orthologs to.
+        :param from_gene_id: The gene id to get orthologs from.
+        :param to_gene_id: The gene id to get orthologs to.
+        :param algorithm_id: The algorithm id to get orthologs from.
+        :param possible_match_algorithms: The number of possible match algorithms.
+        :param best: The best orthologs.
+        :param revised: The revised orthologs.
+        :param start: The number of matches to skip.
+        :param limit: The maximum number of matches.
+        :param after_ort_id: Only match orthologs with a greater `ort_id`.
+        :return: The positions of the matching edges, ordered by `ort_id`.
+        """
+        filters = self._filters(
+            to_gene_id=to_gene_id,
+            from_species=from_species,
+            to_species=to_species,
+            algorithm_id=algorithm_id,
+            possible_match_algorithms=possible_match_algorithms,
+            best=best,
+            revised=revised,
+        )
+        if filters is None:
+            return []
+        if after_ort_id is not None:
+            ort_ids = self.ort_ids
+            filters.append(lambda i: ort_ids[i] > after_ort_id)
+
+        if from_gene_id:
+            # A gene's edges are already ordered by ort_id.
+            candidates = csr_range(self.from_offsets, from_gene_id)
+            matches = [i for i in candidates if all(check(i) for check in filters)]
+        else:
+            if to_gene_id:
+                candidates = (
+                    self.to_edges[i] for i in csr_range(self.to_offsets, to_gene_id)
+                )
+            else:
+                candidates = range(len(self))
+            matches = [i for i in candidates if all(check(i) for check in filters)]
+            matches.sort(key=self.ort_ids.__getitem__)
+
+        first = start or 0
+        last = None if limit is None else first + limit
+        return matches[first:last]
+
+    def _filters(
+        self,
+        to_gene_id: Optional[int],
+        from_species: Optional[int],
+        to_species: Optional[int],
+        algorithm_id: Optional[int],
+        possible_match_algorithms: Optional[int],
+        best: Optional[bool],
+        revised: Optional[bool],
+    ) -> Optional[List[Callable[[int], bool]]]:
+        """Build the edge predicates of a query.
+
+        :return: The predicates, or None if no edge can match.
+        """
+        species, from_genes, to_genes = (
+            self.gene_species,
+            self.from_genes,
+            self.to_genes,
+        )
+        filters: List[Callable[[int], bool]] = []
+        if to_gene_id:
+            filters.append(lambda i: to_genes[i] == to_gene_id)
+        if from_species is not None:
+            filters.append(lambda i: species[from_genes[i]] == from_species)
+        if to_species is not None:
+            filters.append(lambda i: species[to_genes[i]] == to_species)
+        if algorithm_id is not None:
+            if algorithm_id not in self.algorithm_bits:
+                return None
+            mask, algorithms = 1 << self.algorithm_bits[algorithm_id], self.algorithms
+            filters.append(lambda i: algorithms[i] & mask)
+        if possible_match_algorithms is not None:
+            if possible_match_algorithms == NUM_POSSIBLE_NULL:
+                return None
+            num_possible = self.num_possible
+            filters.append(lambda i: num_possible[i] == possible_match_algorithms)
+
+        # As in SQL, NULL flags match neither true nor false, so the NULL bit of a
+        # filtered flag must be clear.
+        flag_mask = (0 if best is None else FLAG_IS_BEST | FLAG_IS_BEST_NULL) | (
+            0 if revised is None else FLAG_IS_BEST_REVISED | FLAG_IS_BEST_REVISED_NULL
+        )
+        flag_value = (FLAG_IS_BEST if best else 0) | (
+            FLAG_IS_BEST_REVISED if revised else 0
+        )
+        if flag_mask:
+            flags = self.flags
+            filters.append(lambda i: flags[i] & flag_mask == flag_value)
+        return filters
+
+    def edge(self, index: int) -> Edge:
+        """Get the columns of an edge.
+
+        :param index: The position of the edge.
+        :return: `(ort_id, from_gene, to_gene, ort_is_best, ort_is_best_revised,
+            ort_is_best_is_adjusted, ort_num_possible_match_algorithms,
+            ort_source_name)`, with None for NULL columns.
+        """
+        flags = self.flags[index]
+        num_possible = self.num_possible[index]
+        return (
+            self.ort_ids[index],
+            self.from_genes[index],
+            self.to_genes[index],
+            _flag_value(flags, FLAG_IS_BEST, FLAG_IS_BEST_NULL),
+            _flag_value(flags, FLAG_IS_BEST_REVISED, FLAG_IS_BEST_REVISED_NULL),
+            _flag_value(flags, FLAG_IS_BEST_IS_ADJUSTED, FLAG_IS_BEST_IS_ADJUSTED_NULL),
+            None if num_possible == NUM_POSSIBLE_NULL else num_possible,
+            self.source_names[self.sources[index]],
+        )
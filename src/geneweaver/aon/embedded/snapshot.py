@@ -0,0 +1,214 @@
+"""Binary snapshot files of a schema version, read through a shared memory map.
+
+A snapshot holds the genes, species, algorithms, orthologs and homology clusters of
+a completed version as flat arrays. API workers open it with `mmap` and read the
+arrays through zero-copy `memoryview`s, so every worker on a host shares one copy of
+the data in the page cache instead of building its own.
+
+Layout, all integers little-endian:
+
+- a header: the magic bytes, the format version, the number of sections, the
+  schema version id and the SHA-256 of everything after the header,
+- a section table: one entry per section with its name, its `struct` format
+  character, and the byte offset and item count of its data,
+- the section data, each aligned to 8 bytes.
+
+Arrays indexed by `gn_id` or `hom_id` have one item per id up to the largest, with
+zeros for unused ids. Strings are stored as a `<name>.offsets` section of offsets
+into a `<name>.data` section of UTF-8 bytes.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Sequence
+
+MAGIC = b"GWAONSNP"
+# Version 2 stores NULL ortholog flags and counts, see `embedded.graph`.
+FORMAT_VERSION = 2
+FILE_SUFFIX = ".gwaon"
+
+HEADER = struct.Struct("<8sIIq32s")
+SECTION = struct.Struct("<32s4sQQ")
+ALIGNMENT = 8
+
+# The array typecodes sections are written with, and their item sizes.
+ITEM_SIZES = {"q": 8, "Q": 8, "B": 1, "H": 2}
+
+
+class SnapshotError(ValueError):
+    """A snapshot file is invalid, or was written in an unsupported format."""
+
+
+def snapshot_path(directory: str, schema_name: str) -> Path:
+    """Get the path of a schema version's snapshot.
+
+    :param directory: The snapshot directory.
+    :param schema_name: The schema name of the version.
+    :return: The snapshot path.
+    """
+    return Path(directory) / f"{schema_name}{FILE_SUFFIX}"
+
+
+def _check_byte_order() -> None:
+    """Snapshots are little-endian and read without conversion."""
+    if sys.byteorder != "little":
+        raise SnapshotError("Snapshots can only be used on little-endian hosts.")
+
+
+class StringTable(Sequence[str]):
+    """A read-only sequence of strings stored as offsets into UTF-8 data."""
+
+    def __init__(self, offsets: Sequence[int], data: Sequence[int]) -> None:
+        """Wrap the offsets and data sections of a string table.
+
+        :param offsets: The start offset of each string, and the end of the last.
+        :param data: The UTF-8 bytes of every string.
+        """
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self) -> int:
+        """Get the number of strings."""
+        return max(len(self.offsets) - 1, 0)
+
+    def __getitem__(self, index: int) -> str:
+        """Decode a string."""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("String table index out of range.")
+        return bytes(self.data[self.offsets[index] : self.offsets[index + 1]]).decode()
+
+
+def string_sections(name: str, values: Iterable[str]) -> Dict[str, array]:
+    """Encode strings as the offsets and data sections of a string table.
+
+    :param name: The name of the table.
+    :param values: The strings.
+    :return: The two sections, by name.
+    """
+    offsets = array("q", [0])
+    data = bytearray()
+    for value in values:
+        data += (value or "").encode()
+        offsets.append(len(data))
+    return {f"{name}.offsets": offsets, f"{name}.data": array("B", data)}
+
+
+class Snapshot:
+    """A memory mapped snapshot file."""
+
+    def __init__(self, path: Path, verify: bool = True) -> None:
+        """Map a snapshot file.
+
+        :param path: The snapshot path.
+        :param verify: Whether to check the checksum, which reads the whole file.
+        :raises SnapshotError: If the file is not a valid snapshot.
+        """
+        _check_byte_order()
+        self.path = Path(path)
+        with open(self.path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        if len(buffer) < HEADER.size:
+            raise SnapshotError(f"{self.path} is too short to be a snapshot.")
+        magic, format_version, count, version_id, checksum = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise SnapshotError(f"{self.path} is not a snapshot.")
+        if format_version != FORMAT_VERSION:
+            raise SnapshotError(
+                f"{self.path} has format version {format_version}, "
+                f"expected {FORMAT_VERSION}."
+            )
+        if verify and hashlib.sha256(buffer[HEADER.size :]).digest() != checksum:
+            raise SnapshotError(f"{self.path} is corrupt, its checksum differs.")
+        self.version_id = version_id
+
+        self._sections: Dict[str, memoryview] = {}
+        for position in range(count):
+            name, fmt, offset, items = SECTION.unpack_from(
+                buffer, HEADER.size + position * SECTION.size
+            )
+            fmt = fmt.rstrip(b"\0").decode()
+            if fmt not in ITEM_SIZES:
+                raise SnapshotError(f"{self.path} has an unknown section type {fmt}.")
+            end = offset + items * ITEM_SIZES[fmt]
+            if end > len(buffer):
+                raise SnapshotError(f"{self.path} is truncated.")
+            self._sections[name.rstrip(b"\0").decode()] = buffer[offset:end].cast(fmt)
+
+    def __contains__(self, name: str) -> bool:
+        """Check whether the snapshot has a section."""
+        return name in self._sections
+
+    def __getitem__(self, name: str) -> memoryview:
+        """Get a zero-copy view of a section."""
+        return self._sections[name]
+
+    def strings(self, name: str) -> StringTable:
+        """Get a string table.
+
+        :param name: The name of the table.
+        :return: The strings.
+        """
+        return StringTable(self[f"{name}.offsets"], self[f"{name}.data"])
+
+
+def write_snapshot(path: Path, version_id: int, sections: Dict[str, array]) -> int:
+    """Write a snapshot file.
+
+    The file is written next to its destination and moved into place, so readers
+    never see a partial snapshot.
+
+    :param path: The snapshot path.
+    :param version_id: The schema version id.
+    :param sections: The arrays to write, by section name.
+    :return: The size of the file in bytes.
+    """
+    _check_byte_order()
+    for name, values in sections.items():
+        if ITEM_SIZES.get(values.typecode) != values.itemsize:
+            raise SnapshotError(f"Section {name} has unsupported type.")
+
+    offset = _aligned(HEADER.size + SECTION.size * len(sections))
+    table = bytearray()
+    for name, values in sections.items():
+        table += SECTION.pack(
+            name.encode(), values.typecode.encode(), offset, len(values)
+        )
+        offset = _aligned(offset + len(values) * values.itemsize)
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f".{path.name}.tmp")
+    checksum = hashlib.sha256()
+    with open(temporary, "wb") as file:
+
+        def write(data: bytes) -> None:
+            checksum.update(data)
+            file.write(data)
+
+        file.write(b"\0" * HEADER.size)
+        write(table)
+        for values in sections.values():
+            write(b"\0" * (_aligned(file.tell()) - file.tell()))
+            write(memoryview(values).cast("B"))
+        size = file.tell()
+        file.seek(0)
+        file.write(
+            HEADER.pack(
+                MAGIC, FORMAT_VERSION, len(sections), version_id, checksum.digest()
+            )
+        )
+    os.replace(temporary, path)
+    return size
+
+
+def _aligned(offset: int) -> int:
+    """Round an offset up to the section alignment."""
+    return -(-offset // ALIGNMENT) * ALIGNMENT
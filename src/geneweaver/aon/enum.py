@@ -15,3 +15,25 @@ class InternalGeneIDType(Enum):
 
     AON = "aon"
     GW = "gw"
+
+
+class LoadBackend(Enum):
+    """Enum for selecting how orthologs are written during a data load."""
+
+    COPY = "copy"
+    ORM = "orm"
+
+
+class HomologyBackend(Enum):
+    """Enum for selecting where homology clusters are computed."""
+
+    PYTHON = "python"
+    SQL = "sql"
+
+
+class ExportFormat(Enum):
+    """Enum for selecting the format of a bulk export."""
+
+    NDJSON = "ndjson"
+    TSV = "tsv"
+    CSV = "csv"
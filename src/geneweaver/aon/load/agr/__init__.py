@@ -1,3 +1,3 @@
 """Module for the AGR based loading code."""
 
-from . import load, sources  # noqa: F401
+from . import bulk, load, parse, resolve, sources  # noqa: F401
@@ -0,0 +1,151 @@
+"""Bulk load orthologs into Postgres with COPY.
+
+This is the fast path for the ortholog stage of the AGR load. Instead of building an
+ORM `Ortholog` per row and flushing it through the session, rows for `ort_ortholog`
+and `ora_ortholog_algorithms` are streamed to the server with binary
+`COPY ... FROM STDIN`. The ORM based `add_ortholog_batch` remains available as a
+fallback.
+"""
+
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+from geneweaver.aon.load.agr.parse import OrthologRecord
+from geneweaver.aon.load.agr.resolve import IdResolver
+from psycopg import Connection, sql
+
+ORTHOLOG_COLUMNS = (
+    "ort_id",
+    "from_gene",
+    "to_gene",
+    "ort_is_best",
+    "ort_is_best_revised",
+    "ort_is_best_is_adjusted",
+    "ort_num_possible_match_algorithms",
+    "ort_source_name",
+)
+ORTHOLOG_TYPES = ["int4", "int4", "int4", "bool", "bool", "bool", "int4", "varchar"]
+
+ORTHOLOG_ALGORITHM_COLUMNS = ("ort_id", "alg_id")
+ORTHOLOG_ALGORITHM_TYPES = ["int4", "int4"]
+
+
+def _copy_statement(schema_name: str, table: str, columns: Iterable[str]) -> sql.SQL:
+    """Build a binary COPY FROM STDIN statement for a tenant table.
+
+    :param schema_name: The tenant schema name.
+    :param table: The table name.
+    :param columns: The columns that will be written.
+    :return: The COPY statement.
+    """
+    return sql.SQL("COPY {table} ({columns}) FROM STDIN (FORMAT BINARY)").format(
+        table=sql.Identifier(schema_name, table),
+        columns=sql.SQL(", ").join(sql.Identifier(c) for c in columns),
+    )
+
+
+def reserve_ortholog_ids(conn: Connection, schema_name: str, count: int) -> List[int]:
+    """Reserve `ort_id` values from the table's sequence.
+
+    Every id is taken with its own `nextval`, in a single statement, so ids taken
+    at the same time by another load or insert are never handed out twice. The ids
+    are increasing, but other sessions may take ids in between them.
+
+    :param conn: The AON database connection.
+    :param schema_name: The tenant schema name.
+    :param count: The number of ids to reserve.
+    :return: The reserved ids.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_get_serial_sequence(%s, 'ort_id')",
+            (f"{schema_name}.ort_ortholog",),
+        )
+        sequence = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT nextval(%s) FROM generate_series(1, %s)", (sequence, count)
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def ortholog_rows(
+    batch: Sequence[OrthologRecord],
+    ort_ids: Sequence[int],
+    resolver: IdResolver,
+    source_name: str = "AGR",
+) -> Iterator[tuple]:
+    """Build the `ort_ortholog` rows of a batch, in `ORTHOLOG_COLUMNS` order.
+
+    :param batch: The orthologs.
+    :param ort_ids: The id of each ortholog, see `reserve_ortholog_ids`.
+    :param resolver: The gene id resolver for the schema.
+    :param source_name: The value of `ort_source_name` for every row.
+    :return: A generator of rows.
+    """
+    for ort_id, record in zip(ort_ids, batch):
+        yield (
+            ort_id,
+            resolver.gene_id(record.from_gene.ref_id),
+            resolver.gene_id(record.to_gene.ref_id),
+            record.is_best,
+            record.is_best_revised,
+            record.is_best_is_adjusted,
+            record.num_possible_match_algorithms,
+            source_name,
+        )
+
+
+def ortholog_algorithm_rows(
+    batch: Sequence[OrthologRecord], ort_ids: Sequence[int], resolver: IdResolver
+) -> Iterator[Tuple[int, int]]:
+    """Build the `ora_ortholog_algorithms` rows of a batch.
+
+    :param batch: The orthologs.
+    :param ort_ids: The id of each ortholog, see `reserve_ortholog_ids`.
+    :param resolver: The algorithm id resolver for the schema.
+    :return: A generator of `(ort_id, alg_id)` rows.
+    """
+    for ort_id, record in zip(ort_ids, batch):
+        for algorithm in record.algorithms:
+            yield ort_id, resolver.algorithm_id(algorithm)
+
+
+def copy_ortholog_batch(
+    conn: Connection,
+    schema_name: str,
+    batch: List[OrthologRecord],
+    resolver: IdResolver,
+    source_name: str = "AGR",
+) -> None:
+    """Write a batch of orthologs and their algorithm links with binary COPY.
+
+    The batch is committed once both tables have been written.
+
+    :param conn: The AON database connection.
+    :param schema_name: The tenant schema name.
+    :param batch: The orthologs to write.
+    :param resolver: The gene and algorithm id resolver for the schema.
+    :param source_name: The value of `ort_source_name` for every row.
+    """
+    if not batch:
+        return
+
+    ort_ids = reserve_ortholog_ids(conn, schema_name, len(batch))
+
+    with conn.cursor() as cursor:
+        with cursor.copy(
+            _copy_statement(schema_name, "ort_ortholog", ORTHOLOG_COLUMNS)
+        ) as copy:
+            copy.set_types(ORTHOLOG_TYPES)
+            for row in ortholog_rows(batch, ort_ids, resolver, source_name):
+                copy.write_row(row)
+
+        with cursor.copy(
+            _copy_statement(
+                schema_name, "ora_ortholog_algorithms", ORTHOLOG_ALGORITHM_COLUMNS
+            )
+        ) as copy:
+            copy.set_types(ORTHOLOG_ALGORITHM_TYPES)
+            for row in ortholog_algorithm_rows(batch, ort_ids, resolver):
+                copy.write_row(row)
+
+    conn.commit()
@@ -0,0 +1,234 @@
+"""Single pass parser for the AGR orthology file.
+
+The AGR ORTHOLOGY-ALLIANCE file is several gigabytes uncompressed, so it is read
+exactly once. While streaming, the species, algorithms and genes are collected into
+sets and every ortholog row is staged in compact parallel arrays, so that the later
+load stages can insert them without touching the file again.
+"""
+
+import gzip
+from array import array
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, NamedTuple, TextIO, Tuple
+
+HEADER_COMMENT_PREFIX = "#"
+HEADER_COLUMN_PREFIX = "Gene1ID"
+
+IS_BEST_MAP = {"Yes": True, "No": False, "Yes_Adjusted": True}
+
+_FLAG_IS_BEST = 1
+_FLAG_IS_BEST_REVISED = 2
+_FLAG_IS_BEST_IS_ADJUSTED = 4
+
+_MAX_ALGORITHMS = 64
+
+
+class GeneRecord(NamedTuple):
+    """A gene as it appears in the AGR orthology file."""
+
+    ref_id: str
+    prefix: str
+    taxon_id: int
+    species_name: str
+
+
+class OrthologRecord(NamedTuple):
+    """A single ortholog row of the AGR orthology file."""
+
+    from_gene: GeneRecord
+    to_gene: GeneRecord
+    algorithms: Tuple[str, ...]
+    num_possible_match_algorithms: int
+    is_best: bool
+    is_best_revised: bool
+    is_best_is_adjusted: bool
+
+
+def _gene_record(ref_id: str, taxon: str, species_name: str) -> GeneRecord:
+    """Build a gene record from the raw columns of the orthology file.
+
+    :param ref_id: The gene reference id, e.g. `MGI:1234`.
+    :param taxon: The taxon column, e.g. `NCBITaxon:10090`.
+    :param species_name: The species name column.
+    :return: The gene record.
+    """
+    return GeneRecord(
+        ref_id=ref_id,
+        prefix=ref_id.split(":")[0],
+        taxon_id=int(taxon.split(":")[1]),
+        species_name=species_name,
+    )
+
+
+def parse_line(line: str) -> OrthologRecord:
+    """Parse a single data line of the orthology file.
+
+    :param line: The tab separated line.
+    :return: The parsed ortholog record.
+    """
+    spl = line.rstrip("\n").split("\t")
+    is_best = spl[11].strip()
+    return OrthologRecord(
+        from_gene=_gene_record(spl[0], spl[2], spl[3]),
+        to_gene=_gene_record(spl[4], spl[6], spl[7]),
+        algorithms=tuple(spl[8].split("|")),
+        num_possible_match_algorithms=int(spl[10].strip()),
+        is_best=IS_BEST_MAP[is_best],
+        is_best_revised=IS_BEST_MAP[spl[12].strip()],
+        is_best_is_adjusted=is_best == "Yes_Adjusted",
+    )
+
+
+def read_orthology_records(file: TextIO) -> Iterator[OrthologRecord]:
+    """Stream the ortholog records of an open orthology file.
+
+    The comment header (lines starting with `#`) and the column header line are
+    skipped, every other non-empty line is parsed into an `OrthologRecord`.
+
+    :param file: The open orthology file.
+    :return: A generator of ortholog records.
+    """
+    for line in file:
+        if not line.strip() or line.startswith(HEADER_COMMENT_PREFIX):
+            continue
+        if line.startswith(HEADER_COLUMN_PREFIX):
+            continue
+        yield parse_line(line)
+
+
+class OrthologyData:
+    """Everything needed to load a release, collected from one pass over the file.
+
+    Species, algorithms and genes are kept as de-duplicated maps. Orthologs are
+    staged in parallel arrays that reference genes and algorithms by their index, so
+    that millions of rows can be held without keeping a Python object per row.
+    """
+
+    def __init__(self) -> None:
+        """Initialize empty collections."""
+        # taxon id -> species name, of both genes of each row
+        self.species: Dict[int, str] = {}
+        # algorithm name -> bit position in the staged algorithm mask
+        self.algorithms: Dict[str, int] = {}
+        # gene reference id -> index into `gene_records`
+        self.genes: Dict[str, int] = {}
+        self.gene_records: List[GeneRecord] = []
+
+        self._from_gene = array("I")
+        self._to_gene = array("I")
+        self._algorithms = array("Q")
+        self._num_possible = array("H")
+        self._flags = array("B")
+
+    def __len__(self) -> int:
+        """Get the number of staged orthologs."""
+        return len(self._flags)
+
+    def _gene_index(self, gene: GeneRecord) -> int:
+        """Get the index of a gene, registering it and its species if new."""
+        index = self.genes.get(gene.ref_id)
+        if index is None:
+            index = len(self.gene_records)
+            self.genes[gene.ref_id] = index
+            self.gene_records.append(gene)
+            self.species.setdefault(gene.taxon_id, gene.species_name)
+        return index
+
+    def _algorithm_mask(self, algorithms: Iterable[str]) -> int:
+        """Get the bitmask for a set of algorithms, registering any new ones."""
+        mask = 0
+        for name in algorithms:
+            bit = self.algorithms.get(name)
+            if bit is None:
+                bit = len(self.algorithms)
+                if bit >= _MAX_ALGORITHMS:
+                    raise ValueError(
+                        f"More than {_MAX_ALGORITHMS} algorithms in orthology file."
+                    )
+                self.algorithms[name] = bit
+            mask |= 1 << bit
+        return mask
+
+    def add(self, record: OrthologRecord) -> None:
+        """Collect and stage a single ortholog record.
+
+        :param record: The ortholog record.
+        """
+        self._from_gene.append(self._gene_index(record.from_gene))
+        self._to_gene.append(self._gene_index(record.to_gene))
+        self._algorithms.append(self._algorithm_mask(record.algorithms))
+        self._num_possible.append(record.num_possible_match_algorithms)
+        self._flags.append(
+            (_FLAG_IS_BEST if record.is_best else 0)
+            | (_FLAG_IS_BEST_REVISED if record.is_best_revised else 0)
+            | (_FLAG_IS_BEST_IS_ADJUSTED if record.is_best_is_adjusted else 0)
+        )
+
+    def orthologs(self) -> Iterator[OrthologRecord]:
+        """Iterate over the staged orthologs in file order.
+
+        :return: A generator of ortholog records.
+        """
+        algorithm_names = sorted(self.algorithms, key=self.algorithms.get)
+        genes = self.gene_records
+        for i in range(len(self)):
+            mask = self._algorithms[i]
+            flags = self._flags[i]
+            yield OrthologRecord(
+                from_gene=genes[self._from_gene[i]],
+                to_gene=genes[self._to_gene[i]],
+                algorithms=tuple(
+                    name
+                    for bit, name in enumerate(algorithm_names)
+                    if mask & (1 << bit)
+                ),
+                num_possible_match_algorithms=self._num_possible[i],
+                is_best=bool(flags & _FLAG_IS_BEST),
+                is_best_revised=bool(flags & _FLAG_IS_BEST_REVISED),
+                is_best_is_adjusted=bool(flags & _FLAG_IS_BEST_IS_ADJUSTED),
+            )
+
+    def ortholog_batches(
+        self, batch_size: int, batches_to_process: int = -1
+    ) -> Iterator[List[OrthologRecord]]:
+        """Iterate over the staged orthologs in batches.
+
+        :param batch_size: The number of orthologs per batch.
+        :param batches_to_process: The maximum number of batches, -1 for all.
+        :return: A generator of lists of ortholog records.
+        """
+        iterator = self.orthologs()
+        processed = 0
+        while batches_to_process == -1 or processed < batches_to_process:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                break
+            yield batch
+            processed += 1
+
+
+def open_orthology_file(ortho_file: str) -> TextIO:
+    """Open an orthology file for reading as text.
+
+    Files ending in `.gz` are decompressed on the fly while reading, so the
+    compressed download can be parsed without writing an uncompressed copy.
+
+    :param ortho_file: The path to the orthology file, optionally gzipped.
+    :return: The open text file.
+    """
+    if str(ortho_file).endswith(".gz"):
+        return gzip.open(ortho_file, "rt")
+    return open(ortho_file, "r")
+
+
+def parse_orthology_file(ortho_file: str) -> OrthologyData:
+    """Read the orthology file once and collect everything the load needs.
+
+    :param ortho_file: The path to the orthology file, optionally gzipped.
+    :return: The collected species, algorithms, genes and staged orthologs.
+    """
+    data = OrthologyData()
+    with open_orthology_file(ortho_file) as f:
+        for record in read_orthology_records(f):
+            data.add(record)
+    return data
@@ -0,0 +1,115 @@
+"""Resolve AGR gene reference ids and algorithm names to database ids.
+
+The resolver is built once per load, after genes and algorithms have been inserted,
+and is then shared by every ortholog batch. It only holds plain integers: gene ids
+are kept in an `array` aligned with a reference id -> position map, which can be the
+map already collected by the parser, so no extra copy of the reference ids is made.
+"""
+
+from array import array
+from typing import Dict, Iterable, Optional, Tuple, Type
+
+from geneweaver.aon.models import Algorithm, Gene
+from psycopg import Connection, sql
+from sqlalchemy.orm import Session
+
+
+class IdResolver:
+    """Map `gn_ref_id -> gn_id` and `alg_name -> alg_id` for a schema."""
+
+    def __init__(
+        self,
+        gene_rows: Iterable[Tuple[str, int]],
+        algorithm_rows: Iterable[Tuple[str, int]],
+        gene_positions: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """Build the resolver from `(ref_id, id)` and `(name, id)` rows.
+
+        :param gene_rows: `(gn_ref_id, gn_id)` pairs.
+        :param algorithm_rows: `(alg_name, alg_id)` pairs.
+        :param gene_positions: An existing `gn_ref_id -> position` map to index the
+            gene ids by, e.g. `OrthologyData.genes`. Genes that are not in this map
+            are skipped. If not provided, every gene row is indexed.
+        """
+        extend_positions = gene_positions is None
+        self._gene_positions = {} if gene_positions is None else gene_positions
+        self._gene_ids = array("l", [-1]) * len(self._gene_positions)
+        for ref_id, gn_id in gene_rows:
+            position = self._gene_positions.get(ref_id)
+            if position is None:
+                if not extend_positions:
+                    continue
+                position = len(self._gene_positions)
+                self._gene_positions[ref_id] = position
+            if position >= len(self._gene_ids):
+                self._gene_ids.extend([-1] * (position + 1 - len(self._gene_ids)))
+            self._gene_ids[position] = gn_id
+
+        self._algorithm_ids = dict(algorithm_rows)
+
+    @classmethod
+    def from_session(
+        cls: Type["IdResolver"],
+        db: Session,
+        gene_positions: Optional[Dict[str, int]] = None,
+    ) -> "IdResolver":
+        """Build the resolver from an ORM session.
+
+        :param db: The database session.
+        :param gene_positions: An existing `gn_ref_id -> position` map to reuse.
+        :return: The resolver.
+        """
+        return cls(
+            db.query(Gene.gn_ref_id, Gene.gn_id).yield_per(100000),
+            db.query(Algorithm.alg_name, Algorithm.alg_id),
+            gene_positions,
+        )
+
+    @classmethod
+    def from_connection(
+        cls: Type["IdResolver"],
+        conn: Connection,
+        schema_name: str,
+        gene_positions: Optional[Dict[str, int]] = None,
+    ) -> "IdResolver":
+        """Build the resolver from a psycopg connection.
+
+        :param conn: The AON database connection.
+        :param schema_name: The tenant schema name.
+        :param gene_positions: An existing `gn_ref_id -> position` map to reuse.
+        :return: The resolver.
+        """
+        with conn.cursor() as cursor:
+            cursor.execute(
+                sql.SQL("SELECT alg_name, alg_id FROM {table}").format(
+                    table=sql.Identifier(schema_name, "alg_algorithm")
+                )
+            )
+            algorithm_rows = cursor.fetchall()
+            cursor.execute(
+                sql.SQL("SELECT gn_ref_id, gn_id FROM {table}").format(
+                    table=sql.Identifier(schema_name, "gn_gene")
+                )
+            )
+            return cls(cursor, algorithm_rows, gene_positions)
+
+    def gene_id(self, ref_id: str) -> int:
+        """Get the `gn_id` of a gene reference id.
+
+        :param ref_id: The gene reference id.
+        :return: The gene id.
+        :raises KeyError: If the gene is not in the database.
+        """
+        gn_id = self._gene_ids[self._gene_positions[ref_id]]
+        if gn_id < 0:
+            raise KeyError(ref_id)
+        return gn_id
+
+    def algorithm_id(self, name: str) -> int:
+        """Get the `alg_id` of an algorithm name.
+
+        :param name: The algorithm name.
+        :return: The algorithm id.
+        :raises KeyError: If the algorithm is not in the database.
+        """
+        return self._algorithm_ids[name]
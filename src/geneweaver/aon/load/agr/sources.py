@@ -1,11 +1,29 @@
 """Download and prepare external source data for Geneweaver AON."""
 
 import gzip
+import hashlib
+import shutil
+import zlib
 from pathlib import Path
-from typing import Optional
+from typing import NamedTuple, Optional, Tuple
 
 import requests
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_DATA_INCREMENT = 28
+GZIP_MAGIC = b"\x1f\x8b"
+CHECKSUM_SUFFIX = ".sha256"
+PARTIAL_SUFFIX = ".part"
+
+
+class RemoteFile(NamedTuple):
+    """A downloadable file, as described by the server's response headers."""
+
+    url: str
+    etag: Optional[str]
+    size: Optional[int]
+    last_modified: Optional[str] = None
+
 
 def latest_agr_release() -> str:
     """Get the latest AGR release version.
@@ -42,29 +60,303 @@ def format_agr_orthology_download_url(
     )
 
 
+def probe_agr_orthology_url(url: str) -> Optional[RemoteFile]:
+    """Check whether a URL serves a gzip file, without downloading it.
+
+    A HEAD request rules out missing files, HTML error pages and empty responses.
+    The first two bytes are then requested with a Range header and compared to the
+    gzip magic number.
+
+    :param url: The URL to check.
+    :return: The remote file if the URL serves a gzip file, otherwise None.
+    """
+    response = requests.head(url, allow_redirects=True)
+    if not response.ok:
+        return None
+
+    if response.headers.get("Content-Type", "").startswith("text/"):
+        return None
+
+    size = response.headers.get("Content-Length")
+    size = int(size) if size is not None else None
+    if size == 0:
+        return None
+
+    with requests.get(
+        url, headers={"Range": "bytes=0-1"}, allow_redirects=True, stream=True
+    ) as magic_response:
+        if not magic_response.ok:
+            return None
+        magic = next(magic_response.iter_content(chunk_size=2), b"")[:2]
+    if magic != GZIP_MAGIC:
+        return None
+
+    return RemoteFile(
+        url=response.url,
+        etag=response.headers.get("ETag"),
+        size=size,
+        last_modified=response.headers.get("Last-Modified"),
+    )
+
+
+def find_agr_orthology_file(
+    version: str, max_data_increment: int = MAX_DATA_INCREMENT
+) -> RemoteFile:
+    """Find the latest data increment of the AGR orthology file for a release.
+
+    :param version: The AGR release version.
+    :param max_data_increment: The highest data increment to try.
+    :return: The remote orthology file.
+    :raises ValueError: If no data increment serves a gzip file.
+    """
+    for data_increment in range(max_data_increment, -1, -1):
+        url = format_agr_orthology_download_url(version, data_increment)
+        remote_file = probe_agr_orthology_url(url)
+        if remote_file is not None:
+            return remote_file
+
+    raise ValueError(f"Could not find the AGR orthology file for release {version}.")
+
+
+def file_checksum(file_path: str, chunk_size: int = DOWNLOAD_CHUNK_SIZE) -> str:
+    """Calculate the SHA-256 checksum of a file.
+
+    :param file_path: The file path.
+    :param chunk_size: The number of bytes to read at a time.
+    :return: The hex digest.
+    """
+    checksum = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            checksum.update(chunk)
+    return checksum.hexdigest()
+
+
+def read_checksum(file_path: str) -> Optional[str]:
+    """Read the recorded checksum of a file downloaded to the cache.
+
+    :param file_path: The file path.
+    :return: The recorded hex digest, or None if there is none.
+    """
+    checksum_path = Path(str(file_path) + CHECKSUM_SUFFIX)
+    if not checksum_path.exists():
+        return None
+    return checksum_path.read_text().strip()
+
+
+def is_cacheable(remote_file: RemoteFile) -> bool:
+    """Check whether a re-published remote file can be told apart from the original.
+
+    :param remote_file: The remote file.
+    :return: True if the server sent an ETag or a Last-Modified date.
+    """
+    return remote_file.etag is not None or remote_file.last_modified is not None
+
+
+def cache_path(remote_file: RemoteFile, cache_dir: str) -> Path:
+    """Get the location of a remote file in the download cache.
+
+    Files are stored in a directory named after a hash of their URL and ETag, or of
+    their Last-Modified date and size if the server sent no ETag, so a re-published
+    file gets a new cache entry.
+
+    :param remote_file: The remote file.
+    :param cache_dir: The download cache directory.
+    :return: The path the file is, or will be, cached at.
+    """
+    if remote_file.etag is not None:
+        version = remote_file.etag
+    else:
+        version = f"{remote_file.last_modified}\n{remote_file.size}"
+    key = hashlib.sha256(f"{remote_file.url}\n{version}".encode()).hexdigest()
+    return Path(cache_dir) / key / remote_file.url.split("/")[-1]
+
+
+class CorruptDownloadError(ValueError):
+    """A download whose data does not match its gzip trailers."""
+
+
+class GzipVerifier:
+    """Check a gzip stream against the CRC-32 and size in its trailers, as it is read.
+
+    Each member is decompressed and discarded chunk by chunk, so a truncated or
+    corrupted download is caught without holding the data or writing it out.
+    """
+
+    def __init__(self) -> None:
+        """Start before the first member of the stream."""
+        self._decompressor = None
+        self.members = 0
+
+    def update(self, chunk: bytes) -> None:
+        """Check the next chunk of the stream.
+
+        :param chunk: The compressed bytes.
+        :raises CorruptDownloadError: If the data or a trailer is corrupt.
+        """
+        try:
+            while chunk:
+                if self._decompressor is None:
+                    self._decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+                self._decompressor.decompress(chunk)
+                chunk = b""
+                if self._decompressor.eof:
+                    # the trailer matched, another member may follow
+                    chunk = self._decompressor.unused_data
+                    self._decompressor = None
+                    self.members += 1
+        except zlib.error as e:
+            raise CorruptDownloadError(f"Corrupt gzip data: {e}") from e
+
+    def verify(self) -> None:
+        """Check that the stream ended with a complete member.
+
+        :raises ValueError: If the stream is empty, or its last member has no
+            trailer.
+        """
+        if self._decompressor is not None or self.members == 0:
+            raise ValueError("Truncated gzip data.")
+
+
+def _download_to_partial(
+    remote_file: RemoteFile, partial_path: Path, chunk_size: int
+) -> Tuple[str, GzipVerifier]:
+    """Download a remote file to its partial file, resuming what is already there.
+
+    :param remote_file: The remote file.
+    :param partial_path: The partial file.
+    :param chunk_size: The number of bytes to read and write at a time.
+    :return: The SHA-256 of the partial file, and the verifier that read it.
+    :raises CorruptDownloadError: If the data does not match its gzip trailers.
+    """
+    checksum = hashlib.sha256()
+    verifier = GzipVerifier()
+    headers = {}
+    if partial_path.exists() and partial_path.stat().st_size > 0:
+        with open(partial_path, "rb") as partial_file:
+            for chunk in iter(lambda: partial_file.read(chunk_size), b""):
+                checksum.update(chunk)
+                verifier.update(chunk)
+        headers["Range"] = f"bytes={partial_path.stat().st_size}-"
+        if_range = remote_file.etag or remote_file.last_modified
+        if if_range is not None:
+            headers["If-Range"] = if_range
+
+    with requests.get(
+        remote_file.url, headers=headers, allow_redirects=True, stream=True
+    ) as response:
+        if response.status_code == 416:
+            # the partial file already holds the whole file
+            return checksum.hexdigest(), verifier
+
+        response.raise_for_status()
+        if response.status_code != 206:
+            # the server sent the whole file, start over
+            checksum = hashlib.sha256()
+            verifier = GzipVerifier()
+            partial_path.write_bytes(b"")
+        with open(partial_path, "ab") as output_file:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                output_file.write(chunk)
+                checksum.update(chunk)
+                verifier.update(chunk)
+
+    return checksum.hexdigest(), verifier
+
+
+def fetch_agr_orthology_data(
+    remote_file: RemoteFile,
+    cache_dir: str,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+) -> str:
+    """Download a remote file into the cache, resuming and verifying it.
+
+    A cached file is reused if its checksum matches the recorded one. An
+    interrupted download is resumed from its partial file with an HTTP Range
+    request. The download is only moved into place once its size has been checked
+    and its gzip trailers match the data, and its SHA-256 checksum is recorded next
+    to it. If the server sent neither an ETag nor a Last-Modified date, a
+    re-published file cannot be told apart, so nothing cached is reused.
+
+    :param remote_file: The remote file, see `find_agr_orthology_file`.
+    :param cache_dir: The download cache directory.
+    :param chunk_size: The number of bytes to read and write at a time.
+    :return: The path to the downloaded file.
+    :raises ValueError: If the downloaded file is incomplete or corrupt.
+    """
+    file_path = cache_path(remote_file, cache_dir)
+    partial_path = Path(str(file_path) + PARTIAL_SUFFIX)
+    if not is_cacheable(remote_file):
+        file_path.unlink(missing_ok=True)
+        partial_path.unlink(missing_ok=True)
+
+    recorded_checksum = read_checksum(file_path)
+    if file_path.exists() and recorded_checksum is not None:
+        if file_checksum(file_path, chunk_size) == recorded_checksum:
+            return str(file_path)
+        file_path.unlink()
+
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    try:
+        checksum, verifier = _download_to_partial(remote_file, partial_path, chunk_size)
+    except CorruptDownloadError:
+        # resuming would keep the corrupt data, so the next attempt starts over
+        partial_path.unlink()
+        raise
+
+    downloaded_size = partial_path.stat().st_size
+    if remote_file.size is not None and downloaded_size != remote_file.size:
+        raise ValueError(
+            f"Incomplete download of {remote_file.url}: "
+            f"{downloaded_size} of {remote_file.size} bytes."
+        )
+    # a download cut short at an unknown size is resumed by the next attempt
+    verifier.verify()
+
+    partial_path.replace(file_path)
+    Path(str(file_path) + CHECKSUM_SUFFIX).write_text(checksum)
+    return str(file_path)
+
+
 def download_agr_orthology_data(
-    download_url: str, download_location: Optional[str] = None
+    download_url: str,
+    download_location: Optional[str] = None,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
 ) -> str:
     """Download the latest AGR orthology data.
 
+    The response is streamed to disk in chunks, so the file is never held in memory.
+
     :param download_url: The AGR orthology download URL.
     :param download_location: The location to download the AGR orthology data.
+    :param chunk_size: The number of bytes to read and write at a time.
     :return: The path to the downloaded AGR orthology data.
     """
     filename = Path(download_url.split("/")[-1])
-    response = requests.get(download_url, allow_redirects=True)
     download_file_path = (
         Path(download_location) / filename if download_location else filename
     )
-    download_file_path.write_bytes(response.content)
+    with requests.get(download_url, allow_redirects=True, stream=True) as response:
+        with open(download_file_path, "wb") as output_file:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                output_file.write(chunk)
     return str(download_file_path)
 
 
-def unzip_file(file_path: str, output_location: Optional[str] = None) -> str:
+def unzip_file(
+    file_path: str,
+    output_location: Optional[str] = None,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+) -> str:
     """Unzip a file.
 
+    The file is decompressed in chunks, so the uncompressed data is never held in
+    memory.
+
     :param file_path: The file path to unzip.
     :param output_location: The location to unzip the file (optional).
+    :param chunk_size: The number of bytes to decompress at a time.
     :return: The path to the unzipped file.
     """
     file_path = Path(file_path)
@@ -72,6 +364,6 @@ def unzip_file(file_path: str, output_location: Optional[str] = None) -> str:
     output_file_path = output_location / file_path.stem
     with gzip.open(file_path, "rb") as file:
         with open(output_file_path, "wb") as output_file:
-            output_file.write(file.read())
+            shutil.copyfileobj(file, output_file, chunk_size)
 
     return str(output_file_path)
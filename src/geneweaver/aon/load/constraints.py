@@ -0,0 +1,366 @@
+"""Build the constraints and indexes of a tenant schema after its data is loaded.
+
+Maintaining primary keys, unique constraints, foreign keys and indexes row by row
+is a large part of the cost of loading millions of orthologs. When a schema is
+created with `-x defer_constraints=true`, the bulk loaded tables (`gn_gene`,
+`ort_ortholog`, `ora_ortholog_algorithms` and `hom_homology`) are created bare, and
+everything is built here in one pass once the data is in:
+
+1. primary keys and unique constraints, one table per connection in parallel,
+2. foreign keys, added `NOT VALID` and then validated in parallel,
+3. secondary indexes, in parallel,
+4. `ANALYZE`, so the planner has statistics before the schema is served.
+
+Every step checks the catalog first, so the build is idempotent: on a schema created
+with its constraints in place it only creates missing indexes and analyzes.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, NamedTuple, Set, Tuple
+
+from psycopg import Connection, sql
+
+ConnectionFactory = Callable[[], Connection]
+
+
+class TableConstraint(NamedTuple):
+    """A named constraint on a tenant table."""
+
+    table: str
+    name: str
+    definition: str
+
+
+class TableIndex(NamedTuple):
+    """A named index on a tenant table."""
+
+    table: str
+    name: str
+    columns: Tuple[str, ...]
+
+
+# Names follow the Postgres defaults, so they match the constraints created by the
+# migrations when constraints are not deferred.
+KEY_CONSTRAINTS = (
+    TableConstraint("alg_algorithm", "alg_algorithm_pkey", "PRIMARY KEY (alg_id)"),
+    TableConstraint("alg_algorithm", "alg_algorithm_alg_name_key", "UNIQUE (alg_name)"),
+    TableConstraint("sp_species", "sp_species_pkey", "PRIMARY KEY (sp_id)"),
+    TableConstraint("gn_gene", "gn_gene_pkey", "PRIMARY KEY (gn_id)"),
+    TableConstraint("gn_gene", "gn_gene_gn_ref_id_key", "UNIQUE (gn_ref_id)"),
+    TableConstraint("ort_ortholog", "ort_ortholog_pkey", "PRIMARY KEY (ort_id)"),
+    TableConstraint(
+        "ora_ortholog_algorithms",
+        "ora_ortholog_algorithms_pkey",
+        "PRIMARY KEY (ora_id)",
+    ),
+    TableConstraint("hom_homology", "unique_homolog", "UNIQUE (hom_id, gn_id)"),
+)
+
+FOREIGN_KEYS = (
+    TableConstraint("gn_gene", "gn_gene_sp_id_fkey", "sp_id -> sp_species.sp_id"),
+    TableConstraint(
+        "ort_ortholog", "ort_ortholog_from_gene_fkey", "from_gene -> gn_gene.gn_id"
+    ),
+    TableConstraint(
+        "ort_ortholog", "ort_ortholog_to_gene_fkey", "to_gene -> gn_gene.gn_id"
+    ),
+    TableConstraint(
+        "ora_ortholog_algorithms",
+        "ora_ortholog_algorithms_alg_id_fkey",
+        "alg_id -> alg_algorithm.alg_id",
+    ),
+    TableConstraint(
+        "ora_ortholog_algorithms",
+        "ora_ortholog_algorithms_ort_id_fkey",
+        "ort_id -> ort_ortholog.ort_id",
+    ),
+    TableConstraint(
+        "hom_homology", "hom_homology_gn_id_fkey", "gn_id -> gn_gene.gn_id"
+    ),
+    TableConstraint(
+        "hom_homology", "hom_homology_sp_id_fkey", "sp_id -> sp_species.sp_id"
+    ),
+)
+
+# The read path indexes, created by the b8e4d1c9f27a migration, or here when
+# constraints are deferred.
+INDEXES = (
+    # get_orthologs by gene, optionally filtered to best/revised orthologs
+    TableIndex(
+        "ort_ortholog",
+        "ix_ort_ortholog_from_gene_best",
+        ("from_gene", "ort_is_best", "ort_is_best_revised"),
+    ),
+    TableIndex(
+        "ort_ortholog",
+        "ix_ort_ortholog_to_gene_best",
+        ("to_gene", "ort_is_best", "ort_is_best_revised"),
+    ),
+    # the algorithm join, from either side, answered from the index alone
+    TableIndex(
+        "ora_ortholog_algorithms",
+        "ix_ora_ortholog_algorithms_ort_alg",
+        ("ort_id", "alg_id"),
+    ),
+    TableIndex(
+        "ora_ortholog_algorithms",
+        "ix_ora_ortholog_algorithms_alg_ort",
+        ("alg_id", "ort_id"),
+    ),
+    # get_genes by species and prefix, and by prefix alone
+    TableIndex("gn_gene", "ix_gn_gene_sp_id_prefix", ("sp_id", "gn_prefix")),
+    TableIndex("gn_gene", "ix_gn_gene_prefix", ("gn_prefix",)),
+    # get_homologs by gene, and by species and source
+    TableIndex("hom_homology", "ix_hom_homology_gn_id", ("gn_id",)),
+    TableIndex(
+        "hom_homology", "ix_hom_homology_sp_id_source", ("sp_id", "hom_source_name")
+    ),
+)
+
+TABLES = (
+    "alg_algorithm",
+    "sp_species",
+    "gn_gene",
+    "ort_ortholog",
+    "ora_ortholog_algorithms",
+    "hom_homology",
+)
+
+
+def _foreign_key_sql(schema_name: str, constraint: TableConstraint) -> sql.Composed:
+    """Build the `FOREIGN KEY ... REFERENCES ...` clause of a foreign key.
+
+    :param schema_name: The tenant schema name.
+    :param constraint: The foreign key, defined as `column -> table.column`.
+    :return: The clause.
+    """
+    column, reference = (part.strip() for part in constraint.definition.split("->"))
+    ref_table, ref_column = reference.split(".")
+    return sql.SQL(
+        "FOREIGN KEY ({column}) REFERENCES {ref_table} ({ref_column})"
+    ).format(
+        column=sql.Identifier(column),
+        ref_table=sql.Identifier(schema_name, ref_table),
+        ref_column=sql.Identifier(ref_column),
+    )
+
+
+def existing_constraints(conn: Connection, schema_name: str) -> Dict[str, bool]:
+    """Get the constraints already defined in a schema.
+
+    :param conn: The AON database connection.
+    :param schema_name: The tenant schema name.
+    :return: The constraint names, mapped to whether they have been validated.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.conname, c.convalidated FROM pg_constraint c "
+            "JOIN pg_namespace n ON n.oid = c.connamespace "
+            "WHERE n.nspname = %s",
+            (schema_name,),
+        )
+        return dict(cursor.fetchall())
+
+
+def existing_indexes(conn: Connection, schema_name: str) -> Set[str]:
+    """Get the names of the indexes already defined in a schema.
+
+    :param conn: The AON database connection.
+    :param schema_name: The tenant schema name.
+    :return: The index names.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT indexname FROM pg_indexes WHERE schemaname = %s", (schema_name,)
+        )
+        return {row[0] for row in cursor}
+
+
+def add_key_constraints(
+    conn: Connection, schema_name: str, table: str, constraints: Iterable[str]
+) -> None:
+    """Add the primary key and unique constraints of a table.
+
+    All constraints of the table are added in a single `ALTER TABLE`.
+
+    :param conn: An autocommit connection.
+    :param schema_name: The tenant schema name.
+    :param table: The table name.
+    :param constraints: The names of the missing constraints to add.
+    """
+    definitions = {c.name: c.definition for c in KEY_CONSTRAINTS}
+    actions = [
+        sql.SQL("ADD CONSTRAINT {name} {definition}").format(
+            name=sql.Identifier(name), definition=sql.SQL(definitions[name])
+        )
+        for name in constraints
+    ]
+    if not actions:
+        return
+    conn.execute(
+        sql.SQL("ALTER TABLE {table} {actions}").format(
+            table=sql.Identifier(schema_name, table),
+            actions=sql.SQL(", ").join(actions),
+        )
+    )
+
+
+def add_foreign_key(
+    conn: Connection, schema_name: str, constraint: TableConstraint
+) -> None:
+    """Add a foreign key without validating the existing rows.
+
+    This only takes a brief lock, the rows are checked by `validate_constraint`.
+
+    :param conn: An autocommit connection.
+    :param schema_name: The tenant schema name.
+    :param constraint: The foreign key.
+    """
+    conn.execute(
+        sql.SQL(
+            "ALTER TABLE {table} ADD CONSTRAINT {name} {definition} NOT VALID"
+        ).format(
+            table=sql.Identifier(schema_name, constraint.table),
+            name=sql.Identifier(constraint.name),
+            definition=_foreign_key_sql(schema_name, constraint),
+        )
+    )
+
+
+def validate_constraint(
+    conn: Connection, schema_name: str, constraint: TableConstraint
+) -> None:
+    """Validate a constraint that was added `NOT VALID`.
+
+    Validation does not block other validations, so it can run in parallel.
+
+    :param conn: An autocommit connection.
+    :param schema_name: The tenant schema name.
+    :param constraint: The constraint.
+    """
+    conn.execute(
+        sql.SQL("ALTER TABLE {table} VALIDATE CONSTRAINT {name}").format(
+            table=sql.Identifier(schema_name, constraint.table),
+            name=sql.Identifier(constraint.name),
+        )
+    )
+
+
+def create_index(conn: Connection, schema_name: str, index: TableIndex) -> None:
+    """Create a secondary index if it does not exist.
+
+    :param conn: An autocommit connection.
+    :param schema_name: The tenant schema name.
+    :param index: The index.
+    """
+    conn.execute(
+        sql.SQL("CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})").format(
+            name=sql.Identifier(index.name),
+            table=sql.Identifier(schema_name, index.table),
+            columns=sql.SQL(", ").join(sql.Identifier(c) for c in index.columns),
+        )
+    )
+
+
+def analyze_table(conn: Connection, schema_name: str, table: str) -> None:
+    """Collect planner statistics for a table.
+
+    :param conn: An autocommit connection.
+    :param schema_name: The tenant schema name.
+    :param table: The table name.
+    """
+    conn.execute(
+        sql.SQL("ANALYZE {table}").format(table=sql.Identifier(schema_name, table))
+    )
+
+
+def _run_parallel(
+    connect: ConnectionFactory,
+    tasks: List[Callable[[Connection], None]],
+    parallelism: int,
+) -> None:
+    """Run tasks in parallel, each on its own autocommit connection.
+
+    :param connect: A factory for autocommit connections.
+    :param tasks: The tasks to run.
+    :param parallelism: The maximum number of concurrent connections.
+    """
+
+    def run(task: Callable[[Connection], None]) -> None:
+        with connect() as conn:
+            task(conn)
+
+    if not tasks:
+        return
+    with ThreadPoolExecutor(max_workers=max(1, parallelism)) as executor:
+        # Consume the results so that the first error is raised.
+        list(executor.map(run, tasks))
+
+
+def build_constraints(
+    connect: ConnectionFactory, schema_name: str, parallelism: int = 4
+) -> List[str]:
+    """Build the missing constraints and indexes of a schema, then analyze it.
+
+    :param connect: A factory for autocommit connections to the AON database.
+    :param schema_name: The tenant schema name.
+    :param parallelism: The maximum number of concurrent connections.
+    :return: The names of the constraints and indexes that were built.
+    """
+    with connect() as conn:
+        existing = existing_constraints(conn, schema_name)
+        indexes = existing_indexes(conn, schema_name)
+    missing_indexes = [index for index in INDEXES if index.name not in indexes]
+
+    built: List[str] = []
+
+    missing_keys = {}
+    for constraint in KEY_CONSTRAINTS:
+        if constraint.name not in existing:
+            missing_keys.setdefault(constraint.table, []).append(constraint.name)
+            built.append(constraint.name)
+    _run_parallel(
+        connect,
+        [
+            lambda conn, t=table, c=names: add_key_constraints(conn, schema_name, t, c)
+            for table, names in missing_keys.items()
+        ],
+        parallelism,
+    )
+
+    # Foreign keys left unvalidated by an interrupted build are validated again.
+    missing_foreign_keys = [fk for fk in FOREIGN_KEYS if fk.name not in existing]
+    unvalidated_foreign_keys = [
+        fk for fk in FOREIGN_KEYS if not existing.get(fk.name, False)
+    ]
+    if missing_foreign_keys:
+        with connect() as conn:
+            for constraint in missing_foreign_keys:
+                add_foreign_key(conn, schema_name, constraint)
+    _run_parallel(
+        connect,
+        [
+            lambda conn, c=constraint: validate_constraint(conn, schema_name, c)
+            for constraint in unvalidated_foreign_keys
+        ],
+        parallelism,
+    )
+    built.extend(fk.name for fk in unvalidated_foreign_keys)
+
+    _run_parallel(
+        connect,
+        [
+            lambda conn, i=index: create_index(conn, schema_name, i)
+            for index in missing_indexes
+        ],
+        parallelism,
+    )
+    built.extend(index.name for index in missing_indexes)
+
+    _run_parallel(
+        connect,
+        [lambda conn, t=table: analyze_table(conn, schema_name, t) for table in TABLES],
+        parallelism,
+    )
+
+    return built
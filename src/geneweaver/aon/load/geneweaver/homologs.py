@@ -1,18 +1,26 @@
 """Code for adding homolog/ortholog information from the geneweaver database."""
 
-# ruff: noqa: C901
-# TODO: The above noqa is for the complexity of the `add_missing_orthologs` function,
-#  which should be refactored to be more readable and maintainable.
-
 import itertools
-from typing import List, Optional
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 from geneweaver.aon.models import Gene, GeneweaverGene, Ortholog
-from geneweaver.aon.service.convert import ode_ref_to_agr
+from geneweaver.aon.service.convert import ode_ref_to_agr_by_gdb_id
 from psycopg import Cursor, sql
 from psycopg.rows import Row
+from sqlalchemy import BIGINT, VARCHAR, any_, bindparam, insert
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Session
 
+# geneweaver species that are not in AGR, and the gene databases their genes are
+# loaded from by `add_missing_genes`
+NEW_SPECIES_IDS = (6, 10, 11)
+NEW_SPECIES_GDB_IDS = (1, 2, 10)
+# gene databases whose genes are in AGR
+AGR_GDB_IDS = (10, 11, 12, 13, 14, 15, 16)
+
+GeneKey = Tuple[int, int]
+
 
 def get_homolog_information(
     aon_cursor: Cursor, geneweaver_cursor: Cursor, aon_schema_name: Optional[str] = None
@@ -64,128 +72,119 @@ def get_homolog_information(
     return homologs
 
 
-def add_missing_orthologs(db: Session, homologs: tuple) -> None:
+def get_geneweaver_refs(
+    db: Session, homologs: Iterable[Row], gdb_ids: Sequence[int]
+) -> Dict[GeneKey, Tuple[str, int]]:
+    """Get the reference ids of homolog genes from a set of gene databases.
+
+    All genes are fetched with a single query.
+
+    :param db: The database session.
+    :param homologs: The `(hom_id, ode_gene_id, sp_id)` homolog rows.
+    :param gdb_ids: The gene databases to take reference ids from.
+    :return: A map of `(ode_gene_id, sp_id)` to `(ode_ref_id, gdb_id)`, with the
+        first matching reference of each gene.
+    """
+    keys = {(h[1], h[2]) for h in homologs}
+    if not keys:
+        return {}
+    rows = db.query(
+        GeneweaverGene.ode_gene_id,
+        GeneweaverGene.sp_id,
+        GeneweaverGene.ode_ref_id,
+        GeneweaverGene.gdb_id,
+    ).filter(
+        GeneweaverGene.ode_gene_id
+        == any_(
+            bindparam("ode_gene_ids", list({k[0] for k in keys}), type_=ARRAY(BIGINT))
+        ),
+        GeneweaverGene.gdb_id.in_(gdb_ids),
+    )
+    refs = {}
+    for ode_gene_id, sp_id, ode_ref_id, gdb_id in rows:
+        if (ode_gene_id, sp_id) in keys:
+            refs.setdefault((ode_gene_id, sp_id), (ode_ref_id, gdb_id))
+    return refs
+
+
+def get_gene_ids(db: Session, ref_ids: Iterable[str]) -> Dict[str, int]:
+    """Get the gn_id of AGR genes by reference id, with a single query.
+
+    :param db: The database session.
+    :param ref_ids: The gn_ref_ids to look up.
+    :return: A map of gn_ref_id to gn_id, for the genes that exist.
+    """
+    ref_ids = list(set(ref_ids))
+    if not ref_ids:
+        return {}
+    return dict(
+        db.query(Gene.gn_ref_id, Gene.gn_id).filter(
+            Gene.gn_ref_id
+            == any_(bindparam("gn_ref_ids", ref_ids, type_=ARRAY(VARCHAR)))
+        )
+    )
+
+
+def add_missing_orthologs(db: Session, homologs: List[Row]) -> int:
     """Add missing orthologs to the database.
 
+    Every gene of a new species (one not in AGR) is linked to every gene of its
+    homology cluster that is in AGR. The genes of all clusters are resolved up front
+    with a few set-based queries, the pairs are generated in memory, and the
+    orthologs are written with a single bulk insert.
+
     :param db: The database session.
-    :param homologs: The homologs to add to the database.
+    :param homologs: The `(hom_id, ode_gene_id, sp_id)` homolog rows, ordered by
+        hom_id.
+    :return: The number of orthologs added.
     """
-    # starting hom_id is the first hom_id of the first homolog,
-    # keeps track of current cluster
-    curr_hom_id = homologs[0][0]
-    # will hold all homolog genes that are not from the new species
-    homolog_set = []
-    # holds all homolog genes from the new species
-    new_species_homologs = []
-
-    for h in homologs:
-        # h is in current cluster
-        if h[0] == curr_hom_id:
-            # check if h is part of the new species
-            if h[2] in [6, 10, 11]:
-                new_species_homologs.append(h)
-            # if h is not in new species, check if the gene is in the agr database.
-            #   if it is, add to homolog_set
+    new_species_homologs = [h for h in homologs if h[2] in NEW_SPECIES_IDS]
+    agr_homologs = [h for h in homologs if h[2] not in NEW_SPECIES_IDS]
+
+    # genes of the new species were loaded into gn_gene with their geneweaver
+    # reference id, other genes need converting to the AGR reference format
+    from_refs = {
+        key: ref
+        for key, (ref, _) in get_geneweaver_refs(
+            db, new_species_homologs, NEW_SPECIES_GDB_IDS
+        ).items()
+    }
+    to_refs = {
+        key: ode_ref_to_agr_by_gdb_id(ref, gdb_id)
+        for key, (ref, gdb_id) in get_geneweaver_refs(
+            db, agr_homologs, AGR_GDB_IDS
+        ).items()
+    }
+    gene_ids = get_gene_ids(db, itertools.chain(from_refs.values(), to_refs.values()))
+
+    orthologs = []
+    for _, cluster in itertools.groupby(homologs, key=itemgetter(0)):
+        from_genes, to_genes = [], []
+        for h in cluster:
+            key = (h[1], h[2])
+            if h[2] in NEW_SPECIES_IDS:
+                gn_id = gene_ids.get(from_refs.get(key))
+                if gn_id is not None:
+                    from_genes.append(gn_id)
             else:
-                # check if in agr database by getting ode_ref_id, converting that to
-                #   gn_ref_id, and searching gn_gene with that agr_ref_id. if all
-                #   queries are valid, gene is in agr.
-                gw_gene_ref = (
-                    db.query(GeneweaverGene)
-                    .filter(
-                        GeneweaverGene.ode_gene_id == h[1],
-                        GeneweaverGene.sp_id == h[2],
-                        GeneweaverGene.gdb_id.in_([10, 11, 12, 13, 14, 15, 16]),
-                    )
-                    .first()
-                )
-                if gw_gene_ref:
-                    agr_ref = ode_ref_to_agr(db, gw_gene_ref.ode_ref_id)
-                    gene_in_agr = (
-                        db.query(Gene).filter(Gene.gn_ref_id == agr_ref).first()
-                    )
-                    if gene_in_agr:
-                        homolog_set.append(h)
-
-        # h is not in current cluster, new homology set
-        #    add new relations from new_species_homologs to rest of homolog_set
-        #    reset homolog_set and new_species_homologs
-        if h[0] != curr_hom_id:
-            orthos = []
-            from_agr_genes = {}
-
-            # iterate through new_species_homologs to get the gn_id of each gene
-            for n in new_species_homologs:
-                n_gw_ref = (
-                    db.query(GeneweaverGene)
-                    .filter(
-                        GeneweaverGene.ode_gene_id == n[1],
-                        GeneweaverGene.sp_id == n[2],
-                        GeneweaverGene.gdb_id.in_([1, 2, 10]),
-                    )
-                    .first()
-                )
-                n_agr_gene = (
-                    db.query(Gene).filter(Gene.gn_ref_id == n_gw_ref.ode_ref_id).first()
-                )
-                from_agr_genes[n[1]] = n_agr_gene.gn_id
-
-            # get permutations of every combination between new_species_homologs and
-            #    homolog_set
-            pairs = list(itertools.product(new_species_homologs, homolog_set))
-
-            for p in pairs:
-                # from gene is first pairs object, to gene is second
-                f = p[0]
-                t = p[1]
-
-                # get to_gene gn_ref_id
-                t_gene_ref = (
-                    db.query(GeneweaverGene)
-                    .filter(
-                        GeneweaverGene.ode_gene_id == t[1],
-                        GeneweaverGene.sp_id == t[2],
-                        GeneweaverGene.gdb_id.in_([10, 11, 12, 13, 14, 15, 16]),
-                    )
-                    .first()
-                )
-                t_agr_ref = ode_ref_to_agr(db, t_gene_ref.ode_ref_id)
-
-                # check that to gene is in agr and geneweaver database
-                if not t_gene_ref or not t_agr_ref:
-                    continue
-                agr_to_gene = db.query(Gene).filter(Gene.gn_ref_id == t_agr_ref).first()
-                if not agr_to_gene:
-                    continue
-
-                to_gene = agr_to_gene.gn_id
-                from_gene = from_agr_genes[f[1]]
-                ort_is_best = True
-                ort_is_best_revised = True
-                ort_is_best_adjusted = True
-                ort_num_possible_match_algorithms = 0
-                ortho = Ortholog(
-                    from_gene=from_gene,
-                    to_gene=to_gene,
-                    ort_is_best=ort_is_best,
-                    ort_is_best_revised=ort_is_best_revised,
-                    ort_is_best_is_adjusted=ort_is_best_adjusted,
-                    ort_num_possible_match_algorithms=ort_num_possible_match_algorithms,
-                    ort_source_name="Homologene",
-                )
-                orthos.append(ortho)
-            db.bulk_save_objects(orthos)
-            db.commit()
-
-            # reset homolog_set and new_species_homologs
-            homolog_set = []
-            new_species_homologs = []
-
-            # add current gene to appropriate list
-            if h[2] in [6, 10, 11]:
-                new_species_homologs.append(h)
-            else:
-                homolog_set.append(h)
-
-        # reset curr_hom_id
-        curr_hom_id = h[0]
+                gn_id = gene_ids.get(to_refs.get(key))
+                if gn_id is not None:
+                    to_genes.append(gn_id)
+
+        orthologs.extend(
+            {
+                "from_gene": from_gene,
+                "to_gene": to_gene,
+                "ort_is_best": True,
+                "ort_is_best_revised": True,
+                "ort_is_best_is_adjusted": True,
+                "ort_num_possible_match_algorithms": 0,
+                "ort_source_name": "Homologene",
+            }
+            for from_gene, to_gene in itertools.product(from_genes, to_genes)
+        )
+
+    if orthologs:
+        db.execute(insert(Ortholog), orthologs)
+        db.commit()
+    return len(orthologs)
@@ -0,0 +1,343 @@
+"""Build homology clusters from the loaded orthologs.
+
+Every gene connected through a chain of orthologs, from any source, belongs to the
+same homology cluster, i.e. clusters are the connected components of the ortholog
+graph. They are computed with an array backed disjoint-set over dense gene indexes,
+streaming only `(from_gene, to_gene, source)` tuples from `ort_ortholog`, and then
+written to `hom_homology` with a single binary COPY.
+"""
+
+from array import array
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from psycopg import Connection, sql
+
+HOMOLOGY_COLUMNS = ("hom_id", "gn_id", "sp_id", "hom_source_name")
+HOMOLOGY_TYPES = ["int4", "int4", "int4", "varchar"]
+
+EDGE_FETCH_SIZE = 100000
+
+
+class DisjointSet:
+    """Disjoint-set (union-find) over the dense indexes `0..n-1`.
+
+    Uses path compression and union by rank, backed by flat arrays rather than a
+    Python object per element.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty disjoint-set."""
+        self.parent = array("l")
+        self.rank = array("B")
+
+    def __len__(self) -> int:
+        """Get the number of elements."""
+        return len(self.parent)
+
+    def add(self) -> int:
+        """Add a new singleton set.
+
+        :return: The index of the new element.
+        """
+        index = len(self.parent)
+        self.parent.append(index)
+        self.rank.append(0)
+        return index
+
+    def find(self, index: int) -> int:
+        """Find the representative of the set containing an element.
+
+        :param index: The element.
+        :return: The representative element.
+        """
+        parent = self.parent
+        root = index
+        while parent[root] != root:
+            root = parent[root]
+        while parent[index] != root:
+            parent[index], index = root, parent[index]
+        return root
+
+    def union(self, first: int, second: int) -> int:
+        """Merge the sets containing two elements.
+
+        :param first: An element of the first set.
+        :param second: An element of the second set.
+        :return: The representative of the merged set.
+        """
+        first = self.find(first)
+        second = self.find(second)
+        if first == second:
+            return first
+        rank = self.rank
+        if rank[first] < rank[second]:
+            first, second = second, first
+        self.parent[second] = first
+        if rank[first] == rank[second]:
+            rank[first] += 1
+        return first
+
+
+class HomologyClusters:
+    """Connected components of the ortholog graph."""
+
+    def __init__(self) -> None:
+        """Initialize an empty graph."""
+        self.sets = DisjointSet()
+        # gn_id -> dense index, and the reverse
+        self.gene_index: Dict[int, int] = {}
+        self.gene_ids = array("l")
+        # source of the first ortholog each gene was seen in
+        self.source_names: List[str] = []
+        self.gene_sources = array("B")
+
+    def _index(self, gn_id: int, source: int) -> int:
+        """Get the dense index of a gene, registering it if new."""
+        index = self.gene_index.get(gn_id)
+        if index is None:
+            index = self.sets.add()
+            self.gene_index[gn_id] = index
+            self.gene_ids.append(gn_id)
+            self.gene_sources.append(source)
+        return index
+
+    def _source(self, source_name: str) -> int:
+        """Get the index of a source name, registering it if new."""
+        try:
+            return self.source_names.index(source_name)
+        except ValueError:
+            self.source_names.append(source_name)
+            return len(self.source_names) - 1
+
+    def add_edges(self, edges: Iterable[Tuple[int, int, str]]) -> None:
+        """Add ortholog edges to the graph.
+
+        This is the hot loop of the homology stage, so the union-find operations
+        are inlined here, using path halving instead of a second compression pass.
+
+        :param edges: `(from_gene, to_gene, source_name)` tuples.
+        """
+        get_index = self.gene_index.get
+        parent = self.sets.parent
+        rank = self.sets.rank
+        last_source_name, last_source = None, 0
+        for from_gene, to_gene, source_name in edges:
+            if source_name != last_source_name:
+                last_source_name, last_source = source_name, self._source(source_name)
+
+            first = get_index(from_gene)
+            if first is None:
+                first = self._index(from_gene, last_source)
+            second = get_index(to_gene)
+            if second is None:
+                second = self._index(to_gene, last_source)
+
+            while parent[first] != first:
+                parent[first] = parent[parent[first]]
+                first = parent[first]
+            while parent[second] != second:
+                parent[second] = parent[parent[second]]
+                second = parent[second]
+            if first == second:
+                continue
+            if rank[first] < rank[second]:
+                first, second = second, first
+            parent[second] = first
+            if rank[first] == rank[second]:
+                rank[first] += 1
+
+    def rows(self) -> Iterator[Tuple[int, int, str]]:
+        """Iterate over the cluster memberships.
+
+        Cluster ids are numbered from 1, in the order the clusters were first seen.
+
+        :return: A generator of `(hom_id, gn_id, hom_source_name)` tuples.
+        """
+        cluster_ids: Dict[int, int] = {}
+        for index, gn_id in enumerate(self.gene_ids):
+            root = self.sets.find(index)
+            hom_id = cluster_ids.setdefault(root, len(cluster_ids) + 1)
+            yield hom_id, gn_id, self.source_names[self.gene_sources[index]]
+
+
+def stream_ortholog_edges(
+    conn: Connection, schema_name: str, fetch_size: int = EDGE_FETCH_SIZE
+) -> Iterator[Tuple[int, int, str]]:
+    """Stream the ortholog edges of a schema with a server-side cursor.
+
+    :param conn: The AON database connection.
+    :param schema_name: The tenant schema name.
+    :param fetch_size: The number of rows fetched per round trip.
+    :return: A generator of `(from_gene, to_gene, ort_source_name)` tuples.
+    """
+    with conn.cursor(name="homology_ortholog_edges") as cursor:
+        cursor.itersize = fetch_size
+        cursor.execute(
+            sql.SQL(
+                "SELECT from_gene, to_gene, ort_source_name FROM {table} "
+                "ORDER BY ort_id"
+            ).format(table=sql.Identifier(schema_name, "ort_ortholog"))
+        )
+        yield from cursor
+
+
+def get_gene_species(
+    conn: Connection, schema_name: str, gene_index: Dict[int, int]
+) -> array:
+    """Get the species of every clustered gene.
+
+    :param conn: The AON database connection.
+    :param schema_name: The tenant schema name.
+    :param gene_index: The `gn_id -> dense index` map of the clustered genes.
+    :return: The species ids, aligned with the dense gene indexes.
+    """
+    species = array("l", [0]) * len(gene_index)
+    with conn.cursor() as cursor:
+        cursor.execute(
+            sql.SQL("SELECT gn_id, sp_id FROM {table}").format(
+                table=sql.Identifier(schema_name, "gn_gene")
+            )
+        )
+        for gn_id, sp_id in cursor:
+            index = gene_index.get(gn_id)
+            if index is not None:
+                species[index] = sp_id
+    return species
+
+
+def add_homology(conn: Connection, schema_name: str) -> int:
+    """Compute homology clusters and write them to `hom_homology`.
+
+    Existing rows are replaced in the same transaction, so the stage can safely be
+    retried.
+
+    :param conn: The AON database connection.
+    :param schema_name: The tenant schema name.
+    :return: The number of rows written.
+    """
+    clusters = HomologyClusters()
+    clusters.add_edges(stream_ortholog_edges(conn, schema_name))
+    species = get_gene_species(conn, schema_name, clusters.gene_index)
+
+    table = sql.Identifier(schema_name, "hom_homology")
+    written = 0
+    with conn.cursor() as cursor:
+        cursor.execute(sql.SQL("DELETE FROM {table}").format(table=table))
+        with cursor.copy(
+            sql.SQL("COPY {table} ({columns}) FROM STDIN (FORMAT BINARY)").format(
+                table=table,
+                columns=sql.SQL(", ").join(sql.Identifier(c) for c in HOMOLOGY_COLUMNS),
+            )
+        ) as copy:
+            copy.set_types(HOMOLOGY_TYPES)
+            for index, (hom_id, gn_id, source_name) in enumerate(clusters.rows()):
+                copy.write_row((hom_id, gn_id, species[index], source_name))
+                written += 1
+    conn.commit()
+    return written
+
+
+def add_homology_in_database(conn: Connection, schema_name: str) -> int:
+    """Compute homology clusters inside Postgres and write them to `hom_homology`.
+
+    Rather than moving every ortholog to Python, connected components are found with
+    set-based label propagation over temporary tables: each gene starts labelled
+    with its own id and repeatedly takes the smallest label of its neighbours, with a
+    pointer jumping step (taking the label of its label) to shorten long chains,
+    until no label changes. The clusters are then written with `INSERT ... SELECT`.
+
+    The rows are the same as those of `add_homology`: clusters are numbered in the
+    order of their first ortholog, each gene's source is that of the first ortholog
+    it appears in, and existing rows are replaced in the same transaction.
+
+    :param conn: The AON database connection.
+    :param schema_name: The tenant schema name.
+    :return: The number of rows written.
+    """
+    tables = {
+        "ortholog": sql.Identifier(schema_name, "ort_ortholog"),
+        "gene": sql.Identifier(schema_name, "gn_gene"),
+        "homology": sql.Identifier(schema_name, "hom_homology"),
+    }
+    with conn.cursor() as cursor:
+        cursor.execute(
+            sql.SQL(
+                """
+            CREATE TEMPORARY TABLE hom_edges ON COMMIT DROP AS
+            SELECT from_gene AS gn_id, to_gene AS neighbour FROM {ortholog}
+            UNION
+            SELECT to_gene, from_gene FROM {ortholog}
+            """
+            ).format(**tables)
+        )
+        cursor.execute("CREATE INDEX ON hom_edges (neighbour)")
+        cursor.execute(
+            """
+            CREATE TEMPORARY TABLE hom_labels ON COMMIT DROP AS
+            SELECT DISTINCT gn_id, gn_id AS label FROM hom_edges
+            """
+        )
+        cursor.execute("ALTER TABLE hom_labels ADD PRIMARY KEY (gn_id)")
+        cursor.execute("ANALYZE hom_edges, hom_labels")
+
+        changed = True
+        while changed:
+            cursor.execute(
+                """
+                UPDATE hom_labels l SET label = n.label
+                FROM (
+                    SELECT e.gn_id, min(nl.label) AS label
+                    FROM hom_edges e JOIN hom_labels nl ON nl.gn_id = e.neighbour
+                    GROUP BY e.gn_id
+                ) n
+                WHERE l.gn_id = n.gn_id AND n.label < l.label
+                """
+            )
+            propagated = cursor.rowcount
+            cursor.execute(
+                """
+                UPDATE hom_labels l SET label = p.label
+                FROM hom_labels p
+                WHERE p.gn_id = l.label AND p.label < l.label
+                """
+            )
+            changed = propagated > 0 or cursor.rowcount > 0
+
+        cursor.execute(
+            sql.SQL(
+                """
+            CREATE TEMPORARY TABLE hom_sources ON COMMIT DROP AS
+            SELECT DISTINCT ON (gn_id) gn_id, ort_id, ort_source_name
+            FROM (
+                SELECT from_gene AS gn_id, ort_id, ort_source_name FROM {ortholog}
+                UNION ALL
+                SELECT to_gene, ort_id, ort_source_name FROM {ortholog}
+            ) s
+            ORDER BY gn_id, ort_id
+            """
+            ).format(**tables)
+        )
+
+        cursor.execute(sql.SQL("DELETE FROM {homology}").format(**tables))
+        cursor.execute(
+            sql.SQL(
+                """
+            INSERT INTO {homology} ({columns})
+            SELECT dense_rank() OVER (ORDER BY first_ort_id), gn_id, sp_id,
+                   ort_source_name
+            FROM (
+                SELECT l.gn_id, g.sp_id, s.ort_source_name,
+                       min(s.ort_id) OVER (PARTITION BY l.label) AS first_ort_id
+                FROM hom_labels l
+                JOIN {gene} g ON g.gn_id = l.gn_id
+                JOIN hom_sources s ON s.gn_id = l.gn_id
+            ) c
+            """
+            ).format(
+                columns=sql.SQL(", ").join(sql.Identifier(c) for c in HOMOLOGY_COLUMNS),
+                **tables,
+            )
+        )
+        written = cursor.rowcount
+    conn.commit()
+    return written
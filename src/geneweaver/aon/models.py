@@ -27,6 +27,8 @@ class Version(BaseAGR):
     agr_version = Column(String, nullable=False)
     date = Column(Date, nullable=False, server_default="now()")
     load_complete = Column(Boolean, nullable=False, server_default="false")
+    content_hash = Column(String, nullable=True)
+    source_etag = Column(String, nullable=True)
 
 
 class Gene(BaseAGR):
@@ -0,0 +1,35 @@
+"""Request bodies for the GW AON API."""
+
+from typing import List, Optional
+
+from geneweaver.aon.core.config import config
+from geneweaver.aon.enum import ReferenceGeneIDType
+from pydantic import BaseModel, Field
+
+
+class GeneTranslationRequest(BaseModel):
+    """A set of genes to translate to their orthologs."""
+
+    ref_ids: List[str] = Field(
+        ...,
+        max_items=config.TRANSLATE_MAX_REF_IDS,
+        description="The gene reference ids to translate, at most "
+        f"{config.TRANSLATE_MAX_REF_IDS}.",
+    )
+    ref_id_type: ReferenceGeneIDType = Field(
+        ReferenceGeneIDType.AON,
+        description="The format of the reference ids, also used for the result.",
+    )
+    to_species: Optional[int] = Field(
+        None, description="Only return orthologs in this species."
+    )
+    algorithm_id: Optional[int] = Field(
+        config.DEFAULT_ALGORITHM_ID,
+        description="Only return orthologs found by this algorithm.",
+    )
+    best: Optional[bool] = Field(
+        None, description="Filter on whether the ortholog is the best match."
+    )
+    revised: Optional[bool] = Field(
+        None, description="Filter on whether the ortholog is the best revised match."
+    )
@@ -1,82 +1,118 @@
 """Convert between Geneweaver and AON ID formats."""
 
-from typing import Optional
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence
 
+from geneweaver.aon.core.convert_rules import AGR_PREFIXES_BY_GDB_NAME
+from geneweaver.aon.core.convert_rules import agr_ref_to_ode as agr_ref_to_ode
+from geneweaver.aon.core.convert_rules import agr_refs_to_ode as agr_refs_to_ode
 from geneweaver.aon.models import (
     GeneweaverGene,
     GeneweaverSpecies,
     Species,
 )
 from geneweaver.core.enum import GeneIdentifier
+from sqlalchemy import VARCHAR, Select, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Session
 
-# converter functions using first char - these functions improve efficiency and
-#    are used here instead of convertODEtoAGR and convertAGRtoGW because they require
-#    gdb_id and are used more broadly.
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
 
 
-def ode_ref_to_agr(db: Session, ode_ref: str) -> str:
-    """Convert a gene reference ID from Geneweaver to AGR format.
+def ode_ref_to_agr_by_gdb_id(ode_ref: str, gdb_id: Optional[int]) -> str:
+    """Convert a gene reference ID from Geneweaver to AGR format, given its gdb_id.
 
-    AGR only contains data from some gene data sources Geneweaver has and the format is
-    slightly different for the reference ids, so this function adds prefixes to the ids
-    where necessary for the AGR format.
+    This does not touch the database, so it can be used when the gdb_id of the
+    reference is already known, e.g. from a query that fetched many genes at once.
 
-    :param db: The database session.
     :param ode_ref: The gene reference ID from Geneweaver.
-    :return: The gene reference ID in AGR format.
+    :param gdb_id: The gene database id of the reference, if known.
+    :return: The gene reference ID in AGR format, unchanged if the gdb_id is unknown.
     """
-    ref = ode_ref
+    if gdb_id is None:
+        return ode_ref
+    try:
+        gene_id_type = GeneIdentifier(gdb_id)
+    except ValueError:
+        return ode_ref
+
+    if gene_id_type.name in AGR_PREFIXES_BY_GDB_NAME:
+        return AGR_PREFIXES_BY_GDB_NAME[gene_id_type.name] + ode_ref
+    elif gene_id_type == GeneIdentifier.RGD:
+        return ode_ref[:3] + ":" + ode_ref[3:]
+    return ode_ref
 
-    gdb_id = (
-        db.query(GeneweaverGene.gdb_id)
-        .filter(GeneweaverGene.ode_ref_id == ode_ref)
-        .first()
+
+def gdb_ids_query(ode_refs: Sequence[str]) -> Select:
+    """Build the query for the gdb_id of many Geneweaver gene reference IDs.
+
+    :param ode_refs: The distinct gene reference IDs from Geneweaver.
+    :return: The query, of (reference ID, gdb_id) rows.
+    """
+    return select(GeneweaverGene.ode_ref_id, GeneweaverGene.gdb_id).where(
+        GeneweaverGene.ode_ref_id
+        == any_(bindparam("ode_ref_ids", list(ode_refs), type_=ARRAY(VARCHAR)))
     )
-    if gdb_id:
-        gdb_id = gdb_id[0]
-
-    gene_id_type = GeneIdentifier(gdb_id)
-
-    if gene_id_type == GeneIdentifier.WORMBASE:
-        ref = "WB:" + ode_ref
-    elif gene_id_type == GeneIdentifier.SGD:
-        ref = "SGD:" + ode_ref
-    elif gene_id_type == GeneIdentifier.FLYBASE:
-        ref = "FB:" + ode_ref
-    elif gene_id_type == GeneIdentifier.ZFIN:
-        ref = "ZFIN:" + ode_ref
-    elif gene_id_type == GeneIdentifier.RGD:
-        ref = ode_ref[:3] + ":" + ode_ref[3:]
 
-    return ref
 
+def _first_gdb_ids(rows: Iterable[tuple]) -> Dict[str, int]:
+    """Map each reference ID to the gdb_id of its first matching gene."""
+    gdb_ids = {}
+    for ode_ref, gdb_id in rows:
+        gdb_ids.setdefault(ode_ref, gdb_id)
+    return gdb_ids
+
+
+def get_gdb_ids(db: Session, ode_refs: Sequence[str]) -> Dict[str, int]:
+    """Get the gdb_id of many Geneweaver gene reference IDs with a single query.
+
+    :param db: The database session.
+    :param ode_refs: The gene reference IDs from Geneweaver.
+    :return: A map of reference ID to the gdb_id of its first matching gene, for the
+        reference IDs that exist.
+    """
+    unique_refs = list(set(ode_refs))
+    if not unique_refs:
+        return {}
+    return _first_gdb_ids(db.execute(gdb_ids_query(unique_refs)))
+
+
+def ode_refs_to_agr(db: Session, ode_refs: Sequence[str]) -> List[str]:
+    """Convert many gene reference IDs from Geneweaver to AGR format.
+
+    The gdb_id of every reference is found with one query, however many there are.
 
-def agr_ref_to_ode(gn_ref_id: str) -> str:
-    """Convert a gene reference ID from AGR to Geneweaver format.
+    :param db: The database session.
+    :param ode_refs: The gene reference IDs from Geneweaver.
+    :return: The gene reference IDs in AGR format, in the same order as `ode_refs`.
+    """
+    gdb_ids = get_gdb_ids(db, ode_refs)
+    return [ode_ref_to_agr_by_gdb_id(ref, gdb_ids.get(ref)) for ref in ode_refs]
+
+
+def ode_ref_to_agr(db: Session, ode_ref: str) -> str:
+    """Convert a gene reference ID from Geneweaver to AGR format.
 
-    All gene ref ids in AGR contain the gene source database prefix followed by a colon,
-    but geneweaver only has some genes in this format. This function adjusts the ref ids
-    to match the geneweaver format.
+    AGR only contains data from some gene data sources Geneweaver has and the format is
+    slightly different for the reference ids, so this function adds prefixes to the ids
+    where necessary for the AGR format.
 
-    :param gn_ref_id: The gene reference ID in AGR format.
-    :return: The gene reference ID in Geneweaver format.
+    :param db: The database session.
+    :param ode_ref: The gene reference ID from Geneweaver.
+    :return: The gene reference ID in AGR format.
     """
-    ref = gn_ref_id
-    prefix = ref[0 : ref.find(":")]
+    return ode_refs_to_agr(db, [ode_ref])[0]
 
-    # genes with this prefix will have the prefix removed
-    gdb_to_remove_prefix = ["WB", "FB", "SGD", "ZFIN"]
 
-    # RGD only requires removing the colon
-    if prefix == "RGD":
-        ref = ref.replace(":", "")
-    elif prefix in gdb_to_remove_prefix:
-        ind = ref.find(":") + 1
-        ref = ref[ind:]
+async def ode_ref_to_agr_async(db: "AsyncSession", ode_ref: str) -> str:
+    """Convert a gene reference ID from Geneweaver to AGR format, on an async session.
 
-    # all other gene ref ids will be returned the same if not altered in the above steps
-    return ref
+    :param db: The async database session.
+    :param ode_ref: The gene reference ID from Geneweaver.
+    :return: The gene reference ID in AGR format.
+    """
+    rows = await db.execute(gdb_ids_query([ode_ref]))
+    return ode_ref_to_agr_by_gdb_id(ode_ref, _first_gdb_ids(rows).get(ode_ref))
 
 
 def species_ode_to_agr(db: Session, ode_sp_id: int) -> Optional[int]:
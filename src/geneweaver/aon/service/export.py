@@ -0,0 +1,106 @@
+"""Serialize query results for bulk export.
+
+Exports stream rows from a server-side cursor and serialize them in chunks, so memory
+use stays constant however many rows a query returns.
+"""
+
+import csv
+import io
+import json
+from typing import Callable, Iterable, Iterator, Sequence
+
+from geneweaver.aon.enum import ExportFormat
+from sqlalchemy import Select
+from sqlalchemy.orm import InstrumentedAttribute, Session
+
+EXPORT_FETCH_SIZE = 10000
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.TSV: "text/tab-separated-values",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def stream_rows(
+    db: Session,
+    query: Select,
+    columns: Sequence[InstrumentedAttribute],
+    fetch_size: int = EXPORT_FETCH_SIZE,
+) -> Iterator[tuple]:
+    """Stream the given columns of a query's rows with a server-side cursor.
+
+    :param db: The database session.
+    :param query: The query to export.
+    :param columns: The columns to select.
+    :param fetch_size: The number of rows fetched per round trip.
+    :return: A generator of row tuples.
+    """
+    query = query.with_only_columns(*columns).execution_options(yield_per=fetch_size)
+    for row in db.execute(query):
+        yield tuple(row)
+
+
+def serialize_rows(
+    rows: Iterable[tuple],
+    names: Sequence[str],
+    export_format: ExportFormat,
+    chunk_size: int = 1000,
+) -> Iterator[str]:
+    """Serialize rows, a chunk of rows at a time.
+
+    Delimited formats start with a header line of the column names.
+
+    :param rows: The row tuples.
+    :param names: The column names.
+    :param export_format: The output format.
+    :param chunk_size: The number of rows per yielded chunk.
+    :return: A generator of serialized chunks.
+    """
+    buffer = io.StringIO()
+    if export_format == ExportFormat.NDJSON:
+
+        def write(row: tuple) -> None:
+            buffer.write(json.dumps(dict(zip(names, row)), separators=(",", ":")))
+            buffer.write("\n")
+
+    else:
+        delimiter = "\t" if export_format == ExportFormat.TSV else ","
+        writer = csv.writer(buffer, delimiter=delimiter, lineterminator="\n")
+        writer.writerow(names)
+        write = writer.writerow
+
+    for count, row in enumerate(rows, start=1):
+        write(row)
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_query(
+    session_manager: Callable[[], Session],
+    build_query: Callable[[], Select],
+    columns: Sequence[InstrumentedAttribute],
+    export_format: ExportFormat,
+) -> Iterator[str]:
+    """Stream a query's rows, serialized in the given format.
+
+    The session is opened when the first chunk is requested and closed after the
+    last one, so it lives exactly as long as the response body is being sent.
+
+    :param session_manager: Opens a session on the version to export.
+    :param build_query: Builds the query to export.
+    :param columns: The columns to export.
+    :param export_format: The output format.
+    :return: A generator of serialized chunks.
+    """
+    with session_manager() as db:
+        yield from serialize_rows(
+            stream_rows(db, build_query(), columns),
+            [c.key for c in columns],
+            export_format,
+        )
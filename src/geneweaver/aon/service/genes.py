@@ -1,11 +1,56 @@
 """Module with database functions for genes."""
 
-from typing import List, Optional, Type
+from typing import TYPE_CHECKING, List, Optional, Type
 
 from geneweaver.aon.models import Gene
-from geneweaver.aon.service.utils import apply_paging
+from geneweaver.aon.service.rows import GENE_COLUMNS, GeneRow, to_rows
+from geneweaver.aon.service.utils import Cursor, apply_paging
+from sqlalchemy import Select, select
 from sqlalchemy.orm import Session
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+PAGING_KEYS = ("gn_id",)
+
+
+def genes_query(
+    species_id: Optional[int] = None, prefix: Optional[str] = None
+) -> Select:
+    """Build the query for genes with optional filtering.
+
+    :param species_id: The species id to filter by.
+    :param prefix: The gene prefix to filter by.
+    :return: The unpaged query.
+    """
+    query = select(Gene)
+    if species_id is not None:
+        query = query.where(Gene.sp_id == species_id)
+    if prefix is not None:
+        query = query.where(Gene.gn_prefix == prefix)
+    return query
+
+
+def genes_page_query(
+    species_id: Optional[int] = None,
+    prefix: Optional[str] = None,
+    start: Optional[int] = None,
+    limit: Optional[int] = 1000,
+    cursor: Optional[Cursor] = None,
+) -> Select:
+    """Build the query for a page of genes, of the columns of `GeneRow`.
+
+    :param species_id: The species id to filter by.
+    :param prefix: The gene prefix to filter by.
+    :param start: The start index for paging.
+    :param limit: The limit for paging.
+    :param cursor: The key of the last gene of the previous page.
+    :return: The paged query.
+    """
+    query = genes_query(species_id=species_id, prefix=prefix)
+    query = apply_paging(query, start, limit, cursor, [Gene.gn_id])
+    return query.with_only_columns(*GENE_COLUMNS)
+
 
 def get_genes(
     db: Session,
@@ -13,7 +58,8 @@ def get_genes(
     prefix: Optional[str] = None,
     start: Optional[int] = None,
     limit: Optional[int] = 1000,
-) -> List[Type[Gene]]:
+    cursor: Optional[Cursor] = None,
+) -> List[GeneRow]:
     """Get all genes with optional filtering.
 
     :param db: The database session.
@@ -21,15 +67,33 @@ def get_genes(
     :param prefix: The gene prefix to filter by.
     :param start: The start index for paging.
     :param limit: The limit for paging.
+    :param cursor: The key of the last gene of the previous page.
     :return: All genes with optional filtering.
     """
-    query = db.query(Gene)
-    if species_id is not None:
-        query = query.filter(Gene.sp_id == species_id)
-    if prefix is not None:
-        query = query.filter(Gene.gn_prefix == prefix)
-    query = apply_paging(query, start, limit)
-    return query.all()
+    query = genes_page_query(species_id, prefix, start, limit, cursor)
+    return to_rows(GeneRow, db.execute(query))
+
+
+async def get_genes_async(
+    db: "AsyncSession",
+    species_id: Optional[int] = None,
+    prefix: Optional[str] = None,
+    start: Optional[int] = None,
+    limit: Optional[int] = 1000,
+    cursor: Optional[Cursor] = None,
+) -> List[GeneRow]:
+    """Get all genes with optional filtering, on an async session.
+
+    :param db: The async database session.
+    :param species_id: The species id to filter by.
+    :param prefix: The gene prefix to filter by.
+    :param start: The start index for paging.
+    :param limit: The limit for paging.
+    :param cursor: The key of the last gene of the previous page.
+    :return: All genes with optional filtering.
+    """
+    query = genes_page_query(species_id, prefix, start, limit, cursor)
+    return to_rows(GeneRow, await db.execute(query))
 
 
 def gene_by_id(db: Session, gene_id: int) -> Type[Gene]:
@@ -39,7 +103,26 @@ def gene_by_id(db: Session, gene_id: int) -> Type[Gene]:
     :param gene_id: The gene id to search for.
     :return: The gene with the id.
     """
-    return db.query(Gene).get(gene_id)
+    return db.get(Gene, gene_id)
+
+
+async def gene_by_id_async(db: "AsyncSession", gene_id: int) -> Optional[Gene]:
+    """Get a gene by id, on an async session.
+
+    :param db: The async database session.
+    :param gene_id: The gene id to search for.
+    :return: The gene with the id.
+    """
+    return await db.get(Gene, gene_id)
+
+
+def gene_by_ref_id_query(ref_id: str) -> Select:
+    """Build the query for the genes with a reference id.
+
+    :param ref_id: The reference id to search for.
+    :return: The query.
+    """
+    return select(Gene).where(Gene.gn_ref_id == ref_id)
 
 
 def gene_by_ref_id(db: Session, ref_id: str) -> List[Type[Gene]]:
@@ -49,7 +132,17 @@ def gene_by_ref_id(db: Session, ref_id: str) -> List[Type[Gene]]:
     :param ref_id: The reference id to search for.
     :return: The gene with the reference id.
     """
-    return db.query(Gene).filter(Gene.gn_ref_id == ref_id).all()
+    return db.execute(gene_by_ref_id_query(ref_id)).scalars().all()
+
+
+async def gene_by_ref_id_async(db: "AsyncSession", ref_id: str) -> List[Type[Gene]]:
+    """Get a gene by reference id, on an async session.
+
+    :param db: The async database session.
+    :param ref_id: The reference id to search for.
+    :return: The gene with the reference id.
+    """
+    return (await db.execute(gene_by_ref_id_query(ref_id))).scalars().all()
 
 
 def genes_by_prefix(db: Session, prefix: str) -> List[Type[Gene]]:
@@ -1,11 +1,76 @@
 """Module with functions for getting homologs from the database."""
 
-from typing import List, Optional, Type
+from typing import TYPE_CHECKING, List, Optional
 
 from geneweaver.aon.models import Homology
-from geneweaver.aon.service.utils import apply_paging
+from geneweaver.aon.service.rows import HOMOLOG_COLUMNS, HomologRow, to_rows
+from geneweaver.aon.service.utils import Cursor, apply_paging
+from sqlalchemy import Select, select
 from sqlalchemy.orm import Session
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+PAGING_KEYS = ("hom_id", "gn_id")
+
+
+def homologs_query(
+    homolog_id: Optional[int] = None,
+    source_name: Optional[str] = None,
+    species_id: Optional[int] = None,
+    gene_id: Optional[int] = None,
+) -> Select:
+    """Build the query for homologs with optional filters.
+
+    :param homolog_id: The homolog ID.
+    :param source_name: The source name.
+    :param species_id: The species ID.
+    :param gene_id: The gene ID.
+    :return: The unpaged query.
+    """
+    base_query = select(Homology)
+    if homolog_id is not None:
+        base_query = base_query.where(Homology.hom_id == homolog_id)
+    if source_name is not None:
+        base_query = base_query.where(Homology.hom_source_name == source_name)
+    if species_id is not None:
+        base_query = base_query.where(Homology.sp_id == species_id)
+    if gene_id is not None:
+        base_query = base_query.where(Homology.gn_id == gene_id)
+    return base_query
+
+
+def homologs_page_query(
+    homolog_id: Optional[int] = None,
+    source_name: Optional[str] = None,
+    species_id: Optional[int] = None,
+    gene_id: Optional[int] = None,
+    start: Optional[int] = None,
+    limit: Optional[int] = 1000,
+    cursor: Optional[Cursor] = None,
+) -> Select:
+    """Build the query for a page of homologs, of the columns of `HomologRow`.
+
+    :param homolog_id: The homolog ID.
+    :param source_name: The source name.
+    :param species_id: The species ID.
+    :param gene_id: The gene ID.
+    :param start: The start index for paging.
+    :param limit: The number of results to return.
+    :param cursor: The key of the last homolog of the previous page.
+    :return: The paged query.
+    """
+    base_query = homologs_query(
+        homolog_id=homolog_id,
+        source_name=source_name,
+        species_id=species_id,
+        gene_id=gene_id,
+    )
+    base_query = apply_paging(
+        base_query, start, limit, cursor, [Homology.hom_id, Homology.gn_id]
+    )
+    return base_query.with_only_columns(*HOMOLOG_COLUMNS)
+
 
 def get_homologs(
     db: Session,
@@ -15,7 +80,8 @@ def get_homologs(
     gene_id: Optional[int] = None,
     start: Optional[int] = None,
     limit: Optional[int] = 1000,
-) -> List[Type[Homology]]:
+    cursor: Optional[Cursor] = None,
+) -> List[HomologRow]:
     """Get homologs with optional filters.
 
     :param db: The database session.
@@ -25,20 +91,41 @@ def get_homologs(
     :param gene_id: The gene ID.
     :param start: The start index for paging.
     :param limit: The number of results to return.
+    :param cursor: The key of the last homolog of the previous page.
     :return: The homologs with optional filters.
     """
-    base_query = db.query(Homology)
-    if homolog_id is not None:
-        base_query = base_query.filter(Homology.hom_id == homolog_id)
-    if source_name is not None:
-        base_query = base_query.filter(Homology.hom_source_name == source_name)
-    if species_id is not None:
-        base_query = base_query.filter(Homology.sp_id == species_id)
-    if gene_id is not None:
-        base_query = base_query.filter(Homology.gn_id == gene_id)
-    base_query = apply_paging(base_query, start, limit)
+    query = homologs_page_query(
+        homolog_id, source_name, species_id, gene_id, start, limit, cursor
+    )
+    return to_rows(HomologRow, db.execute(query))
 
-    return base_query.all()
+
+async def get_homologs_async(
+    db: "AsyncSession",
+    homolog_id: Optional[int] = None,
+    source_name: Optional[str] = None,
+    species_id: Optional[int] = None,
+    gene_id: Optional[int] = None,
+    start: Optional[int] = None,
+    limit: Optional[int] = 1000,
+    cursor: Optional[Cursor] = None,
+) -> List[HomologRow]:
+    """Get homologs with optional filters, on an async session.
+
+    :param db: The async database session.
+    :param homolog_id: The homolog ID.
+    :param source_name: The source name.
+    :param species_id: The species ID.
+    :param gene_id: The gene ID.
+    :param start: The start index for paging.
+    :param limit: The number of results to return.
+    :param cursor: The key of the last homolog of the previous page.
+    :return: The homologs with optional filters.
+    """
+    query = homologs_page_query(
+        homolog_id, source_name, species_id, gene_id, start, limit, cursor
+    )
+    return to_rows(HomologRow, await db.execute(query))
 
 
 def homolog_sources(db: Session) -> List[str]:
@@ -0,0 +1,180 @@
+"""An in-memory ortholog graph of a schema version.
+
+A completed version never changes, so its orthologs can be held in memory as compact
+arrays and gene keyed lookups answered without a database round trip. The arrays and
+their lookups are those of `geneweaver.aon.embedded.graph.OrthologIndex`, this module
+builds them from the database and returns the rows of `service.rows`.
+
+Only queries on a from or to gene are answered from the graph, other queries would
+need a scan and are left to the database, see `service.orthologs.get_orthologs`.
+"""
+
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from geneweaver.aon.core.schema_version import SCHEMA_VERSION_INFO_KEY
+from geneweaver.aon.embedded.graph import OrthologIndex
+from geneweaver.aon.models import Algorithm, Gene, Ortholog, OrthologAlgorithms
+from geneweaver.aon.service.rows import OrthologRow
+from geneweaver.aon.service.utils import Cursor, InvalidCursorError
+from sqlalchemy import Select, func, select
+from sqlalchemy.orm import Session, sessionmaker
+
+logger = logging.getLogger("uvicorn.error")
+
+GRAPH_FETCH_SIZE = 100000
+
+
+class OrthologGraph(OrthologIndex):
+    """The orthologs of a schema version, in CSR layout."""
+
+    def orthologs(
+        self,
+        from_species: Optional[int] = None,
+        to_species: Optional[int] = None,
+        from_gene_id: Optional[int] = None,
+        to_gene_id: Optional[int] = None,
+        algorithm_id: Optional[int] = None,
+        possible_match_algorithms: Optional[int] = None,
+        best: Optional[bool] = None,
+        revised: Optional[bool] = None,
+        start: Optional[int] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[Cursor] = None,
+    ) -> List[OrthologRow]:
+        """Get the orthologs of a gene, with the filters of `get_orthologs`.
+
+        Results are ordered by `ort_id`, as they are from the database.
+
+        :param from_species: The species to get orthologs from.
+        :param to_species: The species to get orthologs to.
+        :param from_gene_id: The gene id to get orthologs from.
+        :param to_gene_id: The gene id to get orthologs to.
+        :param algorithm_id: The algorithm id to get orthologs from.
+        :param possible_match_algorithms: The number of possible match algorithms.
+        :param best: The best orthologs.
+        :param revised: The revised orthologs.
+        :param start: The start index for paging.
+        :param limit: The limit for paging.
+        :param cursor: The key of the last ortholog of the previous page.
+        :return: The orthologs.
+        :raises InvalidCursorError: If the cursor is not a single `ort_id`.
+        """
+        if cursor is not None and len(cursor) != 1:
+            raise InvalidCursorError("Invalid cursor.")
+        matches = self.find(
+            from_species=from_species,
+            to_species=to_species,
+            from_gene_id=from_gene_id,
+            to_gene_id=to_gene_id,
+            algorithm_id=algorithm_id,
+            possible_match_algorithms=possible_match_algorithms,
+            best=best,
+            revised=revised,
+            start=start,
+            limit=limit,
+            after_ort_id=None if cursor is None else cursor[0],
+        )
+        return [OrthologRow(*self.edge(index)) for index in matches]
+
+
+def build_ortholog_graph(
+    db: Session, fetch_size: int = GRAPH_FETCH_SIZE
+) -> OrthologGraph:
+    """Build the ortholog graph of the version a session is bound to.
+
+    The orthologs are read with a single streamed query, with their algorithms
+    aggregated into an array per ortholog.
+
+    :param db: The database session.
+    :param fetch_size: The number of rows fetched per round trip.
+    :return: The graph.
+    """
+
+    def stream(statement: Select) -> Iterator[tuple]:
+        # Executed when first iterated, so only one result is open at a time.
+        for row in db.execute(statement.execution_options(yield_per=fetch_size)):
+            yield tuple(row)
+
+    ortholog_algorithms = (
+        select(
+            OrthologAlgorithms.ort_id,
+            func.array_agg(OrthologAlgorithms.alg_id).label("alg_ids"),
+        )
+        .group_by(OrthologAlgorithms.ort_id)
+        .subquery()
+    )
+    edges = (
+        select(
+            Ortholog.ort_id,
+            Ortholog.from_gene,
+            Ortholog.to_gene,
+            Ortholog.ort_is_best,
+            Ortholog.ort_is_best_revised,
+            Ortholog.ort_is_best_is_adjusted,
+            Ortholog.ort_num_possible_match_algorithms,
+            Ortholog.ort_source_name,
+            ortholog_algorithms.c.alg_ids,
+        )
+        .outerjoin(ortholog_algorithms, ortholog_algorithms.c.ort_id == Ortholog.ort_id)
+        .order_by(Ortholog.from_gene, Ortholog.ort_id)
+    )
+    return OrthologGraph(
+        stream(select(Gene.gn_id, Gene.sp_id)),
+        stream(edges),
+        db.execute(select(Algorithm.alg_id)).scalars().all(),
+    )
+
+
+# schema version id -> graph
+_graphs: Dict[int, OrthologGraph] = {}
+
+
+def get_graph(db: Session) -> Optional[OrthologGraph]:
+    """Get the graph of the version a session is bound to, if it has been loaded.
+
+    :param db: The database session.
+    :return: The graph, or None.
+    """
+    return _graphs.get(db.info.get(SCHEMA_VERSION_INFO_KEY))
+
+
+def load_graph(version_id: int, session_manager: sessionmaker) -> bool:
+    """Build and register the graph of a version.
+
+    Failures are logged rather than raised, as queries fall back to the database.
+
+    :param version_id: The schema version id.
+    :param session_manager: The session manager of the version.
+    :return: Whether the graph was loaded.
+    """
+    logger.info(f"Building ortholog graph of schema version {version_id}.")
+    try:
+        with session_manager() as db:
+            graph = build_ortholog_graph(db)
+    except Exception:
+        logger.exception(f"Failed to build ortholog graph of version {version_id}.")
+        return False
+    register_graph(version_id, graph)
+    return True
+
+
+def register_graph(version_id: int, graph: OrthologGraph) -> None:
+    """Serve the ortholog queries of a version from a graph.
+
+    :param version_id: The schema version id.
+    :param graph: The graph.
+    """
+    _graphs[version_id] = graph
+    logger.info(f"Loaded {len(graph)} orthologs of schema version {version_id}.")
+
+
+def retain_graphs(version_ids: Iterable[int]) -> None:
+    """Drop the graphs of every version but the given ones.
+
+    :param version_ids: The schema version ids to keep graphs for.
+    """
+    keep = set(version_ids)
+    for version_id in list(_graphs):
+        if version_id not in keep:
+            del _graphs[version_id]
@@ -1,11 +1,21 @@
 """Module with functions for querying orthologs from the database."""
 
-from typing import List, Optional, Type
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Type, Union
 
+from geneweaver.aon.enum import ReferenceGeneIDType
 from geneweaver.aon.models import Algorithm, Gene, Ortholog, OrthologAlgorithms
-from geneweaver.aon.service.utils import apply_paging
+from geneweaver.aon.service import convert, ortholog_graph
+from geneweaver.aon.service.rows import ORTHOLOG_COLUMNS, OrthologRow, to_rows
+from geneweaver.aon.service.utils import Cursor, apply_paging
+from sqlalchemy import INTEGER, VARCHAR, Select, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Session, aliased
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+PAGING_KEYS = ("ort_id",)
+
 
 def get_ortholog_from_gene(db: Session, ortholog_id: int) -> Optional[Type[Gene]]:
     """Get ortholog by id.
@@ -31,8 +41,7 @@ def get_ortholog_to_gene(db: Session, ortholog_id: int) -> Optional[Type[Gene]]:
     return db.query(Gene).get(get_ortholog(db, ortholog_id).to_gene)
 
 
-def get_orthologs(
-    db: Session,
+def orthologs_query(
     from_species: Optional[int] = None,
     to_species: Optional[int] = None,
     from_gene_id: Optional[int] = None,
@@ -41,12 +50,9 @@ def get_orthologs(
     possible_match_algorithms: Optional[int] = None,
     best: Optional[bool] = None,
     revised: Optional[bool] = None,
-    start: Optional[int] = None,
-    limit: Optional[int] = 1000,
-) -> List[Type[Ortholog]]:
-    """Get orthologs with dynamic optional filters.
+) -> Select:
+    """Build the query for orthologs with dynamic optional filters.
 
-    :param db: The database session.
     :param from_species: The species to get orthologs from.
     :param to_species: The species to get orthologs to.
     :param from_gene_id: The gene id to get orthologs from.
@@ -55,51 +61,266 @@ def get_orthologs(
     :param possible_match_algorithms: The number of possible match algorithms.
     :param best: The best orthologs.
     :param revised: The revised orthologs.
-    :param start: The start index for paging.
-    :param limit: The limit for paging.
-    :return: The orthologs for the provided query.
+    :return: The unpaged query.
     """
-    query = db.query(Ortholog)
+    query = select(Ortholog)
 
     if algorithm_id is not None:
         query = (
             query.join(OrthologAlgorithms)
             .join(Algorithm)
-            .filter(Algorithm.alg_id == algorithm_id)
+            .where(Algorithm.alg_id == algorithm_id)
         )
 
     if from_species is not None:
         from_gene = aliased(Gene)
-        query = query.join(from_gene, Ortholog.from_gene == from_gene.gn_id).filter(
+        query = query.join(from_gene, Ortholog.from_gene == from_gene.gn_id).where(
             from_gene.sp_id == from_species
         )
 
     if to_species is not None:
         to_gene = aliased(Gene)
-        query = query.join(to_gene, Ortholog.to_gene == to_gene.gn_id).filter(
+        query = query.join(to_gene, Ortholog.to_gene == to_gene.gn_id).where(
             to_gene.sp_id == to_species
         )
 
     if from_gene_id:
-        query = query.filter(Ortholog.from_gene == from_gene_id)
+        query = query.where(Ortholog.from_gene == from_gene_id)
 
     if to_gene_id:
-        query = query.filter(Ortholog.to_gene.id == to_gene_id)
+        query = query.where(Ortholog.to_gene == to_gene_id)
 
     if best is not None:
-        query = query.filter(Ortholog.ort_is_best == best)
+        query = query.where(Ortholog.ort_is_best == best)
 
     if revised is not None:
-        query = query.filter(Ortholog.ort_is_best_revised == revised)
+        query = query.where(Ortholog.ort_is_best_revised == revised)
 
     if possible_match_algorithms is not None:
-        query = query.filter(
+        query = query.where(
             Ortholog.ort_num_possible_match_algorithms == possible_match_algorithms
         )
 
-    query = apply_paging(query, start, limit)
+    return query
+
+
+def graph_orthologs_page(
+    db: Union[Session, "AsyncSession"],
+    from_species: Optional[int] = None,
+    to_species: Optional[int] = None,
+    from_gene_id: Optional[int] = None,
+    to_gene_id: Optional[int] = None,
+    algorithm_id: Optional[int] = None,
+    possible_match_algorithms: Optional[int] = None,
+    best: Optional[bool] = None,
+    revised: Optional[bool] = None,
+    start: Optional[int] = None,
+    limit: Optional[int] = 1000,
+    cursor: Optional[Cursor] = None,
+) -> Optional[List[OrthologRow]]:
+    """Get a page of orthologs from the ortholog graph, without running any SQL.
+
+    Only queries by gene are answered, and only when the graph of the session's
+    version is loaded.
+
+    :param db: The database session, sync or async.
+    :param from_species: The species to get orthologs from.
+    :param to_species: The species to get orthologs to.
+    :param from_gene_id: The gene id to get orthologs from.
+    :param to_gene_id: The gene id to get orthologs to.
+    :param algorithm_id: The algorithm id to get orthologs from.
+    :param possible_match_algorithms: The number of possible match algorithms.
+    :param best: The best orthologs.
+    :param revised: The revised orthologs.
+    :param start: The start index for paging.
+    :param limit: The limit for paging.
+    :param cursor: The key of the last ortholog of the previous page.
+    :return: The orthologs, or None if the query must go to the database.
+    """
+    if not (from_gene_id or to_gene_id):
+        return None
+    graph = ortholog_graph.get_graph(db)
+    if graph is None:
+        return None
+    return graph.orthologs(
+        from_species=from_species,
+        to_species=to_species,
+        from_gene_id=from_gene_id,
+        to_gene_id=to_gene_id,
+        algorithm_id=algorithm_id,
+        possible_match_algorithms=possible_match_algorithms,
+        best=best,
+        revised=revised,
+        start=start,
+        limit=limit,
+        cursor=cursor,
+    )
+
 
-    return query.all()
+def orthologs_page_query(
+    from_species: Optional[int] = None,
+    to_species: Optional[int] = None,
+    from_gene_id: Optional[int] = None,
+    to_gene_id: Optional[int] = None,
+    algorithm_id: Optional[int] = None,
+    possible_match_algorithms: Optional[int] = None,
+    best: Optional[bool] = None,
+    revised: Optional[bool] = None,
+    start: Optional[int] = None,
+    limit: Optional[int] = 1000,
+    cursor: Optional[Cursor] = None,
+) -> Select:
+    """Build the query for a page of orthologs, of the columns of `OrthologRow`.
+
+    :param from_species: The species to get orthologs from.
+    :param to_species: The species to get orthologs to.
+    :param from_gene_id: The gene id to get orthologs from.
+    :param to_gene_id: The gene id to get orthologs to.
+    :param algorithm_id: The algorithm id to get orthologs from.
+    :param possible_match_algorithms: The number of possible match algorithms.
+    :param best: The best orthologs.
+    :param revised: The revised orthologs.
+    :param start: The start index for paging.
+    :param limit: The limit for paging.
+    :param cursor: The key of the last ortholog of the previous page.
+    :return: The paged query.
+    """
+    query = orthologs_query(
+        from_species=from_species,
+        to_species=to_species,
+        from_gene_id=from_gene_id,
+        to_gene_id=to_gene_id,
+        algorithm_id=algorithm_id,
+        possible_match_algorithms=possible_match_algorithms,
+        best=best,
+        revised=revised,
+    )
+    query = apply_paging(query, start, limit, cursor, [Ortholog.ort_id])
+    return query.with_only_columns(*ORTHOLOG_COLUMNS)
+
+
+def get_orthologs(
+    db: Session,
+    from_species: Optional[int] = None,
+    to_species: Optional[int] = None,
+    from_gene_id: Optional[int] = None,
+    to_gene_id: Optional[int] = None,
+    algorithm_id: Optional[int] = None,
+    possible_match_algorithms: Optional[int] = None,
+    best: Optional[bool] = None,
+    revised: Optional[bool] = None,
+    start: Optional[int] = None,
+    limit: Optional[int] = 1000,
+    cursor: Optional[Cursor] = None,
+) -> List[OrthologRow]:
+    """Get orthologs with dynamic optional filters.
+
+    :param db: The database session.
+    :param from_species: The species to get orthologs from.
+    :param to_species: The species to get orthologs to.
+    :param from_gene_id: The gene id to get orthologs from.
+    :param to_gene_id: The gene id to get orthologs to.
+    :param algorithm_id: The algorithm id to get orthologs from.
+    :param possible_match_algorithms: The number of possible match algorithms.
+    :param best: The best orthologs.
+    :param revised: The revised orthologs.
+    :param start: The start index for paging.
+    :param limit: The limit for paging.
+    :param cursor: The key of the last ortholog of the previous page.
+    :return: The orthologs for the provided query.
+    """
+    page = graph_orthologs_page(
+        db,
+        from_species,
+        to_species,
+        from_gene_id,
+        to_gene_id,
+        algorithm_id,
+        possible_match_algorithms,
+        best,
+        revised,
+        start,
+        limit,
+        cursor,
+    )
+    if page is not None:
+        return page
+    query = orthologs_page_query(
+        from_species,
+        to_species,
+        from_gene_id,
+        to_gene_id,
+        algorithm_id,
+        possible_match_algorithms,
+        best,
+        revised,
+        start,
+        limit,
+        cursor,
+    )
+    return to_rows(OrthologRow, db.execute(query))
+
+
+async def get_orthologs_async(
+    db: "AsyncSession",
+    from_species: Optional[int] = None,
+    to_species: Optional[int] = None,
+    from_gene_id: Optional[int] = None,
+    to_gene_id: Optional[int] = None,
+    algorithm_id: Optional[int] = None,
+    possible_match_algorithms: Optional[int] = None,
+    best: Optional[bool] = None,
+    revised: Optional[bool] = None,
+    start: Optional[int] = None,
+    limit: Optional[int] = 1000,
+    cursor: Optional[Cursor] = None,
+) -> List[OrthologRow]:
+    """Get orthologs with dynamic optional filters, on an async session.
+
+    :param db: The async database session.
+    :param from_species: The species to get orthologs from.
+    :param to_species: The species to get orthologs to.
+    :param from_gene_id: The gene id to get orthologs from.
+    :param to_gene_id: The gene id to get orthologs to.
+    :param algorithm_id: The algorithm id to get orthologs from.
+    :param possible_match_algorithms: The number of possible match algorithms.
+    :param best: The best orthologs.
+    :param revised: The revised orthologs.
+    :param start: The start index for paging.
+    :param limit: The limit for paging.
+    :param cursor: The key of the last ortholog of the previous page.
+    :return: The orthologs for the provided query.
+    """
+    page = graph_orthologs_page(
+        db,
+        from_species,
+        to_species,
+        from_gene_id,
+        to_gene_id,
+        algorithm_id,
+        possible_match_algorithms,
+        best,
+        revised,
+        start,
+        limit,
+        cursor,
+    )
+    if page is not None:
+        return page
+    query = orthologs_page_query(
+        from_species,
+        to_species,
+        from_gene_id,
+        to_gene_id,
+        algorithm_id,
+        possible_match_algorithms,
+        best,
+        revised,
+        start,
+        limit,
+        cursor,
+    )
+    return to_rows(OrthologRow, await db.execute(query))
 
 
 def get_ortholog(db: Session, ortholog_id: int) -> Type[Ortholog]:
@@ -110,3 +331,114 @@ def get_ortholog(db: Session, ortholog_id: int) -> Type[Ortholog]:
     :return: The ortholog for the provided id.
     """
     return db.query(Ortholog).get(ortholog_id)
+
+
+def translate_genes(
+    db: Session,
+    ref_ids: Sequence[str],
+    ref_id_type: ReferenceGeneIDType = ReferenceGeneIDType.AON,
+    to_species: Optional[int] = None,
+    algorithm_id: Optional[int] = None,
+    best: Optional[bool] = None,
+    revised: Optional[bool] = None,
+) -> List[dict]:
+    """Translate a set of genes to their orthologs.
+
+    However many genes are given, this runs one query to find the genes, one to
+    find their orthologs and, for Geneweaver reference ids, one to convert them.
+
+    :param db: The database session.
+    :param ref_ids: The gene reference ids to translate.
+    :param ref_id_type: The format of the reference ids, and of the ortholog
+        reference ids in the result.
+    :param to_species: Only return orthologs in this species.
+    :param algorithm_id: Only return orthologs found by this algorithm.
+    :param best: Filter on whether the ortholog is the best match.
+    :param revised: Filter on whether the ortholog is the best revised match.
+    :return: One entry per reference id, in the same order, with the matching AON
+        gene (or None if it is not found) and its orthologs.
+    """
+    if ref_id_type == ReferenceGeneIDType.GW:
+        gn_ref_ids = convert.ode_refs_to_agr(db, ref_ids)
+    else:
+        gn_ref_ids = list(ref_ids)
+
+    genes = {
+        gene.gn_ref_id: gene
+        for gene in db.query(Gene.gn_id, Gene.gn_ref_id, Gene.sp_id).filter(
+            Gene.gn_ref_id
+            == any_(
+                bindparam("gn_ref_ids", list(set(gn_ref_ids)), type_=ARRAY(VARCHAR))
+            )
+        )
+    }
+
+    orthologs: Dict[int, List[dict]] = {}
+    if genes:
+        to_gene = aliased(Gene)
+        query = (
+            db.query(
+                Ortholog.ort_id,
+                Ortholog.from_gene,
+                Ortholog.ort_is_best,
+                Ortholog.ort_is_best_revised,
+                to_gene.gn_id,
+                to_gene.gn_ref_id,
+                to_gene.sp_id,
+            )
+            .join(to_gene, Ortholog.to_gene == to_gene.gn_id)
+            .filter(
+                Ortholog.from_gene
+                == any_(
+                    bindparam(
+                        "gn_ids",
+                        [g.gn_id for g in genes.values()],
+                        type_=ARRAY(INTEGER),
+                    )
+                )
+            )
+        )
+        if to_species is not None:
+            query = query.filter(to_gene.sp_id == to_species)
+        if best is not None:
+            query = query.filter(Ortholog.ort_is_best == best)
+        if revised is not None:
+            query = query.filter(Ortholog.ort_is_best_revised == revised)
+        if algorithm_id is not None:
+            query = query.filter(
+                db.query(OrthologAlgorithms)
+                .filter(
+                    OrthologAlgorithms.ort_id == Ortholog.ort_id,
+                    OrthologAlgorithms.alg_id == algorithm_id,
+                )
+                .exists()
+            )
+
+        rows = query.all()
+        to_ref_ids = [row.gn_ref_id for row in rows]
+        if ref_id_type == ReferenceGeneIDType.GW:
+            to_ref_ids = convert.agr_refs_to_ode(to_ref_ids)
+        for row, to_ref_id in zip(rows, to_ref_ids):
+            orthologs.setdefault(row.from_gene, []).append(
+                {
+                    "ort_id": row.ort_id,
+                    "ref_id": to_ref_id,
+                    "gn_id": row.gn_id,
+                    "gn_ref_id": row.gn_ref_id,
+                    "sp_id": row.sp_id,
+                    "ort_is_best": row.ort_is_best,
+                    "ort_is_best_revised": row.ort_is_best_revised,
+                }
+            )
+
+    results = []
+    for ref_id, gn_ref_id in zip(ref_ids, gn_ref_ids):
+        gene = genes.get(gn_ref_id)
+        results.append(
+            {
+                "ref_id": ref_id,
+                "gene": None if gene is None else dict(gene._mapping),
+                "orthologs": [] if gene is None else orthologs.get(gene.gn_id, []),
+            }
+        )
+    return results
@@ -0,0 +1,77 @@
+"""Lightweight rows returned by the list services, in place of model instances.
+
+For a page of a thousand rows, hydrating model instances and then walking them with
+FastAPI's `jsonable_encoder` costs more than the query itself. The list services
+select only these columns, into frozen dataclasses that orjson serializes natively,
+see `geneweaver.aon.dependencies.page_response`.
+"""
+
+from dataclasses import dataclass, fields
+from typing import Iterable, List, Optional, Tuple, Type, TypeVar
+
+from geneweaver.aon.core.database import BaseAGR
+from geneweaver.aon.models import Gene, Homology, Ortholog
+from sqlalchemy.orm import InstrumentedAttribute
+
+RowT = TypeVar("RowT")
+
+
+@dataclass(frozen=True)
+class GeneRow:
+    """A gene, with the columns of `models.Gene`."""
+
+    gn_id: int
+    gn_ref_id: str
+    gn_prefix: str
+    sp_id: int
+
+
+@dataclass(frozen=True)
+class OrthologRow:
+    """An ortholog, with the columns of `models.Ortholog`."""
+
+    ort_id: int
+    from_gene: int
+    to_gene: int
+    ort_is_best: Optional[bool]
+    ort_is_best_revised: Optional[bool]
+    ort_is_best_is_adjusted: Optional[bool]
+    ort_num_possible_match_algorithms: Optional[int]
+    ort_source_name: str
+
+
+@dataclass(frozen=True)
+class HomologRow:
+    """A homolog, with the columns of `models.Homology`."""
+
+    hom_id: int
+    gn_id: int
+    sp_id: int
+    hom_source_name: str
+
+
+def row_columns(
+    model: Type[BaseAGR], row_type: type
+) -> Tuple[InstrumentedAttribute, ...]:
+    """Get the model columns of the fields of a row type, in field order.
+
+    :param model: The model the rows are selected from.
+    :param row_type: The row dataclass.
+    :return: The columns to select.
+    """
+    return tuple(getattr(model, field.name) for field in fields(row_type))
+
+
+def to_rows(row_type: Type[RowT], results: Iterable[tuple]) -> List[RowT]:
+    """Build rows from the results of a query on their `row_columns`.
+
+    :param row_type: The row dataclass.
+    :param results: The result rows.
+    :return: The rows.
+    """
+    return [row_type(*result) for result in results]
+
+
+GENE_COLUMNS = row_columns(Gene, GeneRow)
+ORTHOLOG_COLUMNS = row_columns(Ortholog, OrthologRow)
+HOMOLOG_COLUMNS = row_columns(Homology, HomologRow)
@@ -0,0 +1,148 @@
+"""Build the snapshot files of a schema version from the database.
+
+The file format, and the memory mapped reader API workers and the embedded client
+share, are in `geneweaver.aon.embedded.snapshot`.
+"""
+
+import logging
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from geneweaver.aon.embedded.graph import csr_offsets, csr_rows
+from geneweaver.aon.embedded.snapshot import (
+    Snapshot,
+    SnapshotError,
+    string_sections,
+    write_snapshot,
+)
+from geneweaver.aon.models import Gene, Homology, Species
+from geneweaver.aon.service import ortholog_graph
+from geneweaver.aon.service.ortholog_graph import OrthologGraph, build_ortholog_graph
+from sqlalchemy import Select, select
+from sqlalchemy.orm import Session, sessionmaker
+
+logger = logging.getLogger("uvicorn.error")
+
+SNAPSHOT_FETCH_SIZE = 100000
+
+
+def build_snapshot_sections(
+    db: Session, fetch_size: int = SNAPSHOT_FETCH_SIZE
+) -> Dict[str, array]:
+    """Read the sections of a snapshot from the version a session is bound to.
+
+    :param db: The database session.
+    :param fetch_size: The number of rows fetched per round trip.
+    :return: The arrays, by section name.
+    """
+
+    def stream(statement: Select) -> Iterator[tuple]:
+        for row in db.execute(statement.execution_options(yield_per=fetch_size)):
+            yield tuple(row)
+
+    graph = build_ortholog_graph(db, fetch_size)
+    sections = graph.sections()
+    sections.update(string_sections("ortholog_source_names", graph.source_names))
+
+    num_genes = len(graph.gene_species)
+    sections.update(_gene_sections(stream, num_genes))
+
+    species = sorted(
+        stream(select(Species.sp_id, Species.sp_name, Species.sp_taxon_id))
+    )
+    sections["species_ids"] = array("q", (s[0] for s in species))
+    sections.update(string_sections("species_names", (s[1] for s in species)))
+    sections["species_taxon_ids"] = array("q", (s[2] for s in species))
+
+    sections.update(_homology_sections(stream, num_genes))
+    return sections
+
+
+def _gene_sections(
+    stream: Callable[[Select], Iterator[tuple]], num_genes: int
+) -> Dict[str, array]:
+    """Read gene references and prefixes, with the gene ids sorted by reference."""
+    ref_ids: List[str] = [""] * num_genes
+    prefixes: Dict[str, int] = {}
+    gene_prefix = array("H", [0]) * num_genes
+    for gn_id, ref_id, prefix in stream(
+        select(Gene.gn_id, Gene.gn_ref_id, Gene.gn_prefix)
+    ):
+        ref_ids[gn_id] = ref_id
+        gene_prefix[gn_id] = prefixes.setdefault(prefix, len(prefixes))
+    return {
+        **string_sections("gene_ref_ids", ref_ids),
+        "gene_prefix": gene_prefix,
+        **string_sections("gene_prefix_names", prefixes),
+        "gene_ref_order": array(
+            "q",
+            sorted((i for i, r in enumerate(ref_ids) if r), key=ref_ids.__getitem__),
+        ),
+    }
+
+
+def _homology_sections(
+    stream: Callable[[Select], Iterator[tuple]], num_genes: int
+) -> Dict[str, array]:
+    """Read homology clusters, with CSR indexes by cluster and by gene."""
+    hom_ids, hom_genes, hom_sources = array("q"), array("q"), array("B")
+    sources: Dict[str, int] = {}
+    for hom_id, gn_id, source_name in stream(
+        select(Homology.hom_id, Homology.gn_id, Homology.hom_source_name).order_by(
+            Homology.hom_id, Homology.gn_id
+        )
+    ):
+        hom_ids.append(hom_id)
+        hom_genes.append(gn_id)
+        hom_sources.append(sources.setdefault(source_name, len(sources)))
+
+    num_genes = max(num_genes, max(hom_genes, default=-1) + 1)
+    gene_offsets = csr_offsets(hom_genes, num_genes)
+    return {
+        "homology_ids": hom_ids,
+        "homology_genes": hom_genes,
+        "homology_sources": hom_sources,
+        **string_sections("homology_source_names", sources),
+        "homology_offsets": csr_offsets(hom_ids, max(hom_ids, default=-1) + 1),
+        "gene_homology_offsets": gene_offsets,
+        "gene_homology_rows": csr_rows(hom_genes, gene_offsets),
+    }
+
+
+def create_snapshot(db: Session, version_id: int, path: Path) -> int:
+    """Write the snapshot of the version a session is bound to.
+
+    :param db: The database session.
+    :param version_id: The schema version id.
+    :param path: The snapshot path.
+    :return: The size of the file in bytes.
+    """
+    return write_snapshot(path, version_id, build_snapshot_sections(db))
+
+
+def load_graph(
+    version_id: int, session_manager: sessionmaker, path: Optional[Path]
+) -> bool:
+    """Load the ortholog graph of a version from its snapshot, if there is one.
+
+    Without a valid snapshot, the graph is built from the database instead, see
+    `ortholog_graph.load_graph`.
+
+    :param version_id: The schema version id.
+    :param session_manager: The session manager of the version.
+    :param path: The snapshot path, or None.
+    :return: Whether the graph was loaded.
+    """
+    if path is not None and Path(path).exists():
+        try:
+            snapshot = Snapshot(path)
+            if snapshot.version_id != version_id:
+                raise SnapshotError(f"{path} is a snapshot of another version.")
+            graph = OrthologGraph.from_snapshot(snapshot)
+        except (OSError, SnapshotError):
+            logger.exception(f"Failed to open {path}, building from the database.")
+        else:
+            ortholog_graph.register_graph(version_id, graph)
+            return True
+    return ortholog_graph.load_graph(version_id, session_manager)
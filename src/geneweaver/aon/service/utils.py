@@ -1,20 +1,95 @@
 """Utility functions for AON services."""
 
-from typing import Optional
+import base64
+import json
+from typing import Any, Optional, Sequence, Tuple
 
-from sqlalchemy.orm import Query
+from sqlalchemy import Select, tuple_
+from sqlalchemy.orm import InstrumentedAttribute
+
+Cursor = Tuple[int, ...]
+
+
+class InvalidCursorError(ValueError):
+    """A paging cursor that was not created for the query it is used with."""
+
+
+def encode_cursor(values: Sequence[int]) -> str:
+    """Encode the key of the last item of a page as an opaque cursor.
+
+    :param values: The key values of the last item.
+    :return: The cursor.
+    """
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """Decode a cursor created by `encode_cursor`.
+
+    :param cursor: The cursor.
+    :return: The key values of the last item of the previous page.
+    :raises InvalidCursorError: If the cursor is not valid.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError("Invalid cursor.") from e
+    if (
+        not isinstance(values, list)
+        or not values
+        or not all(isinstance(v, int) and not isinstance(v, bool) for v in values)
+    ):
+        raise InvalidCursorError("Invalid cursor.")
+    return tuple(values)
+
+
+def next_cursor(
+    items: Sequence[Any], keys: Sequence[str], limit: Optional[int]
+) -> Optional[str]:
+    """Get the cursor for the page after a page of results.
+
+    :param items: The results of the current page.
+    :param keys: The names of the key attributes the results are ordered by.
+    :param limit: The page size.
+    :return: The cursor, or None if this was the last page.
+    """
+    if limit is None or not items or len(items) < limit:
+        return None
+    return encode_cursor([getattr(items[-1], key) for key in keys])
 
 
 def apply_paging(
-    query: Query, start: Optional[int] = None, limit: Optional[int] = None
-) -> Query:
+    query: Select,
+    start: Optional[int] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[Cursor] = None,
+    keys: Optional[Sequence[InstrumentedAttribute]] = None,
+) -> Select:
     """Apply paging to a query.
 
+    If the key columns are given, results are ordered by them, and a cursor selects
+    the rows after the given key. Unlike an offset, this costs the same however deep
+    the page is.
+
     :param query: The query to apply paging to.
     :param start: The start index for the query.
     :param limit: The limit for the query.
+    :param cursor: The key of the last row of the previous page.
+    :param keys: The (primary) key columns the query is ordered by.
     :return: The query with paging applied.
+    :raises InvalidCursorError: If the cursor does not match the keys.
     """
+    if keys:
+        if cursor is not None:
+            if len(cursor) != len(keys):
+                raise InvalidCursorError("Invalid cursor.")
+            if len(keys) == 1:
+                query = query.filter(keys[0] > cursor[0])
+            else:
+                query = query.filter(tuple_(*keys) > tuple_(*cursor))
+        query = query.order_by(*keys)
     if start is not None:
         query = query.offset(start)
     if limit is not None:
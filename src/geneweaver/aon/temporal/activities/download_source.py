@@ -1,35 +1,65 @@
 """TemporalIO activities for downloading AGR data."""
 
+import asyncio
 from typing import Optional, Tuple
 
 from geneweaver.aon.cli.load import (
     agr_release_exists,
+    constraints,
     create_schema,
     get_data,
+    get_release,
     gw,
     homology,
     load_agr,
     mark_schema_version_load_complete,
+    snapshot,
 )
+from geneweaver.aon.enum import HomologyBackend
 from temporalio import activity
 
+# Seconds between heartbeats of long running activities, well within the heartbeat
+# timeout the workflow sets.
+HEARTBEAT_INTERVAL = 10
+
+
+@activity.defn
+async def get_release_activity(
+    release: Optional[str] = None,
+) -> Tuple[str, Optional[str]]:
+    """Resolve an AGR release and the ETag of its data, without downloading it."""
+    return get_release(release)
+
 
 @activity.defn
-async def get_data_activity(release: Optional[str] = None) -> Tuple[str, str]:
-    """Get AGR data for a release."""
-    return get_data(release)
+async def get_data_activity(release: Optional[str] = None) -> Tuple[str, str, str]:
+    """Get AGR data for a release.
+
+    The download runs in a thread, and the activity heartbeats until it is done, so
+    that a worker lost mid-download is detected without waiting for the timeout.
+    """
+    download = asyncio.ensure_future(asyncio.to_thread(get_data, release))
+    while not download.done():
+        await asyncio.wait({download}, timeout=HEARTBEAT_INTERVAL)
+        if not download.done():
+            activity.heartbeat()
+    return download.result()
 
 
 @activity.defn
-async def release_exists_activity(release: str) -> bool:
+async def release_exists_activity(
+    release: str, etag: Optional[str] = None, content_hash: Optional[str] = None
+) -> bool:
     """Check if an AGR release exists."""
-    return agr_release_exists(release)
+    return agr_release_exists(release, etag, content_hash)
 
 
 @activity.defn
-async def create_schema_activity(release: str) -> Tuple[str, int]:
-    """Create a new schema version."""
-    return create_schema(release)
+async def create_schema_activity(
+    release: str, content_hash: Optional[str] = None, etag: Optional[str] = None
+) -> Optional[Tuple[str, int]]:
+    """Create a new schema version, unless the release is already loaded."""
+    return create_schema(release, content_hash, etag)
 
 
 @activity.defn
@@ -45,9 +75,25 @@ async def load_gw_activity(schema_id: int) -> bool:
 
 
 @activity.defn
-async def load_homology_activity(schema_id: int) -> bool:
-    """Load homology data for a schema version."""
-    return homology(schema_id)
+async def load_homology_activity(schema_id: int, backend: Optional[str] = None) -> bool:
+    """Load homology data for a schema version.
+
+    :param schema_id: The schema id.
+    :param backend: "python" or "sql", defaults to `config.HOMOLOGY_BACKEND`.
+    """
+    return homology(schema_id, HomologyBackend(backend) if backend else None)
+
+
+@activity.defn
+async def build_constraints_activity(schema_id: int) -> bool:
+    """Build the constraints and indexes of a schema version once it is loaded."""
+    return constraints(schema_id)
+
+
+@activity.defn
+async def build_snapshot_activity(schema_id: int) -> bool:
+    """Write the snapshot file of a schema version, if a snapshot dir is set."""
+    return snapshot(schema_id) is not None
 
 
 @activity.defn
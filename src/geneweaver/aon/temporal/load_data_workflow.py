@@ -1,15 +1,19 @@
 """GeneWeaver AON data load workflow definition."""
 
 from datetime import timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
 from temporalio import workflow
 from temporalio.common import RetryPolicy
+from temporalio.exceptions import ActivityError
 
 with workflow.unsafe.imports_passed_through():
     from geneweaver.aon.temporal.activities.download_source import (
+        build_constraints_activity,
+        build_snapshot_activity,
         create_schema_activity,
         get_data_activity,
+        get_release_activity,
         load_agr_activity,
         load_gw_activity,
         load_homology_activity,
@@ -17,35 +21,39 @@ with workflow.unsafe.imports_passed_through():
         release_exists_activity,
     )
 
+# Patch ids of the steps added to running workflows, see `workflow.patched`. Each
+# can be deprecated once no workflow started before it is still running.
+CHECK_RELEASE_BEFORE_DOWNLOAD = "check-release-before-download"
+DEFERRED_CONSTRAINTS = "deferred-constraints"
+LOAD_SNAPSHOT = "load-snapshot"
+
 
 @workflow.defn
 class GeneWeaverAonDataLoad:
     """GeneWeaver AON data load workflow."""
 
     @workflow.run
-    async def run(self, release: Optional[str] = None) -> bool:
-        """Run the gene weaver data load workflow."""
-        orthology_file, release = await workflow.execute_activity(
-            get_data_activity,
-            release,
-            schedule_to_close_timeout=timedelta(seconds=15),
-        )
+    async def run(
+        self, release: Optional[str] = None, homology_backend: Optional[str] = None
+    ) -> bool:
+        """Run the gene weaver data load workflow.
 
-        release_exists = await workflow.execute_activity(
-            release_exists_activity,
-            release,
-            schedule_to_close_timeout=timedelta(seconds=15),
-        )
-        if release_exists is True:
-            return False
+        The release is only downloaded if it is new or may have been re-published,
+        see `_create_schema`.
 
-        elif release_exists is False:
+        :param release: The AGR release to load, defaults to the latest release.
+        :param homology_backend: Where to compute homology clusters, "python" or
+            "sql", defaults to the worker's `HOMOLOGY_BACKEND` setting.
+        """
+        if workflow.patched(CHECK_RELEASE_BEFORE_DOWNLOAD):
+            created, orthology_file = await self._create_schema(release)
+        else:
+            created, orthology_file = await self._create_schema_after_download(release)
+        if created is None:
+            return False
 
-            schema_name, schema_id = await workflow.execute_activity(
-                create_schema_activity,
-                release,
-                schedule_to_close_timeout=timedelta(seconds=15),
-            )
+        else:
+            schema_name, schema_id = created
 
             agr_load_success = await workflow.execute_activity(
                 load_agr_activity,
@@ -67,18 +75,127 @@ class GeneWeaverAonDataLoad:
 
             homology_load_success = await workflow.execute_activity(
                 load_homology_activity,
-                schema_id,
+                args=(schema_id, homology_backend),
                 schedule_to_close_timeout=timedelta(seconds=360),
                 retry_policy=RetryPolicy(
                     maximum_attempts=3,
                 ),
             )
 
-            if agr_load_success and gw_load_success and homology_load_success:
+            load_success = (
+                agr_load_success and gw_load_success and homology_load_success
+            )
+
+            if load_success and workflow.patched(DEFERRED_CONSTRAINTS):
+                load_success = await workflow.execute_activity(
+                    build_constraints_activity,
+                    schema_id,
+                    schedule_to_close_timeout=timedelta(seconds=3600),
+                    retry_policy=RetryPolicy(
+                        maximum_attempts=3,
+                    ),
+                )
+
+            if load_success and workflow.patched(LOAD_SNAPSHOT):
+                try:
+                    await workflow.execute_activity(
+                        build_snapshot_activity,
+                        schema_id,
+                        schedule_to_close_timeout=timedelta(seconds=3600),
+                        retry_policy=RetryPolicy(
+                            maximum_attempts=3,
+                        ),
+                    )
+                except ActivityError:
+                    # The snapshot only speeds up API workers, which read the
+                    # database without one, so the load is still marked complete.
+                    workflow.logger.exception("Failed to write the snapshot.")
+
+            if load_success:
                 await workflow.execute_activity(
                     mark_load_complete_activity,
                     schema_id,
                     schedule_to_close_timeout=timedelta(seconds=60),
                 )
 
-            return agr_load_success and gw_load_success and homology_load_success
+            return load_success
+
+    @staticmethod
+    async def _create_schema(
+        release: Optional[str],
+    ) -> Tuple[Optional[Tuple[str, int]], Optional[str]]:
+        """Create the schema of a release, unless it is already loaded.
+
+        The release and the ETag of its file are resolved without downloading
+        anything, so the usual case of an already loaded release exits early. The
+        file is only downloaded if it is new or may have been re-published, in
+        which case its content hash decides whether it is loaded again.
+
+        :param release: The AGR release to load, defaults to the latest release.
+        :return: The schema name and id, or None if the release is already
+            loaded, and the downloaded orthology file.
+        """
+        release, etag = await workflow.execute_activity(
+            get_release_activity,
+            release,
+            schedule_to_close_timeout=timedelta(seconds=60),
+        )
+
+        release_exists = await workflow.execute_activity(
+            release_exists_activity,
+            args=(release, etag),
+            schedule_to_close_timeout=timedelta(seconds=15),
+        )
+        if release_exists is True:
+            return None, None
+
+        orthology_file, release, content_hash = await workflow.execute_activity(
+            get_data_activity,
+            release,
+            schedule_to_close_timeout=timedelta(seconds=3600),
+            heartbeat_timeout=timedelta(seconds=60),
+        )
+
+        # Nothing is created if the file was re-published with the same content.
+        created = await workflow.execute_activity(
+            create_schema_activity,
+            args=(release, content_hash, etag),
+            schedule_to_close_timeout=timedelta(seconds=15),
+        )
+        return created, orthology_file
+
+    @staticmethod
+    async def _create_schema_after_download(
+        release: Optional[str],
+    ) -> Tuple[Optional[Tuple[str, int]], Optional[str]]:
+        """Create the schema of a release, as workflows started before the check.
+
+        Kept so that those workflows replay the activities they already ran.
+
+        :param release: The AGR release to load, defaults to the latest release.
+        :return: The schema name and id, or None if the release is already
+            loaded, and the downloaded orthology file.
+        """
+        # Recorded as a pair by workers that did not return the content hash.
+        data = await workflow.execute_activity(
+            get_data_activity,
+            release,
+            schedule_to_close_timeout=timedelta(seconds=3600),
+            heartbeat_timeout=timedelta(seconds=60),
+        )
+        orthology_file, release = data[0], data[1]
+
+        release_exists = await workflow.execute_activity(
+            release_exists_activity,
+            release,
+            schedule_to_close_timeout=timedelta(seconds=15),
+        )
+        if release_exists is True:
+            return None, None
+
+        created = await workflow.execute_activity(
+            create_schema_activity,
+            release,
+            schedule_to_close_timeout=timedelta(seconds=15),
+        )
+        return created, orthology_file
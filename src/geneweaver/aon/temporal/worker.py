@@ -4,8 +4,11 @@ import asyncio
 
 from geneweaver.aon.core.config import config
 from geneweaver.aon.temporal.activities.download_source import (
+    build_constraints_activity,
+    build_snapshot_activity,
     create_schema_activity,
     get_data_activity,
+    get_release_activity,
     load_agr_activity,
     load_gw_activity,
     load_homology_activity,
@@ -28,12 +31,15 @@ async def main() -> None:
         task_queue=config.TEMPORAL_TASK_QUEUE,
         workflows=[GeneWeaverAonDataLoad],
         activities=[
+            get_release_activity,
             get_data_activity,
             release_exists_activity,
             create_schema_activity,
             load_agr_activity,
             load_gw_activity,
             load_homology_activity,
+            build_constraints_activity,
+            build_snapshot_activity,
             mark_load_complete_activity,
         ],
     )
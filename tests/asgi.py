@@ -0,0 +1,24 @@
+"""Send requests to an application in process, without a server."""
+
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+
+def request(app: FastAPI, method: str, url: str, **kwargs: object) -> httpx.Response:
+    """Send a request to an application and read the whole response.
+
+    :param app: The application.
+    :param method: The HTTP method.
+    :param url: The path and query string.
+    :param kwargs: Passed on to `httpx.AsyncClient.request`.
+    :return: The response.
+    """
+
+    async def send() -> httpx.Response:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://aon") as c:
+            return await c.request(method, url, **kwargs)
+
+    return asyncio.run(send())
@@ -0,0 +1,91 @@
+"""Create a temporary tenant schema of a few genes and orthologs, on Postgres.
+
+The schema holds the rows of `tests.test_query_plans.FIXTURE_SQL`, an RGD and a ZFIN
+gene with an ortholog between them, and the Geneweaver gene table, with the RGD
+gene in it, so that Geneweaver reference ids can be converted.
+"""
+
+from argparse import Namespace
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from alembic import command
+from alembic.config import Config
+from geneweaver.aon.models import GeneweaverGene
+from geneweaver.core.enum import GeneIdentifier
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.engine import Engine
+
+from tests.test_query_plans import ALEMBIC_DIR, FIXTURE_SQL
+
+EXTRA_SQL = """
+INSERT INTO gn_gene (gn_id, gn_ref_id, gn_prefix, sp_id) VALUES
+    (5, 'RGD:5', 'RGD', 1), (6, 'ZFIN:ZDB-GENE-6', 'ZFIN', 2);
+INSERT INTO ort_ortholog (ort_id, from_gene, to_gene, ort_is_best,
+    ort_is_best_revised, ort_is_best_is_adjusted,
+    ort_num_possible_match_algorithms, ort_source_name) VALUES
+    (3, 5, 6, true, false, false, 1, 'AGR');
+INSERT INTO ora_ortholog_algorithms (ora_id, alg_id, ort_id) VALUES (4, 2, 3);
+"""
+
+
+def schema_translate_map(schema_name: str) -> Dict[Optional[str], str]:
+    """Map the AON and the Geneweaver tables to a tenant schema.
+
+    :param schema_name: The tenant schema.
+    :return: The schema translate map.
+    """
+    return {None: schema_name, "extsrc": schema_name}
+
+
+@contextmanager
+def migrated_schema(
+    db_uri: str, schema_name: str, revision: str = "heads"
+) -> Iterator[Engine]:
+    """Create an empty tenant schema with the migrations, and drop it on exit.
+
+    :param db_uri: The URI of the test database.
+    :param schema_name: The name of the tenant schema.
+    :param revision: The revision to migrate to, defaults to the latest.
+    :return: An engine with its tables translated to the tenant schema.
+    """
+    script_location = ALEMBIC_DIR.resolve()
+    alembic_cfg = Config(
+        file_=str(script_location / "alembic.ini"),
+        cmd_opts=Namespace(x=[f"tenant={schema_name}"]),
+    )
+    alembic_cfg.set_main_option("script_location", str(script_location))
+    alembic_cfg.set_main_option("sqlalchemy.url", db_uri)
+
+    engine = create_engine(db_uri).execution_options(
+        schema_translate_map=schema_translate_map(schema_name)
+    )
+    try:
+        command.upgrade(alembic_cfg, revision)
+        yield engine
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f'DROP SCHEMA IF EXISTS "{schema_name}" CASCADE'))
+        engine.dispose()
+
+
+@contextmanager
+def tenant(db_uri: str, schema_name: str) -> Iterator[Engine]:
+    """Create and populate a tenant schema, and drop it on exit.
+
+    :param db_uri: The URI of the test database.
+    :param schema_name: The name of the tenant schema.
+    :return: An engine with its tables translated to the tenant schema.
+    """
+    with migrated_schema(db_uri, schema_name) as engine:
+        with engine.begin() as conn:
+            conn.execute(text(f'SET LOCAL search_path TO "{schema_name}"'))
+            conn.exec_driver_sql(FIXTURE_SQL)
+            conn.exec_driver_sql(EXTRA_SQL)
+            GeneweaverGene.__table__.create(conn)
+            conn.execute(
+                insert(GeneweaverGene).values(
+                    ode_gene_id=5, ode_ref_id="RGD5", gdb_id=int(GeneIdentifier.RGD)
+                )
+            )
+        yield engine
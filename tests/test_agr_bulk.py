@@ -0,0 +1,153 @@
+"""Test the binary COPY backend of the ortholog load stage.
+
+The rows are checked against the COPY column types without a database. The COPY
+round trip and the id reservation need a Postgres database, and are skipped unless
+`AON_TEST_DB_URI` is set, see `tests.test_query_plans`.
+"""
+
+import os
+from typing import Iterator, List
+
+import psycopg
+import pytest
+from geneweaver.aon.load.agr.bulk import (
+    ORTHOLOG_ALGORITHM_COLUMNS,
+    ORTHOLOG_ALGORITHM_TYPES,
+    ORTHOLOG_COLUMNS,
+    ORTHOLOG_TYPES,
+    copy_ortholog_batch,
+    ortholog_algorithm_rows,
+    ortholog_rows,
+    reserve_ortholog_ids,
+)
+from geneweaver.aon.load.agr.parse import GeneRecord, OrthologRecord
+from geneweaver.aon.load.agr.resolve import IdResolver
+
+from tests.tenant import migrated_schema
+
+DB_URI = os.environ.get("AON_TEST_DB_URI")
+SCHEMA_NAME = "test_agr_bulk"
+
+requires_db = pytest.mark.skipif(
+    DB_URI is None, reason="AON_TEST_DB_URI is not set, no database to COPY into"
+)
+
+# The Python type each binary COPY type is written from.
+PYTHON_TYPES = {"int4": int, "bool": bool, "varchar": str}
+
+MOUSE = GeneRecord("MGI:1", "MGI", 10090, "Mus musculus")
+HUMAN = GeneRecord("HGNC:1", "HGNC", 9606, "Homo sapiens")
+RAT = GeneRecord("RGD:1", "RGD", 10116, "Rattus norvegicus")
+
+BATCH = [
+    OrthologRecord(MOUSE, HUMAN, ("PANTHER", "ZFIN"), 12, True, False, False),
+    OrthologRecord(HUMAN, RAT, ("PANTHER",), 3, True, True, True),
+]
+
+
+def _resolver() -> IdResolver:
+    return IdResolver(
+        [("MGI:1", 10), ("HGNC:1", 20), ("RGD:1", 30)],
+        [("PANTHER", 1), ("ZFIN", 2)],
+    )
+
+
+def test_ortholog_rows_match_the_copy_types():
+    """Test that every row has one value of the declared type per column."""
+    rows = list(ortholog_rows(BATCH, [7, 9], _resolver()))
+    assert rows == [
+        (7, 10, 20, True, False, False, 12, "AGR"),
+        (9, 20, 30, True, True, True, 3, "AGR"),
+    ]
+    assert len(ORTHOLOG_TYPES) == len(ORTHOLOG_COLUMNS)
+    for row in rows:
+        assert [type(v) for v in row] == [PYTHON_TYPES[t] for t in ORTHOLOG_TYPES]
+
+
+def test_algorithm_rows_use_the_reserved_ids():
+    """Test that algorithm links follow the ids reserved for their orthologs."""
+    rows = list(ortholog_algorithm_rows(BATCH, [7, 9], _resolver()))
+    assert rows == [(7, 1), (7, 2), (9, 1)]
+    assert len(ORTHOLOG_ALGORITHM_TYPES) == len(ORTHOLOG_ALGORITHM_COLUMNS)
+    for row in rows:
+        assert [type(v) for v in row] == [
+            PYTHON_TYPES[t] for t in ORTHOLOG_ALGORITHM_TYPES
+        ]
+
+
+def test_unknown_gene_is_an_error():
+    """Test that an ortholog of a gene that was not loaded is not written."""
+    resolver = IdResolver([("MGI:1", 10)], [("PANTHER", 1)])
+    with pytest.raises(KeyError):
+        list(ortholog_rows(BATCH, [1, 2], resolver))
+
+
+@pytest.fixture()
+def conn() -> Iterator[psycopg.Connection]:
+    """Create a tenant schema with genes and algorithms, but no orthologs."""
+    with migrated_schema(DB_URI, SCHEMA_NAME):
+        with psycopg.connect(DB_URI.replace("postgresql+psycopg", "postgresql")) as c:
+            with c.cursor() as cursor:
+                cursor.execute(f'SET search_path TO "{SCHEMA_NAME}"')
+                cursor.execute(
+                    "INSERT INTO sp_species (sp_id, sp_name, sp_taxon_id) VALUES "
+                    "(1, 'Mus musculus', 10090), (2, 'Homo sapiens', 9606), "
+                    "(3, 'Rattus norvegicus', 10116)"
+                )
+                cursor.execute(
+                    "INSERT INTO gn_gene (gn_id, gn_ref_id, gn_prefix, sp_id) VALUES "
+                    "(10, 'MGI:1', 'MGI', 1), (20, 'HGNC:1', 'HGNC', 2), "
+                    "(30, 'RGD:1', 'RGD', 3)"
+                )
+                cursor.execute(
+                    "INSERT INTO alg_algorithm (alg_id, alg_name) VALUES "
+                    "(1, 'PANTHER'), (2, 'ZFIN')"
+                )
+            c.commit()
+            yield c
+
+
+def _rows(conn: psycopg.Connection, table: str, order: str) -> List[tuple]:
+    with conn.cursor() as cursor:
+        cursor.execute(f'SELECT * FROM "{SCHEMA_NAME}".{table} ORDER BY {order}')
+        return cursor.fetchall()
+
+
+@requires_db
+def test_copy_round_trip(conn: psycopg.Connection):
+    """Test that the rows written with binary COPY read back as they were given."""
+    resolver = IdResolver.from_connection(conn, SCHEMA_NAME)
+    copy_ortholog_batch(conn, SCHEMA_NAME, BATCH, resolver)
+    copy_ortholog_batch(conn, SCHEMA_NAME, BATCH[:1], resolver, source_name="X")
+
+    # Read back, every value decodes to what was written.
+    assert _rows(conn, "ort_ortholog", "ort_id") == [
+        *ortholog_rows(BATCH, [1, 2], resolver),
+        *ortholog_rows(BATCH[:1], [3], resolver, source_name="X"),
+    ]
+    algorithms = _rows(conn, "ora_ortholog_algorithms", "ort_id, alg_id")
+    assert [(a[2], a[1]) for a in algorithms] == [
+        (1, 1),
+        (1, 2),
+        (2, 1),
+        (3, 1),
+        (3, 2),
+    ]
+
+
+@requires_db
+def test_reserved_ids_are_never_shared(conn: psycopg.Connection):
+    """Test that ids taken by other sessions between reservations do not clash."""
+    with psycopg.connect(DB_URI.replace("postgresql+psycopg", "postgresql")) as other:
+        first = reserve_ortholog_ids(conn, SCHEMA_NAME, 5)
+        with other.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'ort_id'))",
+                (f"{SCHEMA_NAME}.ort_ortholog",),
+            )
+            taken = cursor.fetchone()[0]
+        second = reserve_ortholog_ids(conn, SCHEMA_NAME, 3)
+
+    assert first == sorted(first)
+    assert second == sorted(second)
+    assert len({*first, taken, *second}) == 9
@@ -0,0 +1,161 @@
+"""Test the single pass parser of the AGR orthology file."""
+
+import gzip
+from pathlib import Path
+
+import pytest
+from geneweaver.aon.load.agr.parse import (
+    _MAX_ALGORITHMS,
+    GeneRecord,
+    OrthologRecord,
+    parse_line,
+    parse_orthology_file,
+)
+
+HEADER = (
+    "#########################\n"
+    "# Alliance of Genome Resources orthology\n"
+    "#########################\n"
+    "Gene1ID\tGene1Symbol\tGene1SpeciesTaxonID\tGene1SpeciesName\tGene2ID\t"
+    "Gene2Symbol\tGene2SpeciesTaxonID\tGene2SpeciesName\tAlgorithms\t"
+    "AlgorithmsMatch\tOutOfAlgorithms\tIsBestScore\tIsBestRevScore\n"
+)
+
+ROWS = [
+    ("MGI:1", "Mus musculus", "HGNC:1", "Homo sapiens", "PANTHER|ZFIN", 12, "Yes"),
+    ("MGI:1", "Mus musculus", "RGD:1", "Rattus norvegicus", "PANTHER", 12, "No"),
+    ("HGNC:1", "Homo sapiens", "ZFIN:ZDB-GENE-1", "Danio rerio", "OMA", 10, "Yes"),
+]
+
+TAXA = {
+    "Mus musculus": 10090,
+    "Homo sapiens": 9606,
+    "Rattus norvegicus": 10116,
+    "Danio rerio": 7955,
+}
+
+MOUSE = GeneRecord("MGI:1", "MGI", 10090, "Mus musculus")
+HUMAN = GeneRecord("HGNC:1", "HGNC", 9606, "Homo sapiens")
+RAT = GeneRecord("RGD:1", "RGD", 10116, "Rattus norvegicus")
+FISH = GeneRecord("ZFIN:ZDB-GENE-1", "ZFIN", 7955, "Danio rerio")
+
+
+def _line(
+    gene1: str,
+    species1: str,
+    gene2: str,
+    species2: str,
+    algorithms: str,
+    out_of: int,
+    is_best: str,
+    is_best_revised: str = "Yes",
+) -> str:
+    """Format a data line of the orthology file."""
+    matched = len(algorithms.split("|"))
+    return (
+        f"{gene1}\t{gene1}sym\tNCBITaxon:{TAXA[species1]}\t{species1}\t"
+        f"{gene2}\t{gene2}sym\tNCBITaxon:{TAXA[species2]}\t{species2}\t"
+        f"{algorithms}\t{matched}\t{out_of}\t{is_best}\t{is_best_revised}\n"
+    )
+
+
+CONTENT = HEADER + "".join(_line(*row) for row in ROWS) + "\n"
+
+EXPECTED = [
+    OrthologRecord(MOUSE, HUMAN, ("PANTHER", "ZFIN"), 12, True, True, False),
+    OrthologRecord(MOUSE, RAT, ("PANTHER",), 12, False, True, False),
+    OrthologRecord(HUMAN, FISH, ("OMA",), 10, True, True, False),
+]
+
+
+@pytest.fixture(params=["plain", "gzip"])
+def orthology_file(request: pytest.FixtureRequest, tmp_path: Path) -> str:
+    """Write the fixture orthology file, plain and gzipped."""
+    if request.param == "gzip":
+        path = tmp_path / "ORTHOLOGY-ALLIANCE_COMBINED.tsv.gz"
+        path.write_bytes(gzip.compress(CONTENT.encode()))
+    else:
+        path = tmp_path / "ORTHOLOGY-ALLIANCE_COMBINED.tsv"
+        path.write_text(CONTENT)
+    return str(path)
+
+
+def test_headers_are_skipped(orthology_file: str):
+    """Test that only the data lines are staged, in file order."""
+    orthology = parse_orthology_file(orthology_file)
+
+    assert len(orthology) == len(ROWS)
+    assert list(orthology.orthologs()) == EXPECTED
+
+
+def test_genes(orthology_file: str):
+    """Test that each gene is collected once, in order of first appearance."""
+    orthology = parse_orthology_file(orthology_file)
+
+    assert orthology.gene_records == [MOUSE, HUMAN, RAT, FISH]
+    assert orthology.genes == {
+        "MGI:1": 0,
+        "HGNC:1": 1,
+        "RGD:1": 2,
+        "ZFIN:ZDB-GENE-1": 3,
+    }
+
+
+def test_species_of_both_genes(orthology_file: str):
+    """Test that species are collected from both gene columns.
+
+    Rats and zebrafish only appear as the second gene of a row.
+    """
+    orthology = parse_orthology_file(orthology_file)
+
+    assert orthology.species == {taxon: name for name, taxon in TAXA.items()}
+
+
+def test_algorithms(orthology_file: str):
+    """Test that algorithms are numbered in order of first appearance."""
+    orthology = parse_orthology_file(orthology_file)
+
+    assert orthology.algorithms == {"PANTHER": 0, "ZFIN": 1, "OMA": 2}
+
+
+def test_flags():
+    """Test the best score flags, including an adjusted best score."""
+    adjusted = parse_line(
+        _line(
+            "MGI:1",
+            "Mus musculus",
+            "HGNC:1",
+            "Homo sapiens",
+            "OMA",
+            3,
+            "Yes_Adjusted",
+            "No",
+        )
+    )
+
+    assert adjusted.is_best is True
+    assert adjusted.is_best_revised is False
+    assert adjusted.is_best_is_adjusted is True
+
+
+def test_batches(orthology_file: str):
+    """Test that the staged orthologs are batched in file order."""
+    orthology = parse_orthology_file(orthology_file)
+
+    assert list(orthology.ortholog_batches(2)) == [EXPECTED[:2], EXPECTED[2:]]
+    assert list(orthology.ortholog_batches(2, 1)) == [EXPECTED[:2]]
+
+
+def test_too_many_algorithms(tmp_path: Path):
+    """Test that more algorithms than the staged bitmask holds is an error."""
+    algorithms = "|".join(f"ALG{i}" for i in range(_MAX_ALGORITHMS + 1))
+    path = tmp_path / "orthology.tsv"
+    path.write_text(
+        HEADER
+        + _line(
+            "MGI:1", "Mus musculus", "HGNC:1", "Homo sapiens", algorithms, 65, "Yes"
+        )
+    )
+
+    with pytest.raises(ValueError, match=f"More than {_MAX_ALGORITHMS} algorithms"):
+        parse_orthology_file(str(path))
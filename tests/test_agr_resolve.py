@@ -0,0 +1,80 @@
+"""Test resolving AGR reference ids and algorithm names to database ids."""
+
+import pytest
+from geneweaver.aon.load.agr.parse import GeneRecord, OrthologRecord, OrthologyData
+from geneweaver.aon.load.agr.resolve import IdResolver
+from geneweaver.aon.models import Algorithm, Gene
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+MOUSE = GeneRecord("MGI:1", "MGI", 10090, "Mus musculus")
+HUMAN = GeneRecord("HGNC:1", "HGNC", 9606, "Homo sapiens")
+RAT = GeneRecord("RGD:1", "RGD", 10116, "Rattus norvegicus")
+
+# (gn_ref_id, gn_id), in a different order than the parser positions, with a gene
+# that is not in the file. The rat gene was parsed, but is not in the database.
+GENE_ROWS = [("HGNC:1", 20), ("ZFIN:ZDB-GENE-1", 40), ("MGI:1", 10)]
+ALGORITHM_ROWS = [("PANTHER", 1), ("ZFIN", 2)]
+
+
+def _orthology() -> OrthologyData:
+    orthology = OrthologyData()
+    orthology.add(OrthologRecord(MOUSE, HUMAN, ("PANTHER",), 12, True, True, False))
+    orthology.add(OrthologRecord(HUMAN, RAT, ("ZFIN",), 12, True, True, False))
+    return orthology
+
+
+def test_parser_positions():
+    """Test that genes are resolved through the positions the parser collected."""
+    orthology = _orthology()
+    resolver = IdResolver(GENE_ROWS, ALGORITHM_ROWS, orthology.genes)
+
+    assert resolver.gene_id("MGI:1") == 10
+    assert resolver.gene_id("HGNC:1") == 20
+    assert resolver.algorithm_id("ZFIN") == 2
+    # Genes the file does not reference are not indexed, nor added to its map.
+    assert orthology.genes == {"MGI:1": 0, "HGNC:1": 1, "RGD:1": 2}
+    with pytest.raises(KeyError):
+        resolver.gene_id("ZFIN:ZDB-GENE-1")
+
+
+def test_unknown_gene():
+    """Test that a parsed gene that was not loaded is a KeyError, not an id."""
+    resolver = IdResolver(GENE_ROWS, ALGORITHM_ROWS, _orthology().genes)
+
+    with pytest.raises(KeyError, match="RGD:1"):
+        resolver.gene_id("RGD:1")
+    with pytest.raises(KeyError):
+        resolver.gene_id("SGD:1")
+    with pytest.raises(KeyError):
+        resolver.algorithm_id("OMA")
+
+
+def test_without_positions():
+    """Test that every gene row is indexed without a parser map."""
+    resolver = IdResolver(GENE_ROWS, ALGORITHM_ROWS)
+
+    assert [resolver.gene_id(ref_id) for ref_id, _ in GENE_ROWS] == [20, 40, 10]
+    with pytest.raises(KeyError):
+        resolver.gene_id("RGD:1")
+
+
+def test_from_session():
+    """Test that the resolver reads the gene and algorithm ids of a schema."""
+    engine = create_engine("sqlite://")
+    for model in (Gene, Algorithm):
+        model.__table__.create(engine)
+    with Session(engine) as db:
+        db.add_all(
+            Gene(gn_id=gn_id, gn_ref_id=ref_id, gn_prefix=ref_id.split(":")[0])
+            for ref_id, gn_id in GENE_ROWS
+        )
+        db.add_all(Algorithm(alg_id=i, alg_name=name) for name, i in ALGORITHM_ROWS)
+        db.commit()
+
+        resolver = IdResolver.from_session(db, _orthology().genes)
+
+    assert resolver.gene_id("MGI:1") == 10
+    assert resolver.algorithm_id("PANTHER") == 1
+    with pytest.raises(KeyError):
+        resolver.gene_id("RGD:1")
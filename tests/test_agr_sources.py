@@ -0,0 +1,277 @@
+"""Test downloading AGR source files against a local HTTP stand-in."""
+
+import gzip
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+import pytest
+from geneweaver.aon.load.agr import sources
+
+RELEASE = "7.0.0"
+PAYLOAD = gzip.compress(b"# header\n" + b"MGI:1\tA\n" * 5000)
+
+
+class _AgrHandler(BaseHTTPRequestHandler):
+    """Serve in-memory files with ETag and Range support.
+
+    Files served without an ETag get neither an ETag nor a Last-Modified header.
+    """
+
+    files = {}
+    requests = []
+
+    def log_message(self: "_AgrHandler", *args) -> None:  # noqa: ANN002
+        """Silence request logging."""
+
+    def _send(self: "_AgrHandler", body: bool) -> None:
+        self.requests.append((self.command, self.path, dict(self.headers)))
+        served = self.files.get(self.path)
+        if served is None:
+            self.send_response(404)
+            self.send_header("Content-Type", "text/html")
+            self.end_headers()
+            return
+
+        content, content_type, etag = served
+        start = 0
+        byte_range = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if byte_range and (if_range is None or if_range == etag):
+            start, _, end = byte_range.replace("bytes=", "").partition("-")
+            start = int(start)
+            end = int(end) if end else len(content) - 1
+            if start >= len(content):
+                self.send_response(416)
+                self.end_headers()
+                return
+            self.send_response(206)
+            content = content[start : end + 1]
+        else:
+            self.send_response(200)
+
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        if body:
+            self.wfile.write(content)
+
+    def do_HEAD(self: "_AgrHandler") -> None:  # noqa: N802
+        """Handle HEAD requests."""
+        self._send(body=False)
+
+    def do_GET(self: "_AgrHandler") -> None:  # noqa: N802
+        """Handle GET requests."""
+        self._send(body=True)
+
+
+@pytest.fixture()
+def agr_server(monkeypatch):
+    """Run a local stand-in for download.alliancegenome.org."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _AgrHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    def _format_url(version, data_increment=None) -> str:
+        return (
+            f"{base_url}/{version}/ORTHOLOGY-ALLIANCE/COMBINED/"
+            f"ORTHOLOGY-ALLIANCE_COMBINED_{data_increment}.tsv.gz"
+        )
+
+    monkeypatch.setattr(sources, "format_agr_orthology_download_url", _format_url)
+    _AgrHandler.files = {}
+    _AgrHandler.requests = []
+    yield _AgrHandler
+    server.shutdown()
+    server.server_close()
+
+
+def _path(data_increment) -> str:
+    return (
+        f"/{RELEASE}/ORTHOLOGY-ALLIANCE/COMBINED/"
+        f"ORTHOLOGY-ALLIANCE_COMBINED_{data_increment}.tsv.gz"
+    )
+
+
+def test_find_orthology_file_probes_without_downloading(agr_server):
+    """Test that increment discovery only sends HEAD and two byte requests."""
+    agr_server.files[_path(28)] = (b"<html>not found</html>", "text/html", '"html"')
+    agr_server.files[_path(27)] = (b"not gzip data", "application/gzip", '"bad"')
+    agr_server.files[_path(26)] = (PAYLOAD, "application/gzip", '"v1"')
+
+    remote_file = sources.find_agr_orthology_file(RELEASE)
+
+    assert remote_file.url.endswith(_path(26))
+    assert remote_file.etag == '"v1"'
+    assert remote_file.size == len(PAYLOAD)
+    for method, _, headers in agr_server.requests:
+        assert method == "HEAD" or headers.get("Range") == "bytes=0-1"
+
+
+def test_find_orthology_file_raises_when_missing(agr_server):
+    """Test that a release without any orthology file raises a ValueError."""
+    with pytest.raises(ValueError, match=RELEASE):
+        sources.find_agr_orthology_file(RELEASE, max_data_increment=2)
+
+
+def test_fetch_resumes_partial_download(agr_server, tmp_path):
+    """Test that an interrupted download is resumed with a Range request."""
+    agr_server.files[_path(28)] = (PAYLOAD, "application/gzip", '"v1"')
+    remote_file = sources.find_agr_orthology_file(RELEASE)
+    cached = sources.cache_path(remote_file, str(tmp_path))
+    cached.parent.mkdir(parents=True)
+    partial = cached.with_name(cached.name + sources.PARTIAL_SUFFIX)
+    partial.write_bytes(PAYLOAD[:100])
+    agr_server.requests.clear()
+
+    file_path = sources.fetch_agr_orthology_data(remote_file, str(tmp_path))
+
+    with open(file_path, "rb") as f:
+        assert f.read() == PAYLOAD
+    assert agr_server.requests[-1][2]["Range"] == "bytes=100-"
+    assert sources.read_checksum(file_path) == hashlib.sha256(PAYLOAD).hexdigest()
+
+
+def test_fetch_uses_verified_cache(agr_server, tmp_path):
+    """Test that a cached file is reused, and replaced if it is corrupted."""
+    agr_server.files[_path(28)] = (PAYLOAD, "application/gzip", '"v1"')
+    remote_file = sources.find_agr_orthology_file(RELEASE)
+    file_path = sources.fetch_agr_orthology_data(remote_file, str(tmp_path))
+    agr_server.requests.clear()
+
+    assert sources.fetch_agr_orthology_data(remote_file, str(tmp_path)) == file_path
+    assert agr_server.requests == []
+
+    with open(file_path, "r+b") as f:
+        f.write(b"corrupt")
+    sources.fetch_agr_orthology_data(remote_file, str(tmp_path))
+    with open(file_path, "rb") as f:
+        assert f.read() == PAYLOAD
+    assert len(agr_server.requests) == 1
+
+
+def test_republished_file_gets_new_cache_entry(tmp_path):
+    """Test that the cache is keyed on both the URL and the ETag."""
+    first = sources.RemoteFile("http://example.com/file.tsv.gz", '"v1"', 10)
+    second = first._replace(etag='"v2"')
+    assert sources.cache_path(first, str(tmp_path)) != sources.cache_path(
+        second, str(tmp_path)
+    )
+
+
+def test_cache_key_without_etag(tmp_path):
+    """Test that without an ETag the cache is keyed on Last-Modified and size."""
+    first = sources.RemoteFile(
+        "http://example.com/file.tsv.gz", None, 10, "Mon, 06 May 2024 10:00:00 GMT"
+    )
+    paths = {
+        sources.cache_path(remote_file, str(tmp_path))
+        for remote_file in (
+            first,
+            first._replace(last_modified="Tue, 07 May 2024 10:00:00 GMT"),
+            first._replace(size=11),
+        )
+    }
+    assert len(paths) == 3
+
+
+def test_fetch_without_etag_or_date_is_not_cached(agr_server, tmp_path):
+    """Test that a file that cannot be told apart from a new one is downloaded."""
+    agr_server.files[_path(28)] = (PAYLOAD, "application/gzip", None)
+    remote_file = sources.find_agr_orthology_file(RELEASE)
+    assert not sources.is_cacheable(remote_file)
+    sources.fetch_agr_orthology_data(remote_file, str(tmp_path))
+    agr_server.requests.clear()
+
+    file_path = sources.fetch_agr_orthology_data(remote_file, str(tmp_path))
+
+    with open(file_path, "rb") as f:
+        assert f.read() == PAYLOAD
+    assert len(agr_server.requests) == 1
+
+
+def test_fetch_rejects_corrupt_data(agr_server, tmp_path):
+    """Test that data that does not match its gzip trailer is not cached."""
+    # zero the CRC-32 of the trailer
+    corrupt = PAYLOAD[:-8] + bytes(4) + PAYLOAD[-4:]
+    agr_server.files[_path(28)] = (corrupt, "application/gzip", '"v1"')
+    remote_file = sources.find_agr_orthology_file(RELEASE)
+    file_path = sources.cache_path(remote_file, str(tmp_path))
+
+    with pytest.raises(sources.CorruptDownloadError):
+        sources.fetch_agr_orthology_data(remote_file, str(tmp_path))
+
+    assert not file_path.exists()
+    assert not file_path.with_name(file_path.name + sources.PARTIAL_SUFFIX).exists()
+
+
+def test_fetch_rejects_truncated_data(agr_server, tmp_path):
+    """Test that a download cut short is kept to resume, when its size is unknown."""
+    agr_server.files[_path(28)] = (PAYLOAD[:-4], "application/gzip", '"v1"')
+    remote_file = sources.find_agr_orthology_file(RELEASE)._replace(size=None)
+    file_path = sources.cache_path(remote_file, str(tmp_path))
+
+    with pytest.raises(ValueError, match="Truncated"):
+        sources.fetch_agr_orthology_data(remote_file, str(tmp_path))
+
+    assert not file_path.exists()
+    assert file_path.with_name(file_path.name + sources.PARTIAL_SUFFIX).exists()
+
+
+def test_gzip_verifier_reads_every_member():
+    """Test that a multi-member stream is verified member by member."""
+    data = gzip.compress(b"first\n") + gzip.compress(b"second\n")
+    verifier = sources.GzipVerifier()
+    for start in range(0, len(data), 7):
+        verifier.update(data[start : start + 7])
+    verifier.verify()
+
+    assert verifier.members == 2
+
+
+class _StreamedResponse:
+    """A streamed `requests` response, that fails if read all at once."""
+
+    def __init__(self: "_StreamedResponse", content: bytes) -> None:
+        self._content = content
+        self.chunk_sizes = []
+
+    def __enter__(self: "_StreamedResponse") -> "_StreamedResponse":
+        return self
+
+    def __exit__(self: "_StreamedResponse", *args) -> None:  # noqa: ANN002
+        pass
+
+    @property
+    def content(self: "_StreamedResponse") -> bytes:
+        raise AssertionError("the response was read into memory")
+
+    def iter_content(self: "_StreamedResponse", chunk_size: int) -> Iterator[bytes]:
+        self.chunk_sizes.append(chunk_size)
+        for start in range(0, len(self._content), chunk_size):
+            yield self._content[start : start + chunk_size]
+
+
+def test_download_streams_to_disk(monkeypatch, tmp_path):
+    """Test that the download is written to disk chunk by chunk."""
+    response = _StreamedResponse(PAYLOAD)
+    calls = []
+
+    def get(url, **kwargs):  # noqa: ANN001, ANN003, ANN202
+        calls.append((url, kwargs))
+        return response
+
+    monkeypatch.setattr(sources.requests, "get", get)
+    url = "http://example.com" + _path(28)
+
+    file_path = sources.download_agr_orthology_data(url, str(tmp_path), 1000)
+
+    assert file_path == str(tmp_path / "ORTHOLOGY-ALLIANCE_COMBINED_28.tsv.gz")
+    with open(file_path, "rb") as f:
+        assert f.read() == PAYLOAD
+    assert calls == [(url, {"allow_redirects": True, "stream": True})]
+    assert response.chunk_sizes == [1000]
@@ -0,0 +1,150 @@
+"""Test the async handlers against a real async engine.
+
+These tests need a Postgres database, and are skipped unless `AON_TEST_DB_URI` is
+set, see `tests.test_query_plans`, or without greenlet, which SQLAlchemy's asyncio
+extension needs. A temporary tenant schema is created and dropped in that database,
+and the async handlers are served from it through `deps.async_session`, as they
+are with `config.DB_ASYNC`.
+"""
+
+import asyncio
+import importlib.util
+import os
+from dataclasses import asdict
+from typing import Dict, Iterator, List
+
+import httpx
+import pytest
+from fastapi import FastAPI
+from geneweaver.aon.controller import genes as genes_controller
+from geneweaver.aon.controller import homologs as homologs_controller
+from geneweaver.aon.controller import orthologs as orthologs_controller
+from geneweaver.aon.core import database
+from geneweaver.aon.core.schema_version import (
+    DefaultVersion,
+    set_up_async_sessionmanager,
+    warm_async_session_manager,
+)
+from geneweaver.aon.models import Version
+from geneweaver.aon.service import genes, homologs, orthologs
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from tests.tenant import schema_translate_map, tenant
+
+DB_URI = os.environ.get("AON_TEST_DB_URI")
+SCHEMA_NAME = "test_async_engine"
+
+pytestmark = [
+    pytest.mark.skipif(
+        DB_URI is None, reason="AON_TEST_DB_URI is not set, no database to query"
+    ),
+    pytest.mark.skipif(
+        importlib.util.find_spec("greenlet") is None,
+        reason="greenlet is not installed, SQLAlchemy's asyncio extension needs it",
+    ),
+]
+
+VERSION = Version(id=1, schema_name=SCHEMA_NAME, load_complete=True)
+
+# (path, sync service call), for each list route of an async handler.
+LIST_QUERIES = [
+    ("/genes?species_id=1", lambda db: genes.get_genes(db, species_id=1)),
+    (
+        "/genes?limit=2&cursor=WzFd",
+        lambda db: genes.get_genes(db, limit=2, cursor=(1,)),
+    ),
+    (
+        "/homologs/?species_id=1&source_name=AGR",
+        lambda db: homologs.get_homologs(db, species_id=1, source_name="AGR"),
+    ),
+    (
+        "/orthologs/?from_species=1&to_species=2&algorithm_id=1",
+        lambda db: orthologs.get_orthologs(
+            db, from_species=1, to_species=2, algorithm_id=1
+        ),
+    ),
+    (
+        "/orthologs/?from_gene_id=1&best=true",
+        lambda db: orthologs.get_orthologs(
+            db, from_gene_id=1, best=True, algorithm_id=2
+        ),
+    ),
+]
+
+
+@pytest.fixture(scope="module")
+def engine() -> Iterator[Engine]:
+    """Create and populate a temporary tenant schema."""
+    with tenant(DB_URI, SCHEMA_NAME) as engine:
+        yield engine
+
+
+@pytest.fixture()
+def _async_engines(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Use async engines on the test database, as `config.DB_ASYNC` would."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    # Not pooled, as each test runs its requests on a new event loop.
+    agr_engine = create_async_engine(DB_URI, poolclass=NullPool)
+    # Both databases are the test database, with the Geneweaver tables in the tenant.
+    gw_engine = agr_engine.execution_options(
+        schema_translate_map=schema_translate_map(SCHEMA_NAME)
+    )
+    monkeypatch.setattr(database, "agr_async_engine", agr_engine)
+    monkeypatch.setattr(database, "gw_async_engine", gw_engine)
+
+
+def _app() -> FastAPI:
+    """Get an application serving the async handlers from the tenant schema."""
+    app = FastAPI()
+    app.add_api_route("/genes", genes_controller.get_genes_async)
+    app.add_api_route(
+        "/genes/by-ref-id/{ref_id}", genes_controller.get_gene_by_ref_id_async
+    )
+    app.add_api_route("/genes/{gene_id}", genes_controller.get_gene_async)
+    app.add_api_route("/homologs/", homologs_controller.get_homologs_async)
+    app.add_api_route("/orthologs/", orthologs_controller.get_orthologs_async)
+    async_session_manager, _ = set_up_async_sessionmanager(VERSION)
+    app.default_version = DefaultVersion(VERSION.id, None, async_session_manager)
+    return app
+
+
+def _get_all(app: FastAPI, paths: List[str]) -> Dict[str, httpx.Response]:
+    """Send GET requests to an application, on a single event loop."""
+
+    async def send() -> Dict[str, httpx.Response]:
+        await warm_async_session_manager(app.default_version.async_session)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://aon") as c:
+            return {path: await c.get(path) for path in paths}
+
+    return asyncio.run(send())
+
+
+@pytest.mark.usefixtures("_async_engines")
+def test_list_handlers_match_the_sync_services(engine: Engine):
+    """Test that the async list handlers return what the sync services do."""
+    responses = _get_all(_app(), [path for path, _ in LIST_QUERIES])
+
+    with Session(engine) as db:
+        for path, query in LIST_QUERIES:
+            expected = [asdict(row) for row in query(db)]
+            assert expected, f"{path} has no fixture rows"
+            assert responses[path].status_code == 200, path
+            assert responses[path].json() == expected, path
+
+
+@pytest.mark.usefixtures("_async_engines", "engine")
+def test_gene_handlers():
+    """Test the async gene handlers, with a Geneweaver reference to convert."""
+    responses = _get_all(
+        _app(),
+        ["/genes/1", "/genes/by-ref-id/MGI:2", "/genes/by-ref-id/RGD5?ref_id_type=gw"],
+    )
+
+    assert responses["/genes/1"].json()["gn_ref_id"] == "MGI:1"
+    assert [g["gn_id"] for g in responses["/genes/by-ref-id/MGI:2"].json()] == [3]
+    gw_genes = responses["/genes/by-ref-id/RGD5?ref_id_type=gw"].json()
+    assert [g["gn_ref_id"] for g in gw_genes] == ["RGD:5"]
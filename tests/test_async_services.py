@@ -0,0 +1,126 @@
+"""Test the async service functions and the async session dependency."""
+
+import asyncio
+import threading
+from types import SimpleNamespace
+from typing import Iterator, List, Optional
+
+import pytest
+from fastapi import Request
+from geneweaver.aon import dependencies as deps
+from geneweaver.aon.core.schema_version import SchemaVersionRegistry
+from geneweaver.aon.models import Gene, Homology, Version
+from geneweaver.aon.service import genes, homologs
+from sqlalchemy import Executable, Result, create_engine
+from sqlalchemy.orm import Session
+
+
+class SyncBackedAsyncSession:
+    """The `AsyncSession` methods the services use, run on a sync session."""
+
+    def __init__(self: "SyncBackedAsyncSession", sync_session: Session) -> None:
+        """Wrap a sync session."""
+        self.sync_session = sync_session
+        self.info = sync_session.info
+
+    async def execute(self: "SyncBackedAsyncSession", statement: Executable) -> Result:
+        """Execute a statement."""
+        return self.sync_session.execute(statement)
+
+    async def get(
+        self: "SyncBackedAsyncSession", entity: type, ident: int
+    ) -> Optional[object]:
+        """Get an instance by primary key."""
+        return self.sync_session.get(entity, ident)
+
+
+@pytest.fixture()
+def db() -> Iterator[Session]:
+    """Get a session on an in-memory database of a few genes and homologs."""
+    engine = create_engine("sqlite://")
+    for model in (Gene, Homology):
+        model.__table__.create(engine)
+    with Session(engine) as session:
+        session.add_all(
+            Gene(gn_id=i, gn_ref_id=f"MGI:{i}", gn_prefix="MGI", sp_id=i % 2)
+            for i in range(1, 8)
+        )
+        session.add_all(
+            Homology(hom_id=i // 3, gn_id=i, sp_id=i % 2, hom_source_name="AGR")
+            for i in range(1, 8)
+        )
+        session.commit()
+        yield session
+
+
+def test_genes(db: Session):
+    """Get genes through both paths."""
+    async_db = SyncBackedAsyncSession(db)
+    for kwargs in ({}, {"species_id": 1, "limit": 2}, {"cursor": (3,)}):
+        assert asyncio.run(genes.get_genes_async(async_db, **kwargs)) == (
+            genes.get_genes(db, **kwargs)
+        )
+    assert asyncio.run(genes.gene_by_id_async(async_db, 4)).gn_id == 4
+    assert asyncio.run(genes.gene_by_ref_id_async(async_db, "MGI:1")) == (
+        genes.gene_by_ref_id(db, "MGI:1")
+    )
+
+
+def test_homologs(db: Session):
+    """Get homologs through both paths, with a two column cursor."""
+    async_db = SyncBackedAsyncSession(db)
+    for kwargs in ({}, {"homolog_id": 1}, {"cursor": (1, 4), "limit": 2}):
+        assert asyncio.run(homologs.get_homologs_async(async_db, **kwargs)) == (
+            homologs.get_homologs(db, **kwargs)
+        )
+
+
+class BlockingLoader:
+    """Loads the schema versions only once released, as a slow database would."""
+
+    def __init__(self: "BlockingLoader") -> None:
+        """Wait to be released."""
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.released_in_time: Optional[bool] = None
+
+    def __call__(self: "BlockingLoader") -> List[Version]:
+        """Load every version."""
+        self.started.set()
+        self.released_in_time = self.release.wait(timeout=2)
+        return [Version(id=7, schema_name="agr_7", load_complete=True)]
+
+
+class ClosingSession:
+    """An async session that only records being closed."""
+
+    closed = False
+
+    async def close(self: "ClosingSession") -> None:
+        """Close the session."""
+        self.closed = True
+
+
+def test_version_reload_does_not_block_the_event_loop():
+    """Test that the loop keeps running while an unknown version is looked up."""
+    loader = BlockingLoader()
+    app = SimpleNamespace(
+        version_registry=SchemaVersionRegistry(ttl=60, negative_ttl=0, loader=loader),
+        async_session_managers=SimpleNamespace(get=lambda version: ClosingSession),
+    )
+    request = Request({"type": "http", "app": app, "state": {"schema_version_id": 7}})
+
+    async def open_session() -> ClosingSession:
+        dependency = deps.async_session(request)
+        lookup = asyncio.ensure_future(dependency.__anext__())
+        while not loader.started.is_set():
+            await asyncio.sleep(0.001)
+        # Only reached while the reload is in progress if it left the loop free.
+        loader.release.set()
+        session = await lookup
+        await dependency.aclose()
+        return session
+
+    session = asyncio.run(open_session())
+    assert loader.released_in_time
+    assert session.closed
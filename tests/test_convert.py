@@ -0,0 +1,52 @@
+"""Test the Geneweaver and AGR reference ID conversions."""
+
+import pytest
+from geneweaver.aon.core.convert_rules import AGR_PREFIXES_BY_GDB_NAME
+from geneweaver.aon.service.convert import agr_refs_to_ode, ode_ref_to_agr_by_gdb_id
+from geneweaver.core.enum import GeneIdentifier
+
+
+def test_agr_refs_to_ode_keeps_input_order():
+    """Test that batch conversion applies every prefix rule and keeps the order."""
+    refs = ["WB:WBGene1", "RGD:123", "MGI:1", "FB:FBgn1", "ZFIN:ZDB-1", "SGD:S1"]
+    assert agr_refs_to_ode(refs) == [
+        "WBGene1",
+        "RGD123",
+        "MGI:1",
+        "FBgn1",
+        "ZDB-1",
+        "S1",
+    ]
+
+
+@pytest.mark.parametrize(
+    ("ode_ref", "gdb_id", "expected"),
+    [
+        ("WBGene1", 15, "WB:WBGene1"),
+        ("RGD123", 12, "RGD:123"),
+        ("MGI:1", 10, "MGI:1"),
+        ("FBgn1", 14, "FB:FBgn1"),
+        ("ZDB-1", 13, "ZFIN:ZDB-1"),
+        ("S1", 16, "SGD:S1"),
+        ("unknown", None, "unknown"),
+    ],
+)
+def test_ode_ref_to_agr_by_gdb_id(ode_ref: str, gdb_id: int, expected: str):
+    """Test the prefix rules for each gene database."""
+    assert ode_ref_to_agr_by_gdb_id(ode_ref, gdb_id) == expected
+
+
+def test_agr_and_ode_conversions_round_trip():
+    """Test that converting to Geneweaver format and back restores the AGR ids."""
+    refs = ["WB:WBGene1", "RGD:123", "FB:FBgn1", "ZFIN:ZDB-1", "SGD:S1"]
+    gdb_ids = [15, 12, 14, 13, 16]
+    ode_refs = agr_refs_to_ode(refs)
+    assert [
+        ode_ref_to_agr_by_gdb_id(ref, gdb_id) for ref, gdb_id in zip(ode_refs, gdb_ids)
+    ] == refs
+
+
+def test_prefixes_are_keyed_by_gene_identifier_names():
+    """Test that every prefix rule names a Geneweaver gene database."""
+    for name in AGR_PREFIXES_BY_GDB_NAME:
+        assert GeneIdentifier[name].name == name
@@ -0,0 +1,156 @@
+"""Test the offline client against the in-memory graph and brute force filters."""
+
+import pytest
+from geneweaver.aon import embedded
+from geneweaver.aon.embedded.client import InvalidCursorError, SnapshotClient
+from geneweaver.aon.embedded.snapshot import string_sections, write_snapshot
+from geneweaver.aon.service.ortholog_graph import OrthologGraph
+from geneweaver.aon.service.snapshot import _gene_sections, _homology_sections
+
+from tests.test_ortholog_graph import EDGES, GENE_SPECIES, QUERIES
+
+# gn_id, gn_ref_id, gn_prefix
+GENES = [
+    (1, "MGI:1", "MGI"),
+    (2, "RGD:2", "RGD"),
+    (3, "MGI:3", "MGI"),
+    (4, "ZFIN:ZDB-4", "ZFIN"),
+    (5, "WB:WBGene5", "WB"),
+    (7, "MGI:1", "MGI"),
+]
+
+# hom_id, gn_id, hom_source_name, ordered as the database returns them
+HOMOLOGS = [
+    (1, 1, "AGR"),
+    (1, 2, "AGR"),
+    (2, 3, "AGR"),
+    (2, 4, "HGNC"),
+    (2, 5, "AGR"),
+    (3, 1, "HGNC"),
+]
+
+
+@pytest.fixture(scope="module")
+def graph() -> OrthologGraph:
+    """Build a graph, with the edges ordered as the database returns them."""
+    edges = sorted(EDGES, key=lambda e: (e[1], e[0]))
+    return OrthologGraph(GENE_SPECIES.items(), edges, [1, 2])
+
+
+@pytest.fixture(scope="module")
+def client(
+    tmp_path_factory: pytest.TempPathFactory, graph: OrthologGraph
+) -> SnapshotClient:
+    """Get a client of a snapshot written from the test data."""
+    sections = graph.sections()
+    sections.update(string_sections("ortholog_source_names", graph.source_names))
+    num_genes = len(graph.gene_species)
+    sections.update(_gene_sections(lambda _: iter(GENES), num_genes))
+    sections.update(_homology_sections(lambda _: iter(HOMOLOGS), num_genes))
+    path = tmp_path_factory.mktemp("snapshots") / "agr_7.gwaon"
+    write_snapshot(path, 7, sections)
+    return SnapshotClient(path, verify=True)
+
+
+@pytest.mark.parametrize(
+    "query", QUERIES + [{}, {"best": True}, {"from_species": 1, "algorithm_id": 2}]
+)
+def test_orthologs_match_graph(
+    client: SnapshotClient, graph: OrthologGraph, query: dict
+):
+    """Test that the client returns the orthologs the API would."""
+    expected = graph.orthologs(**query)
+    assert [tuple(o) for o in client.get_orthologs(**query)] == [
+        (
+            o.ort_id,
+            o.from_gene,
+            o.to_gene,
+            o.ort_is_best,
+            o.ort_is_best_revised,
+            o.ort_is_best_is_adjusted,
+            o.ort_num_possible_match_algorithms,
+            o.ort_source_name,
+        )
+        for o in expected
+    ]
+
+
+def test_ortholog_paging(client: SnapshotClient):
+    """Test that scans page through the ort_id order."""
+    first = client.get_orthologs(limit=3)
+    assert [o.ort_id for o in first] == [3, 10, 11]
+    rest = client.get_orthologs(cursor=(first[-1].ort_id,), limit=3)
+    assert [o.ort_id for o in rest] == [12, 13, 14]
+    with pytest.raises(InvalidCursorError):
+        client.get_orthologs(cursor=(1, 2))
+
+
+def test_genes(client: SnapshotClient):
+    """Test gene lookups by id, reference and filters."""
+    assert client.gene_by_id(4) == (4, "ZFIN:ZDB-4", "ZFIN", 2)
+    assert client.gene_by_id(6) is None
+    assert client.gene_by_id(99) is None
+    assert [g.gn_id for g in client.gene_by_ref_id("MGI:1")] == [1, 7]
+    assert client.gene_by_ref_id("MGI:2") == []
+    assert [g.gn_id for g in client.get_genes(prefix="MGI")] == [1, 3, 7]
+    assert [g.gn_id for g in client.get_genes(species_id=3, cursor=(5,))] == [7]
+    assert [g.gn_id for g in client.get_genes(start=1, limit=2)] == [2, 3]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        {},
+        {"homolog_id": 2},
+        {"homolog_id": 2, "gene_id": 4},
+        {"gene_id": 1},
+        {"source_name": "HGNC"},
+        {"species_id": 1},
+        {"source_name": "missing"},
+        {"cursor": (2, 3)},
+        {"gene_id": 1, "cursor": (1, 1)},
+    ],
+)
+def test_homologs_match_reference(client: SnapshotClient, query: dict):
+    """Test that homologs are filtered and ordered as by the database."""
+    cursor = query.get("cursor")
+    expected = [
+        (hom_id, gn_id, GENE_SPECIES[gn_id], source)
+        for hom_id, gn_id, source in HOMOLOGS
+        if query.get("homolog_id", hom_id) == hom_id
+        and query.get("gene_id", gn_id) == gn_id
+        and query.get("source_name", source) == source
+        and query.get("species_id", GENE_SPECIES[gn_id]) == GENE_SPECIES[gn_id]
+        and (cursor is None or (hom_id, gn_id) > cursor)
+    ]
+    assert [tuple(h) for h in client.get_homologs(**query)] == expected
+
+
+def test_convert(client: SnapshotClient):
+    """Test that references are converted to the AGR form of a snapshot gene."""
+    refs = ["MGI:1", "RGD2", "ZDB-4", "WBGene5", "unknown", "MGI:1"]
+    assert client.ode_refs_to_agr(refs) == [
+        "MGI:1",
+        "RGD:2",
+        "ZFIN:ZDB-4",
+        "WB:WBGene5",
+        "unknown",
+        "MGI:1",
+    ]
+    assert client.agr_refs_to_ode(["RGD:2", "WB:WBGene5"]) == ["RGD2", "WBGene5"]
+
+
+def test_default_client(client: SnapshotClient, monkeypatch: pytest.MonkeyPatch):
+    """Test that the module functions query the snapshot named by the environment."""
+    embedded.set_snapshot(None)
+    monkeypatch.delenv(embedded.SNAPSHOT_ENV_VAR, raising=False)
+    with pytest.raises(RuntimeError):
+        embedded.get_client()
+
+    monkeypatch.setenv(embedded.SNAPSHOT_ENV_VAR, str(client.path))
+    try:
+        assert embedded.get_client().version_id == 7
+        assert [o.ort_id for o in embedded.get_orthologs(from_gene_id=2)] == [12]
+        assert embedded.ode_ref_to_agr("RGD2") == "RGD:2"
+    finally:
+        embedded.set_snapshot(None)
@@ -0,0 +1,161 @@
+"""Test the serialization of bulk exports, and the export endpoints."""
+
+import csv
+import io
+import json
+from typing import Iterator, List
+
+import pytest
+from fastapi import FastAPI
+from geneweaver.aon import dependencies as deps
+from geneweaver.aon.controller import export
+from geneweaver.aon.enum import ExportFormat
+from geneweaver.aon.models import (
+    Algorithm,
+    Gene,
+    Homology,
+    Ortholog,
+    OrthologAlgorithms,
+)
+from geneweaver.aon.service.export import serialize_rows
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from tests.asgi import request
+
+NAMES = ["gn_id", "gn_ref_id", "sp_id"]
+ROWS = [(i, f"MGI:{i}", 1) for i in range(2500)]
+
+
+def test_ndjson_export():
+    """Test that every row is one JSON object per line."""
+    text = "".join(serialize_rows(iter(ROWS), NAMES, ExportFormat.NDJSON))
+    lines = text.splitlines()
+    assert len(lines) == len(ROWS)
+    assert json.loads(lines[3]) == {"gn_id": 3, "gn_ref_id": "MGI:3", "sp_id": 1}
+
+
+def test_tsv_export_is_chunked():
+    """Test that delimited exports have a header and are yielded in chunks."""
+    chunks = list(serialize_rows(iter(ROWS), NAMES, ExportFormat.TSV, chunk_size=1000))
+    assert len(chunks) == 3
+    rows = list(csv.reader(io.StringIO("".join(chunks)), delimiter="\t"))
+    assert rows[0] == NAMES
+    assert rows[1:] == [[str(v) for v in row] for row in ROWS]
+
+
+@pytest.fixture()
+def app() -> Iterator[FastAPI]:
+    """Get an app of the export endpoints, on an in-memory database."""
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    for model in (Gene, Homology, Ortholog, Algorithm, OrthologAlgorithms):
+        model.__table__.create(engine)
+    session_manager = sessionmaker(bind=engine)
+    with session_manager() as db:
+        db.add_all(
+            Gene(gn_id=i, gn_ref_id=f"{prefix}:{i}", gn_prefix=prefix, sp_id=i % 2)
+            for i, prefix in enumerate(["MGI", "RGD", "MGI", "RGD", "MGI"], start=1)
+        )
+        db.add_all(
+            Homology(hom_id=i // 2, gn_id=i, sp_id=i % 2, hom_source_name="AGR")
+            for i in range(1, 6)
+        )
+        db.add_all(Algorithm(alg_id=i, alg_name=f"alg {i}") for i in (1, 2))
+        db.add_all(
+            Ortholog(
+                ort_id=i,
+                from_gene=from_gene,
+                to_gene=to_gene,
+                ort_is_best=i == 1,
+                ort_is_best_revised=True,
+                ort_is_best_is_adjusted=False,
+                ort_num_possible_match_algorithms=2,
+                ort_source_name="AGR",
+            )
+            for i, (from_gene, to_gene) in enumerate([(1, 2), (1, 4), (3, 2)], start=1)
+        )
+        db.add_all(
+            OrthologAlgorithms(ora_id=i, alg_id=alg_id, ort_id=ort_id)
+            for i, (alg_id, ort_id) in enumerate([(2, 1), (2, 2), (1, 3)], start=1)
+        )
+        db.commit()
+
+    app = FastAPI()
+    app.include_router(export.router)
+    app.dependency_overrides[deps.session_manager] = lambda: session_manager
+    yield app
+    engine.dispose()
+
+
+def _records(text: str, export_format: ExportFormat) -> List[dict]:
+    """Parse an export into one dict per row, with the values as strings."""
+    if export_format == ExportFormat.NDJSON:
+        return [
+            {key: str(value) for key, value in json.loads(line).items()}
+            for line in text.splitlines()
+        ]
+    delimiter = "\t" if export_format == ExportFormat.TSV else ","
+    return list(csv.DictReader(io.StringIO(text), delimiter=delimiter))
+
+
+@pytest.mark.parametrize("export_format", list(ExportFormat))
+def test_export_formats(app: FastAPI, export_format: ExportFormat):
+    """Test that each format is served with its media type, as a named download."""
+    response = request(
+        app, "GET", "/export/genes", params={"export_format": export_format.value}
+    )
+    assert response.status_code == 200
+    media_type = response.headers["content-type"].split(";")[0]
+    assert (
+        media_type
+        == {
+            ExportFormat.NDJSON: "application/x-ndjson",
+            ExportFormat.TSV: "text/tab-separated-values",
+            ExportFormat.CSV: "text/csv",
+        }[export_format]
+    )
+    assert response.headers["content-disposition"] == (
+        f'attachment; filename="genes.{export_format.value}"'
+    )
+    assert _records(response.text, export_format)[0] == {
+        "gn_id": "1",
+        "gn_ref_id": "MGI:1",
+        "gn_prefix": "MGI",
+        "sp_id": "1",
+    }
+
+
+def test_export_defaults_to_ndjson(app: FastAPI):
+    """Test that exports without a format are NDJSON."""
+    response = request(app, "GET", "/export/homologs")
+    assert response.headers["content-disposition"].endswith('"homologs.ndjson"')
+    assert len(response.text.splitlines()) == 5
+
+
+@pytest.mark.parametrize(
+    ("path", "params", "key", "expected"),
+    [
+        ("/export/genes", {"species_id": 1}, "gn_id", [1, 3, 5]),
+        ("/export/genes", {"species_id": 1, "prefix": "RGD"}, "gn_id", []),
+        ("/export/genes", {"prefix": "RGD"}, "gn_id", [2, 4]),
+        ("/export/homologs", {"gene_id": 3}, "hom_id", [1]),
+        ("/export/homologs", {"species_id": 0}, "gn_id", [2, 4]),
+        ("/export/orthologs", {}, "ort_id", [1, 2]),
+        ("/export/orthologs", {"algorithm_id": 1}, "ort_id", [3]),
+        ("/export/orthologs", {"from_gene_id": 1, "best": True}, "ort_id", [1]),
+        ("/export/orthologs", {"to_gene_id": 2}, "ort_id", [1]),
+    ],
+)
+def test_export_filters(
+    app: FastAPI, path: str, params: dict, key: str, expected: List[int]
+):
+    """Test that the filters of each endpoint are applied."""
+    response = request(app, "GET", path, params=params)
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(row[key] for row in rows) == expected
@@ -0,0 +1,122 @@
+"""Test adding the orthologs of Geneweaver species that are not in AGR.
+
+These tests need a Postgres database, and are skipped unless `AON_TEST_DB_URI` is
+set, see `tests.test_query_plans`. The Geneweaver gene table is created in the
+temporary tenant schema, see `tests.tenant`.
+"""
+
+import os
+from typing import Iterator
+
+import pytest
+from geneweaver.aon.load.geneweaver.homologs import (
+    NEW_SPECIES_GDB_IDS,
+    add_missing_orthologs,
+    get_gene_ids,
+    get_geneweaver_refs,
+)
+from geneweaver.aon.models import GeneweaverGene, Ortholog
+from geneweaver.core.enum import GeneIdentifier
+from sqlalchemy import insert, select, text
+from sqlalchemy.orm import Session
+
+from tests.tenant import tenant
+
+DB_URI = os.environ.get("AON_TEST_DB_URI")
+SCHEMA_NAME = "test_gw_homologs"
+
+pytestmark = pytest.mark.skipif(
+    DB_URI is None, reason="AON_TEST_DB_URI is not set, no database to load into"
+)
+
+# Genes 7 and 8 are of species 6 and 10, which are not in AGR, and are loaded with
+# their Geneweaver reference ids. Genes 1 to 5 are in the tenant fixture.
+EXTRA_SQL = """
+INSERT INTO sp_species (sp_id, sp_name, sp_taxon_id) VALUES
+    (6, 'Species six', 6), (10, 'Species ten', 10);
+INSERT INTO gn_gene (gn_id, gn_ref_id, gn_prefix, sp_id) VALUES
+    (7, 'ENSG7', 'ENSG', 6), (8, 'ENSG8', 'ENSG', 10);
+SELECT setval(pg_get_serial_sequence('ort_ortholog', 'ort_id'), 100);
+"""
+
+# Geneweaver genes, as ode_gene_id, ode_ref_id, gdb_id and sp_id.
+GENEWEAVER_GENES = [
+    (700, "ENSG7", GeneIdentifier.ENSEMBLE_GENE, 6),
+    (800, "ENSG8", GeneIdentifier.ENSEMBLE_GENE, 10),
+    (101, "MGI:1", GeneIdentifier.MGI, 1),
+    (102, "HGNC:1", GeneIdentifier.HGNC, 2),
+    (103, "MGI:2", GeneIdentifier.MGI, 1),
+    (105, "RGD5", GeneIdentifier.RGD, 1),
+    # a Geneweaver gene that is not in the tenant
+    (999, "MGI:999", GeneIdentifier.MGI, 1),
+]
+
+# (hom_id, ode_gene_id, sp_id), ordered by hom_id. The second cluster has no gene
+# of a new species, and the last has one, converted from an RGD reference.
+HOMOLOGS = [
+    (1, 700, 6),
+    (1, 101, 1),
+    (1, 102, 2),
+    (2, 103, 1),
+    (2, 999, 1),
+    (3, 800, 10),
+    (3, 105, 1),
+]
+
+
+@pytest.fixture()
+def db() -> Iterator[Session]:
+    """Create a tenant with Geneweaver genes of species in and out of AGR."""
+    with tenant(DB_URI, SCHEMA_NAME) as engine:
+        with engine.begin() as conn:
+            conn.execute(text(f'SET LOCAL search_path TO "{SCHEMA_NAME}"'))
+            conn.exec_driver_sql(EXTRA_SQL)
+            conn.execute(
+                insert(GeneweaverGene),
+                [
+                    {
+                        "ode_gene_id": ode_gene_id,
+                        "ode_ref_id": ode_ref_id,
+                        "gdb_id": int(gdb_id),
+                        "sp_id": sp_id,
+                    }
+                    for ode_gene_id, ode_ref_id, gdb_id, sp_id in GENEWEAVER_GENES
+                ],
+            )
+        with Session(engine) as session:
+            yield session
+
+
+def test_prefetch_maps(db: Session):
+    """Test that the genes of every cluster are resolved up front."""
+    new_species = [h for h in HOMOLOGS if h[2] in (6, 10)]
+
+    assert get_geneweaver_refs(db, new_species, NEW_SPECIES_GDB_IDS) == {
+        (700, 6): ("ENSG7", int(GeneIdentifier.ENSEMBLE_GENE)),
+        (800, 10): ("ENSG8", int(GeneIdentifier.ENSEMBLE_GENE)),
+    }
+    assert get_geneweaver_refs(db, [], NEW_SPECIES_GDB_IDS) == {}
+    assert get_gene_ids(db, ["ENSG7", "MGI:1", "MGI:999", "MGI:1"]) == {
+        "ENSG7": 7,
+        "MGI:1": 1,
+    }
+
+
+def test_every_cluster_is_linked(db: Session):
+    """Test that each new species gene is linked to its cluster's AGR genes.
+
+    This includes the last cluster of the rows, which the loader used to skip.
+    """
+    assert add_missing_orthologs(db, HOMOLOGS) == 3
+
+    rows = db.execute(
+        select(
+            Ortholog.from_gene,
+            Ortholog.to_gene,
+            Ortholog.ort_is_best,
+            Ortholog.ort_num_possible_match_algorithms,
+        )
+        .where(Ortholog.ort_source_name == "Homologene")
+        .order_by(Ortholog.from_gene, Ortholog.to_gene)
+    ).all()
+    assert rows == [(7, 1, True, 0), (7, 2, True, 0), (8, 5, True, 0)]
@@ -0,0 +1,63 @@
+"""Test the homology clustering engine."""
+
+import random
+
+from geneweaver.aon.load.homology import DisjointSet, HomologyClusters
+
+
+def _partition(rows) -> set:
+    """Get the clusters as a set of frozensets of gene ids."""
+    clusters = {}
+    for hom_id, gn_id, _ in rows:
+        clusters.setdefault(hom_id, set()).add(gn_id)
+    return {frozenset(genes) for genes in clusters.values()}
+
+
+def test_disjoint_set_union_find():
+    """Test that union merges sets and find returns a shared representative."""
+    sets = DisjointSet()
+    elements = [sets.add() for _ in range(6)]
+    sets.union(elements[0], elements[1])
+    sets.union(elements[2], elements[3])
+    sets.union(elements[1], elements[3])
+
+    assert len(sets) == 6
+    assert len({sets.find(i) for i in elements[:4]}) == 1
+    assert sets.find(elements[4]) != sets.find(elements[5])
+
+
+def test_existing_clusters_are_merged():
+    """Test that an edge between two existing clusters joins them."""
+    clusters = HomologyClusters()
+    clusters.add_edges([(1, 2, "AGR"), (3, 4, "AGR"), (2, 3, "Homologene")])
+
+    assert _partition(clusters.rows()) == {frozenset({1, 2, 3, 4})}
+
+
+def test_clusters_do_not_depend_on_edge_order():
+    """Test that the connected components are the same for any edge order."""
+    rng = random.Random(42)
+    edges = [(rng.randrange(200), rng.randrange(200), "AGR") for _ in range(150)]
+    expected = None
+    for _ in range(5):
+        rng.shuffle(edges)
+        clusters = HomologyClusters()
+        clusters.add_edges(edges)
+        partition = _partition(clusters.rows())
+        expected = partition if expected is None else expected
+        assert partition == expected
+
+
+def test_rows_have_dense_cluster_ids_and_first_source():
+    """Test cluster numbering and the source recorded for each gene."""
+    clusters = HomologyClusters()
+    clusters.add_edges([(10, 11, "AGR"), (20, 21, "AGR"), (11, 30, "Homologene")])
+
+    rows = sorted(clusters.rows(), key=lambda r: r[1])
+    assert rows == [
+        (1, 10, "AGR"),
+        (1, 11, "AGR"),
+        (2, 20, "AGR"),
+        (2, 21, "AGR"),
+        (1, 30, "Homologene"),
+    ]
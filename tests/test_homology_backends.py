@@ -0,0 +1,116 @@
+"""Test that the Python and SQL homology backends write the same rows.
+
+These tests need a Postgres database, and are skipped unless `AON_TEST_DB_URI` is
+set, see `tests.test_query_plans`. A temporary tenant schema is created and dropped
+in that database.
+"""
+
+import os
+import random
+from argparse import Namespace
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+import psycopg
+import pytest
+from alembic import command
+from alembic.config import Config
+from geneweaver.aon.load.homology import add_homology, add_homology_in_database
+
+DB_URI = os.environ.get("AON_TEST_DB_URI")
+SCHEMA_NAME = "test_homology_backends"
+
+pytestmark = pytest.mark.skipif(
+    DB_URI is None, reason="AON_TEST_DB_URI is not set, no database to cluster in"
+)
+
+N_GENES = 400
+SOURCES = ("AGR", "Homologene", "HGNC")
+
+
+def _edges(seed: int) -> List[Tuple[int, int, str]]:
+    """Build random ortholog edges, plus a long chain to exercise the propagation.
+
+    :param seed: The random seed.
+    :return: `(from_gene, to_gene, source)` tuples, in ort_id order.
+    """
+    rng = random.Random(seed)
+    edges = [
+        (rng.randrange(1, 301), rng.randrange(1, 301), rng.choice(SOURCES))
+        for _ in range(250)
+    ]
+    # A chain in descending gene order, the worst case for label propagation.
+    chain = list(range(N_GENES, 300, -1))
+    edges.extend((a, b, "AGR") for a, b in zip(chain, chain[1:]))
+    rng.shuffle(edges)
+    return edges
+
+
+@pytest.fixture()
+def conn() -> Iterator[psycopg.Connection]:
+    """Create a tenant schema of random genes and orthologs."""
+    script_location = (
+        Path(__file__).parent.parent / "src" / "geneweaver" / "aon" / "alembic"
+    ).resolve()
+    alembic_cfg = Config(
+        file_=str(script_location / "alembic.ini"),
+        cmd_opts=Namespace(x=[f"tenant={SCHEMA_NAME}"]),
+    )
+    alembic_cfg.set_main_option("script_location", str(script_location))
+    alembic_cfg.set_main_option("sqlalchemy.url", DB_URI)
+
+    with psycopg.connect(DB_URI.replace("postgresql+psycopg", "postgresql")) as conn:
+        try:
+            command.upgrade(alembic_cfg, "heads")
+            with conn.cursor() as cursor:
+                cursor.execute(f'SET search_path TO "{SCHEMA_NAME}"')
+                cursor.executemany(
+                    "INSERT INTO sp_species (sp_id, sp_name, sp_taxon_id) "
+                    "VALUES (%s, %s, %s)",
+                    [(sp_id, f"species {sp_id}", sp_id) for sp_id in (1, 2, 3)],
+                )
+                cursor.executemany(
+                    "INSERT INTO gn_gene (gn_id, gn_ref_id, gn_prefix, sp_id) "
+                    "VALUES (%s, %s, 'MGI', %s)",
+                    [(i, f"MGI:{i}", i % 3 + 1) for i in range(1, N_GENES + 1)],
+                )
+                cursor.executemany(
+                    "INSERT INTO ort_ortholog (ort_id, from_gene, to_gene, "
+                    "ort_is_best, ort_is_best_revised, ort_is_best_is_adjusted, "
+                    "ort_num_possible_match_algorithms, ort_source_name) "
+                    "VALUES (%s, %s, %s, true, true, false, 1, %s)",
+                    [(i, *edge) for i, edge in enumerate(_edges(7), start=1)],
+                )
+            conn.commit()
+            yield conn
+        finally:
+            conn.rollback()
+            conn.execute(f'DROP SCHEMA IF EXISTS "{SCHEMA_NAME}" CASCADE')
+            conn.commit()
+
+
+def _homology_rows(conn: psycopg.Connection) -> List[Tuple[int, int, int, str]]:
+    """Get every row of the tenant's hom_homology table.
+
+    :param conn: The connection.
+    :return: The `(hom_id, gn_id, sp_id, hom_source_name)` rows, sorted.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f'SELECT hom_id, gn_id, sp_id, hom_source_name FROM "{SCHEMA_NAME}".'
+            "hom_homology ORDER BY hom_id, gn_id"
+        )
+        return cursor.fetchall()
+
+
+def test_backends_write_identical_rows(conn: psycopg.Connection):
+    """Test that both backends write the same hom_homology rows."""
+    python_written = add_homology(conn, SCHEMA_NAME)
+    python_rows = _homology_rows(conn)
+
+    sql_written = add_homology_in_database(conn, SCHEMA_NAME)
+    sql_rows = _homology_rows(conn)
+
+    assert python_written == sql_written == len(python_rows)
+    assert len({row[0] for row in python_rows}) > 1
+    assert sql_rows == python_rows
@@ -0,0 +1,146 @@
+"""Test how the load decides whether a release was already loaded from its file."""
+
+from datetime import date
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+from geneweaver.aon.cli import load
+from geneweaver.aon.models import Version
+from sqlalchemy import DefaultClause, MetaData, create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+RELEASE = "7.0.0"
+
+
+def _version(version_id: int, content_hash: str = None, etag: str = None) -> Version:
+    return Version(
+        id=version_id,
+        schema_name=f"v7_0_0__{version_id}",
+        agr_version=RELEASE,
+        date=date(2024, 1, version_id),
+        load_complete=True,
+        content_hash=content_hash,
+        source_etag=etag,
+    )
+
+
+@pytest.fixture()
+def engine() -> Engine:
+    """Get an in-memory versions table."""
+    engine = create_engine("sqlite://").execution_options(
+        schema_translate_map={"versions": None}
+    )
+    # The default is a string Postgres casts to a date, and SQLite keeps as is.
+    table = Version.__table__.to_metadata(MetaData())
+    table.c.date.server_default = DefaultClause(text("CURRENT_DATE"))
+    table.create(engine)
+    return engine
+
+
+@pytest.fixture()
+def upgrades(engine: Engine, monkeypatch: pytest.MonkeyPatch) -> List[str]:
+    """Point the load at the versions table, and record the migrated tenants."""
+    migrated = []
+
+    def upgrade(alembic_cfg, revision: str) -> None:  # noqa: ANN001
+        migrated.append(alembic_cfg.cmd_opts.x[0])
+
+    monkeypatch.setattr(load, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(load.command, "upgrade", upgrade)
+    monkeypatch.setattr(load.config, "DB", SimpleNamespace(URI="sqlite://"))
+    return migrated
+
+
+def _add(engine: Engine, *versions: Version) -> None:
+    with Session(engine) as db:
+        db.add_all(versions)
+        db.commit()
+
+
+def test_new_release(engine: Engine):
+    """Test that a release without versions is not loaded."""
+    with Session(engine) as db:
+        assert load._loaded_version(db, RELEASE, "e1", "h1") == (None, False)
+
+
+def test_same_content(engine: Engine):
+    """Test that the content hash decides, whatever the ETag."""
+    _add(engine, _version(1, "h1", "e1"))
+    with Session(engine) as db:
+        version, release_loaded = load._loaded_version(db, RELEASE, "e2", "h1")
+    assert version.id == 1
+    assert release_loaded is True
+
+
+def test_republished_file(engine: Engine):
+    """Test that a release re-published with new content is not loaded."""
+    _add(engine, _version(1, "h1", "e1"))
+    with Session(engine) as db:
+        assert load._loaded_version(db, RELEASE, "e1", "h2") == (None, True)
+
+
+def test_etag_without_content_hash(engine: Engine):
+    """Test that the ETag decides before the file is downloaded."""
+    _add(engine, _version(1, "h1", "e1"))
+    with Session(engine) as db:
+        assert load._loaded_version(db, RELEASE, "e1", None)[0].id == 1
+        assert load._loaded_version(db, RELEASE, "e2", None) == (None, True)
+        assert load._loaded_version(db, RELEASE, None, None)[0].id == 1
+
+
+def test_versions_loaded_before_hashes_match(engine: Engine):
+    """Test that a version without a recorded hash or ETag always matches."""
+    _add(engine, _version(1))
+    with Session(engine) as db:
+        assert load._loaded_version(db, RELEASE, "e1", "h1")[0].id == 1
+        assert load._loaded_version(db, RELEASE, "e1", None)[0].id == 1
+
+
+def test_create_schema_new_release(engine: Engine, upgrades: List[str]):
+    """Test that a new release gets a schema, with its hash and ETag recorded."""
+    schema_name, schema_id = load.create_schema(RELEASE, "h1", "e1", False)
+
+    assert upgrades == [f"tenant={schema_name}"]
+    with Session(engine) as db:
+        version = db.get(Version, schema_id)
+        assert version.schema_name == schema_name
+        assert version.agr_version == RELEASE
+        assert version.load_complete is False
+        assert (version.content_hash, version.source_etag) == ("h1", "e1")
+
+
+def test_create_schema_republished_file(engine: Engine, upgrades: List[str]):
+    """Test that a release re-published with new content is loaded again."""
+    _add(engine, _version(1, "h1", "e1"))
+
+    _, schema_id = load.create_schema(RELEASE, "h2", "e2", False)
+
+    assert len(upgrades) == 1
+    with Session(engine) as db:
+        assert db.get(Version, schema_id).content_hash == "h2"
+        assert db.get(Version, 1).source_etag == "e1"
+
+
+def test_create_schema_backfills_the_etag(engine: Engine, upgrades: List[str]):
+    """Test that a file re-published with the same content records its new ETag."""
+    _add(engine, _version(1, "h1", "e1"))
+
+    assert load.create_schema(RELEASE, "h1", "e2", False) is None
+
+    assert upgrades == []
+    with Session(engine) as db:
+        assert db.query(Version).count() == 1
+        assert db.get(Version, 1).source_etag == "e2"
+
+
+def test_create_schema_keeps_the_etag_without_one(engine: Engine, upgrades: List[str]):
+    """Test that an already loaded release without an ETag is left as it is."""
+    _add(engine, _version(1, "h1", "e1"))
+
+    assert load.create_schema(RELEASE, "h1", None, False) is None
+
+    assert upgrades == []
+    with Session(engine) as db:
+        assert db.get(Version, 1).source_etag == "e1"
@@ -0,0 +1,268 @@
+"""Test the in-memory ortholog graph against a brute force filter of its rows.
+
+The graph is also compared with the database path of `get_orthologs`, on SQLite, and
+on Postgres when `AON_TEST_DB_URI` is set, see `tests.test_query_plans`.
+"""
+
+import itertools
+import os
+from collections import defaultdict
+from typing import Iterator, List, Optional, Tuple
+
+import pytest
+from geneweaver.aon.core.schema_version import SCHEMA_VERSION_INFO_KEY
+from geneweaver.aon.models import (
+    Algorithm,
+    Gene,
+    Ortholog,
+    OrthologAlgorithms,
+    Species,
+)
+from geneweaver.aon.service import ortholog_graph, orthologs
+from geneweaver.aon.service.ortholog_graph import OrthologGraph, build_ortholog_graph
+from geneweaver.aon.service.rows import ORTHOLOG_COLUMNS
+from geneweaver.aon.service.utils import InvalidCursorError
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from tests.tenant import migrated_schema
+
+DB_URI = os.environ.get("AON_TEST_DB_URI")
+
+# gn_id -> sp_id
+GENE_SPECIES = {1: 1, 2: 2, 3: 1, 4: 2, 5: 3, 7: 3}
+
+# ort_id, from_gene, to_gene, best, revised, adjusted, possible, source, alg_ids
+EDGES = [
+    (10, 1, 2, True, True, False, 2, "AGR", [1, 2]),
+    (11, 1, 5, False, True, False, 1, "AGR", [2]),
+    (3, 1, 4, False, False, False, 1, "GW", None),
+    (12, 2, 1, True, False, True, 2, "AGR", [1]),
+    (13, 3, 4, True, True, False, 1, "AGR", [1]),
+    (14, 5, 1, False, False, False, 1, "AGR", [2]),
+    (15, 7, 2, True, True, False, 1, "AGR", [2]),
+    (16, 3, 2, True, True, False, 1, "AGR", [1, 2]),
+]
+
+
+def _reference(
+    from_gene_id: Optional[int] = None,
+    to_gene_id: Optional[int] = None,
+    from_species: Optional[int] = None,
+    to_species: Optional[int] = None,
+    algorithm_id: Optional[int] = None,
+    best: Optional[bool] = None,
+    revised: Optional[bool] = None,
+) -> List[int]:
+    """Get the ort_ids matching a query, the slow way."""
+    return sorted(
+        e[0]
+        for e in EDGES
+        if (not from_gene_id or e[1] == from_gene_id)
+        and (not to_gene_id or e[2] == to_gene_id)
+        and (from_species is None or GENE_SPECIES[e[1]] == from_species)
+        and (to_species is None or GENE_SPECIES[e[2]] == to_species)
+        and (algorithm_id is None or algorithm_id in (e[8] or ()))
+        and (best is None or e[3] == best)
+        and (revised is None or e[4] == revised)
+    )
+
+
+@pytest.fixture(scope="module")
+def graph() -> OrthologGraph:
+    """Build a graph, with the edges ordered as the database returns them."""
+    edges = sorted(EDGES, key=lambda e: (e[1], e[0]))
+    return OrthologGraph(GENE_SPECIES.items(), edges, [1, 2])
+
+
+QUERIES = [
+    dict(from_gene_id=gene, to_gene_id=to_gene, **filters)
+    for gene, to_gene, filters in itertools.product(
+        [1, 2, 3, 5, 6, 7, 99],
+        [None, 2, 4],
+        [
+            {},
+            {"best": True},
+            {"best": False, "revised": True},
+            {"algorithm_id": 1},
+            {"algorithm_id": 2, "to_species": 2},
+            {"algorithm_id": 3},
+            {"from_species": 1, "to_species": 2},
+        ],
+    )
+] + [
+    {"to_gene_id": gene, **filters}
+    for gene in [1, 2, 4, 99]
+    for filters in [{}, {"best": True}, {"from_species": 1}, {"algorithm_id": 1}]
+]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_graph_matches_reference(graph: OrthologGraph, query: dict):
+    """Test that the graph returns the same orthologs as filtering every row."""
+    assert [o.ort_id for o in graph.orthologs(**query)] == _reference(**query)
+
+
+def test_orthologs_carry_their_columns(graph: OrthologGraph):
+    """Test that results hold the same values as the database rows."""
+    (ortholog,) = graph.orthologs(from_gene_id=2)
+    assert ortholog.ort_id == 12
+    assert (ortholog.from_gene, ortholog.to_gene) == (2, 1)
+    assert ortholog.ort_is_best is True
+    assert ortholog.ort_is_best_revised is False
+    assert ortholog.ort_is_best_is_adjusted is True
+    assert ortholog.ort_num_possible_match_algorithms == 2
+    assert ortholog.ort_source_name == "AGR"
+
+
+def test_paging(graph: OrthologGraph):
+    """Test that offsets, limits and cursors page through the ort_id order."""
+    assert [o.ort_id for o in graph.orthologs(from_gene_id=1, limit=2)] == [3, 10]
+    assert [o.ort_id for o in graph.orthologs(from_gene_id=1, start=1)] == [10, 11]
+    page = graph.orthologs(to_gene_id=2, cursor=(10,), limit=1)
+    assert [o.ort_id for o in page] == [15]
+    with pytest.raises(InvalidCursorError):
+        graph.orthologs(from_gene_id=1, cursor=(1, 2))
+
+
+def test_get_orthologs_uses_loaded_graph(graph: OrthologGraph):
+    """Test that gene keyed queries of a version with a graph skip the database."""
+    db = Session(info={SCHEMA_VERSION_INFO_KEY: 42})
+    ortholog_graph._graphs[42] = graph
+    try:
+        result = orthologs.get_orthologs(db, from_gene_id=1, algorithm_id=2)
+    finally:
+        ortholog_graph.retain_graphs([])
+    assert [o.ort_id for o in result] == [10, 11]
+
+
+# Rows with NULL flags and counts, which no value of a filter on them matches.
+NULL_EDGES = [
+    (20, 1, 7, None, True, False, None, "GW", None),
+    (21, 1, 3, True, None, None, 2, "AGR", [1]),
+    (22, 2, 5, None, None, None, None, "GW", None),
+    (23, 7, 1, None, False, None, 1, "AGR", [2]),
+]
+
+
+def _populate(db: Session) -> None:
+    """Insert the genes and every edge, with and without NULL columns."""
+    db.add_all(
+        Species(sp_id=sp_id, sp_name=f"Species {sp_id}", sp_taxon_id=sp_id)
+        for sp_id in set(GENE_SPECIES.values())
+    )
+    db.add_all(Algorithm(alg_id=alg_id, alg_name=f"ALG{alg_id}") for alg_id in (1, 2))
+    # The tables have foreign keys but no relationships, so each is flushed in turn.
+    db.flush()
+    db.add_all(
+        Gene(gn_id=gn_id, gn_ref_id=f"MGI:{gn_id}", gn_prefix="MGI", sp_id=sp_id)
+        for gn_id, sp_id in GENE_SPECIES.items()
+    )
+    db.flush()
+    db.add_all(
+        Ortholog(
+            ort_id=e[0],
+            from_gene=e[1],
+            to_gene=e[2],
+            ort_is_best=e[3],
+            ort_is_best_revised=e[4],
+            ort_is_best_is_adjusted=e[5],
+            ort_num_possible_match_algorithms=e[6],
+            ort_source_name=e[7],
+        )
+        for e in EDGES + NULL_EDGES
+    )
+    db.flush()
+    db.add_all(
+        OrthologAlgorithms(ort_id=e[0], alg_id=alg_id)
+        for e in EDGES + NULL_EDGES
+        for alg_id in e[8] or ()
+    )
+    db.commit()
+
+
+def _sqlite_graph(db: Session) -> OrthologGraph:
+    """Build a graph of the database rows, with the algorithms grouped in Python.
+
+    SQLite has no `array_agg`, so `build_ortholog_graph` only runs on Postgres.
+    """
+    alg_ids = defaultdict(list)
+    for ort_id, alg_id in db.execute(
+        select(OrthologAlgorithms.ort_id, OrthologAlgorithms.alg_id)
+    ):
+        alg_ids[ort_id].append(alg_id)
+    edges = db.execute(
+        select(*ORTHOLOG_COLUMNS).order_by(Ortholog.from_gene, Ortholog.ort_id)
+    )
+    return OrthologGraph(
+        db.execute(select(Gene.gn_id, Gene.sp_id)),
+        (tuple(row) + (alg_ids.get(row[0]),) for row in edges),
+        db.execute(select(Algorithm.alg_id)).scalars().all(),
+    )
+
+
+@pytest.fixture(scope="module", params=["sqlite", "postgres"])
+def db_and_graph(
+    request: pytest.FixtureRequest,
+) -> Iterator[Tuple[Session, OrthologGraph]]:
+    """Get a session on the edges, and the graph built from them."""
+    if request.param == "sqlite":
+        engine = create_engine("sqlite://")
+        for model in (Species, Gene, Algorithm, Ortholog, OrthologAlgorithms):
+            model.__table__.create(engine)
+        with Session(engine) as session:
+            _populate(session)
+            yield session, _sqlite_graph(session)
+        return
+    if DB_URI is None:
+        pytest.skip("AON_TEST_DB_URI is not set, no database to compare with")
+    with migrated_schema(DB_URI, "test_ortholog_graph") as engine:
+        with Session(engine) as session:
+            _populate(session)
+            yield session, build_ortholog_graph(session)
+
+
+NULL_QUERIES = [
+    dict(from_gene_id=gene, to_gene_id=to_gene, **filters)
+    for gene, to_gene, filters in itertools.product(
+        [1, 2, 7],
+        [None, 1, 5, 7],
+        [
+            {},
+            {"best": True},
+            {"best": False},
+            {"revised": True},
+            {"revised": False},
+            {"best": False, "revised": False},
+            {"possible_match_algorithms": 1},
+            {"possible_match_algorithms": 2},
+            {"possible_match_algorithms": 0},
+            {"algorithm_id": 1, "best": True},
+            {"from_species": 1, "to_species": 3},
+        ],
+    )
+] + [
+    {"to_gene_id": gene, **filters}
+    for gene in [1, 3, 5, 7]
+    for filters in [{}, {"best": False}, {"revised": False}]
+]
+
+
+@pytest.mark.parametrize("query", NULL_QUERIES)
+def test_graph_matches_database(
+    db_and_graph: Tuple[Session, OrthologGraph], query: dict
+):
+    """Test that the graph returns the database rows, NULL columns included."""
+    db, graph = db_and_graph
+    assert graph.orthologs(**query) == orthologs.get_orthologs(db, **query)
+
+
+def test_null_columns_are_none(db_and_graph: Tuple[Session, OrthologGraph]):
+    """Test that NULL columns are not read back as false or zero."""
+    _, graph = db_and_graph
+    (ortholog,) = graph.orthologs(from_gene_id=2, to_gene_id=5)
+    assert ortholog.ort_is_best is None
+    assert ortholog.ort_is_best_revised is None
+    assert ortholog.ort_is_best_is_adjusted is None
+    assert ortholog.ort_num_possible_match_algorithms is None
+    assert graph.orthologs(from_gene_id=2, best=False) == []
@@ -0,0 +1,59 @@
+"""Test the keyset paging utilities."""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+from geneweaver.aon.dependencies import NEXT_CURSOR_HEADER, page_response
+from geneweaver.aon.models import Homology
+from geneweaver.aon.service.rows import HomologRow
+from geneweaver.aon.service.utils import (
+    InvalidCursorError,
+    apply_paging,
+    decode_cursor,
+    encode_cursor,
+    next_cursor,
+)
+from sqlalchemy.orm import Query
+
+
+def test_cursor_round_trip():
+    """Test that a cursor decodes to the key it was created from."""
+    assert decode_cursor(encode_cursor([12, 345])) == (12, 345)
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor!", "bnVsbA", "W10", 'WyJhIl0"'])
+def test_invalid_cursor(cursor: str):
+    """Test that malformed cursors are rejected."""
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+
+def test_next_cursor_only_for_full_pages():
+    """Test that the last, partial, page has no next cursor."""
+    page = [SimpleNamespace(hom_id=1, gn_id=i) for i in range(3)]
+    assert decode_cursor(next_cursor(page, ("hom_id", "gn_id"), 3)) == (1, 2)
+    assert next_cursor(page, ("hom_id", "gn_id"), 4) is None
+
+
+def test_cursor_must_match_keys():
+    """Test that a cursor for a different number of keys is rejected."""
+    with pytest.raises(InvalidCursorError):
+        apply_paging(
+            Query(Homology),
+            limit=10,
+            cursor=(1,),
+            keys=[Homology.hom_id, Homology.gn_id],
+        )
+
+
+def test_page_response():
+    """Test that a page of rows is serialized with its next cursor."""
+    rows = [HomologRow(1, 2, 3, "AGR"), HomologRow(1, 4, 5, "AGR")]
+    response = page_response(rows, ("hom_id", "gn_id"), 2)
+    assert json.loads(response.body) == [
+        {"hom_id": 1, "gn_id": 2, "sp_id": 3, "hom_source_name": "AGR"},
+        {"hom_id": 1, "gn_id": 4, "sp_id": 5, "hom_source_name": "AGR"},
+    ]
+    assert decode_cursor(response.headers[NEXT_CURSOR_HEADER]) == (1, 4)
+    assert NEXT_CURSOR_HEADER not in page_response(rows, ("hom_id",), 3).headers
@@ -0,0 +1,150 @@
+"""Test the response cache middleware."""
+
+import asyncio
+from types import SimpleNamespace
+from typing import List
+
+from geneweaver.aon.core.cache import (
+    CachedResponse,
+    ResponseCache,
+    ResponseCacheMiddleware,
+)
+from geneweaver.aon.core.schema_version import DefaultVersion
+from starlette.routing import Route, Router
+
+API_PREFIX = "/aon/api"
+
+ROUTER = Router(
+    [
+        Route(f"{API_PREFIX}{prefix}{path}", lambda _: None)
+        for prefix in ("", "/{version_id}")
+        for path in ("/genes", "/export/genes")
+    ]
+)
+
+# Version 3 is complete, 4 is still loading, and 5 was complete when the process
+# started but has since been deleted.
+REGISTRY = SimpleNamespace(
+    cached={
+        3: SimpleNamespace(load_complete=True),
+        4: SimpleNamespace(load_complete=False),
+    }.get
+)
+
+
+class CountingApp:
+    """An ASGI app that counts its calls and returns a fixed JSON body."""
+
+    def __init__(self: "CountingApp") -> None:
+        """Initialize the call count."""
+        self.calls = 0
+
+    async def __call__(
+        self: "CountingApp", scope, receive, send
+    ) -> None:  # noqa: ANN001
+        """Respond with a JSON body."""
+        self.calls += 1
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/json")],
+            }
+        )
+        await send({"type": "http.response.body", "body": b'[{"gn_id": 1}]'})
+
+
+def _request(
+    middleware: ResponseCacheMiddleware, path: str, headers: list = ()
+) -> List[dict]:
+    """Send a GET request through the middleware and collect the sent messages."""
+    messages = []
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b""}
+
+    async def send(message: dict) -> None:
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": b"limit=10&species_id=1",
+        "headers": list(headers),
+        "app": SimpleNamespace(
+            complete_version_ids={3, 5},
+            default_version=DefaultVersion(3, None),
+            version_registry=REGISTRY,
+            router=ROUTER,
+        ),
+    }
+    asyncio.run(middleware(scope, receive, send))
+    return messages
+
+
+def _middleware(app: CountingApp) -> ResponseCacheMiddleware:
+    """Wrap an app with the cache middleware."""
+    return ResponseCacheMiddleware(
+        app, ResponseCache(1024), API_PREFIX, code_version="1.0", max_age=60
+    )
+
+
+def test_lru_respects_byte_budget():
+    """Test that the least recently used responses are evicted to fit the budget."""
+    cache = ResponseCache(max_bytes=10)
+    cache.put("a", CachedResponse([], b"1234"))
+    cache.put("b", CachedResponse([], b"1234"))
+    cache.get("a")
+    cache.put("c", CachedResponse([], b"1234"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.size == 8
+
+
+def test_versioned_response_is_cached_and_revalidated():
+    """Test that repeats are served from the cache, and a matching ETag gets a 304."""
+    app = CountingApp()
+    middleware = _middleware(app)
+
+    first = _request(middleware, f"{API_PREFIX}/3/genes")
+    second = _request(middleware, f"{API_PREFIX}/3/genes")
+    headers = dict(first[0]["headers"])
+
+    assert app.calls == 1
+    assert second[1]["body"] == first[1]["body"]
+    assert b"immutable" in headers[b"cache-control"]
+
+    revalidated = _request(
+        middleware, f"{API_PREFIX}/3/genes", [(b"if-none-match", headers[b"etag"])]
+    )
+    assert revalidated[0]["status"] == 304
+    assert app.calls == 1
+
+
+def test_incomplete_versions_and_exports_are_not_cached():
+    """Test that versions still loading, and export routes, bypass the cache."""
+    app = CountingApp()
+    middleware = _middleware(app)
+
+    for path in (f"{API_PREFIX}/4/genes", f"{API_PREFIX}/3/export/genes"):
+        _request(middleware, path)
+        messages = _request(middleware, path)
+        assert b"etag" not in dict(messages[0]["headers"])
+
+    assert app.calls == 4
+
+
+def test_only_known_versions_and_routes_are_revalidated():
+    """Test that deleted versions and unknown paths reach the app, not a 304."""
+    app = CountingApp()
+    middleware = _middleware(app)
+
+    for path in (f"{API_PREFIX}/5/genes", f"{API_PREFIX}/3/missing"):
+        messages = _request(middleware, path, [(b"if-none-match", b"*")])
+        assert messages[0]["status"] == 200
+        assert b"etag" not in dict(messages[0]["headers"])
+
+    assert app.calls == 2
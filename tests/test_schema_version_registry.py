@@ -0,0 +1,129 @@
+"""Test the in-memory schema version registry."""
+
+from typing import List
+
+import pytest
+from geneweaver.aon.core.schema_version import SchemaVersionRegistry
+from geneweaver.aon.models import Version
+from sqlalchemy.exc import OperationalError
+
+
+class FakeLoader:
+    """Stands in for the database, counting the queries made."""
+
+    def __init__(self: "FakeLoader", versions: List[Version]) -> None:
+        """Serve the given versions."""
+        self.versions = versions
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self: "FakeLoader") -> List[Version]:
+        """Load every version."""
+        self.calls += 1
+        if self.fail:
+            raise OperationalError("SELECT", {}, Exception("down"))
+        return list(self.versions)
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self: "FakeClock") -> None:
+        """Start at zero."""
+        self.now = 0.0
+
+    def __call__(self: "FakeClock") -> float:
+        """Get the current time."""
+        return self.now
+
+
+def _version(version_id: int, load_complete: bool = True) -> Version:
+    return Version(
+        id=version_id,
+        schema_name=f"agr_{version_id}",
+        agr_version="7.0.0",
+        load_complete=load_complete,
+    )
+
+
+@pytest.fixture()
+def loader() -> FakeLoader:
+    """Serve two complete versions and one still loading."""
+    return FakeLoader([_version(1), _version(2), _version(3, load_complete=False)])
+
+
+@pytest.fixture()
+def clock() -> FakeClock:
+    """Get a controllable clock."""
+    return FakeClock()
+
+
+@pytest.fixture()
+def registry(loader: FakeLoader, clock: FakeClock) -> SchemaVersionRegistry:
+    """Get a loaded registry."""
+    registry = SchemaVersionRegistry(
+        ttl=60, negative_ttl=10, loader=loader, clock=clock
+    )
+    registry.refresh()
+    return registry
+
+
+def test_known_versions_are_served_from_memory(
+    registry: SchemaVersionRegistry, loader: FakeLoader
+):
+    """Test that lookups of known versions do not query the database."""
+    assert registry.get(1).schema_name == "agr_1"
+    assert registry.get(3).load_complete is False
+    assert [v.id for v in registry.complete_versions()] == [2, 1]
+    assert registry.latest_complete().id == 2
+    assert loader.calls == 1
+
+
+def test_unknown_versions_are_rechecked_at_most_once_per_negative_ttl(
+    registry: SchemaVersionRegistry, loader: FakeLoader, clock: FakeClock
+):
+    """Test that a flood of bogus version ids reaches the database once."""
+    clock.now = 5
+    for version_id in range(100, 200):
+        assert registry.get(version_id) is None
+    assert loader.calls == 1
+
+    clock.now = 11
+    loader.versions.append(_version(4))
+    assert registry.get(4).id == 4
+    assert registry.get(999) is None
+    assert loader.calls == 2
+
+
+def test_versions_are_reloaded_after_the_ttl(
+    registry: SchemaVersionRegistry, loader: FakeLoader, clock: FakeClock
+):
+    """Test that changes are picked up once the map is older than the ttl."""
+    loader.versions[2] = _version(3)
+    clock.now = 59
+    assert registry.latest_complete().id == 2
+
+    clock.now = 61
+    assert registry.latest_complete().id == 3
+    assert loader.calls == 2
+
+
+def test_stale_versions_are_served_when_reload_fails(
+    registry: SchemaVersionRegistry, loader: FakeLoader, clock: FakeClock
+):
+    """Test that a database outage does not empty the registry."""
+    loader.fail = True
+    clock.now = 61
+    assert registry.get(1).id == 1
+    assert registry.get(2).id == 2
+    assert loader.calls == 2
+
+
+def test_first_load_failure_is_raised(loader: FakeLoader, clock: FakeClock):
+    """Test that there is nothing stale to serve before the first load."""
+    loader.fail = True
+    registry = SchemaVersionRegistry(
+        ttl=60, negative_ttl=10, loader=loader, clock=clock
+    )
+    with pytest.raises(OperationalError):
+        registry.get(1)
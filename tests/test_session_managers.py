@@ -0,0 +1,120 @@
+"""Test the lazily populated per-version session manager cache."""
+
+from typing import List, Optional, Tuple
+
+import pytest
+from geneweaver.aon.core.schema_version import SessionManagerCache
+from geneweaver.aon.models import Version
+
+
+class FakeFactory:
+    """Creates placeholder session managers, recording the versions asked for."""
+
+    def __init__(self: "FakeFactory") -> None:
+        """Start with no calls."""
+        self.created: List[Optional[int]] = []
+
+    def __call__(
+        self: "FakeFactory", version: Optional[Version]
+    ) -> Tuple[object, Tuple[None, None]]:
+        """Create a session manager."""
+        self.created.append(None if version is None else version.id)
+        return object(), (None, None)
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self: "FakeClock") -> None:
+        """Start at zero."""
+        self.now = 0.0
+
+    def __call__(self: "FakeClock") -> float:
+        """Get the current time."""
+        return self.now
+
+
+def _version(version_id: int) -> Version:
+    return Version(id=version_id, schema_name=f"agr_{version_id}")
+
+
+@pytest.fixture()
+def factory() -> FakeFactory:
+    """Get a recording session manager factory."""
+    return FakeFactory()
+
+
+@pytest.fixture()
+def clock() -> FakeClock:
+    """Get a controllable clock."""
+    return FakeClock()
+
+
+@pytest.fixture()
+def cache(factory: FakeFactory, clock: FakeClock) -> SessionManagerCache:
+    """Get a cache of two versions, evicting after an hour idle."""
+    return SessionManagerCache(
+        max_size=2, idle_seconds=3600, factory=factory, clock=clock
+    )
+
+
+def test_session_managers_are_created_once(
+    cache: SessionManagerCache, factory: FakeFactory
+):
+    """Test that a version's session manager is created lazily and reused."""
+    assert factory.created == []
+    first = cache.get(_version(1))
+    assert cache.get(_version(1)) is first
+    assert factory.created == [1]
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 1,
+        "evictions": 0,
+        "size": 1,
+        "max_size": 2,
+    }
+
+
+def test_least_recently_used_version_is_evicted(
+    cache: SessionManagerCache, factory: FakeFactory
+):
+    """Test that the cache is bounded, evicting the least recently used version."""
+    cache.get(_version(1))
+    cache.get(_version(2))
+    cache.get(_version(1))
+    cache.get(_version(3))
+    assert 2 not in cache
+    assert 1 in cache
+    assert cache.evictions == 1
+
+    cache.get(_version(2))
+    assert factory.created == [1, 2, 3, 2]
+
+
+def test_idle_versions_are_evicted(cache: SessionManagerCache, clock: FakeClock):
+    """Test that versions unused for longer than the idle time are evicted."""
+    cache.get(_version(1))
+    clock.now = 3000
+    cache.get(_version(2))
+    clock.now = 3600
+    cache.get(_version(2))
+    assert 1 not in cache
+    assert 2 in cache
+
+
+def test_pinned_version_is_never_evicted(
+    cache: SessionManagerCache, factory: FakeFactory, clock: FakeClock
+):
+    """Test that the pinned default version is pre-warmed and kept."""
+    default = cache.pin(_version(1))
+    assert factory.created == [1]
+    for version_id in range(2, 6):
+        cache.get(_version(version_id))
+    clock.now = 10000
+    cache.get(_version(6))
+    assert cache.get(_version(1)) is default
+    assert factory.created == [1, 2, 3, 4, 5, 6]
+
+    cache.pin(_version(6))
+    assert 1 in cache
+    assert len(cache) == 2
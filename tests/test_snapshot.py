@@ -0,0 +1,95 @@
+"""Test writing and memory mapping snapshot files."""
+
+from array import array
+from pathlib import Path
+
+import pytest
+from geneweaver.aon.embedded.snapshot import (
+    Snapshot,
+    SnapshotError,
+    string_sections,
+    write_snapshot,
+)
+from geneweaver.aon.service import ortholog_graph
+from geneweaver.aon.service import snapshot as snapshot_module
+from geneweaver.aon.service.ortholog_graph import OrthologGraph
+
+from tests.test_ortholog_graph import EDGES, GENE_SPECIES, QUERIES
+
+
+@pytest.fixture()
+def graph() -> OrthologGraph:
+    """Build a graph in memory."""
+    edges = sorted(EDGES, key=lambda e: (e[1], e[0]))
+    return OrthologGraph(GENE_SPECIES.items(), edges, [1, 2])
+
+
+@pytest.fixture()
+def path(tmp_path: Path, graph: OrthologGraph) -> Path:
+    """Write the graph, and a few other sections, to a snapshot file."""
+    sections = graph.sections()
+    sections.update(string_sections("ortholog_source_names", graph.source_names))
+    sections.update(string_sections("species_names", ["Mus musculus", "", "Danio"]))
+    sections["empty"] = array("Q")
+    path = tmp_path / "agr_7.gwaon"
+    write_snapshot(path, 7, sections)
+    return path
+
+
+def test_sections_round_trip(path: Path, graph: OrthologGraph):
+    """Test that sections are read back unchanged."""
+    snapshot = Snapshot(path)
+    assert snapshot.version_id == 7
+    assert list(snapshot["ortholog_ids"]) == list(graph.ort_ids)
+    assert list(snapshot["ortholog_algorithms"]) == list(graph.algorithms)
+    assert snapshot["ortholog_flags"].format == "B"
+    assert list(snapshot.strings("species_names")) == ["Mus musculus", "", "Danio"]
+    assert len(snapshot["empty"]) == 0
+    assert "missing" not in snapshot
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_mapped_graph_matches_built_graph(
+    path: Path, graph: OrthologGraph, query: dict
+):
+    """Test that a graph read from a snapshot answers as the one it was saved from."""
+    mapped = OrthologGraph.from_snapshot(Snapshot(path))
+    expected = [(o.ort_id, o.ort_source_name) for o in graph.orthologs(**query)]
+    assert [(o.ort_id, o.ort_source_name) for o in mapped.orthologs(**query)] == (
+        expected
+    )
+
+
+def test_corrupt_snapshot_is_rejected(path: Path):
+    """Test that a changed byte fails the checksum."""
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    with pytest.raises(SnapshotError, match="checksum"):
+        Snapshot(path)
+    assert Snapshot(path, verify=False).version_id == 7
+
+
+def test_other_format_version_is_rejected(path: Path):
+    """Test that snapshots of another format version are not read."""
+    data = bytearray(path.read_bytes())
+    data[8] += 1
+    path.write_bytes(bytes(data))
+    with pytest.raises(SnapshotError, match="format version"):
+        Snapshot(path)
+
+
+def test_load_graph_uses_snapshot_of_its_version(path: Path):
+    """Test that a snapshot is only used for the version it was written for."""
+    try:
+        assert snapshot_module.load_graph(7, _failing_session_manager, path)
+        assert 7 in ortholog_graph._graphs
+        # Falls back to the database, which fails here.
+        assert not snapshot_module.load_graph(8, _failing_session_manager, path)
+        assert 8 not in ortholog_graph._graphs
+    finally:
+        ortholog_graph.retain_graphs([])
+
+
+def _failing_session_manager() -> None:
+    raise RuntimeError("No database.")
@@ -0,0 +1,35 @@
+"""Test the TemporalIO activities, outside of a worker."""
+
+import asyncio
+import threading
+from typing import List, Tuple
+
+import pytest
+from geneweaver.aon.temporal.activities import download_source
+from temporalio.testing import ActivityEnvironment
+
+
+def test_get_data_heartbeats_until_downloaded(monkeypatch: pytest.MonkeyPatch):
+    """Test that the download heartbeats while it runs, and returns its result."""
+    heartbeats: List[tuple] = []
+    finished = threading.Event()
+
+    def get_data(release: str) -> Tuple[str, str, str]:
+        # Block until a few heartbeats were sent, as a long download would.
+        finished.wait(timeout=10)
+        return "/cache/orthology.tsv.gz", release, "h1"
+
+    def on_heartbeat(*details) -> None:  # noqa: ANN002
+        heartbeats.append(details)
+        if len(heartbeats) == 3:
+            finished.set()
+
+    monkeypatch.setattr(download_source, "get_data", get_data)
+    monkeypatch.setattr(download_source, "HEARTBEAT_INTERVAL", 0.01)
+    env = ActivityEnvironment()
+    env.on_heartbeat = on_heartbeat
+
+    result = asyncio.run(env.run(download_source.get_data_activity, "7.0.0"))
+
+    assert result == ("/cache/orthology.tsv.gz", "7.0.0", "h1")
+    assert len(heartbeats) >= 3
@@ -0,0 +1,45 @@
+"""Test upgrading tenant schemas loaded before the latest tenant migrations.
+
+These tests need a Postgres database, and are skipped unless `AON_TEST_DB_URI` is
+set, see `tests.test_query_plans`.
+"""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+from geneweaver.aon.cli import setup
+from sqlalchemy import text
+
+from tests.tenant import migrated_schema
+from tests.test_query_plans import _read_path_indexes
+
+DB_URI = os.environ.get("AON_TEST_DB_URI")
+SCHEMA_NAME = "test_tenant_schemas"
+
+pytestmark = pytest.mark.skipif(
+    DB_URI is None, reason="AON_TEST_DB_URI is not set, no database to migrate"
+)
+
+
+def test_read_path_indexes_are_backfilled(monkeypatch: pytest.MonkeyPatch):
+    """Test that a tenant loaded before the read path indexes gets them."""
+    monkeypatch.setattr(setup.config, "DB", SimpleNamespace(URI=DB_URI))
+    index_names = text("SELECT indexname FROM pg_indexes WHERE schemaname = :schema")
+
+    with migrated_schema(DB_URI, SCHEMA_NAME, "666568a64356") as engine:
+        with engine.connect() as conn:
+            before = set(conn.execute(index_names, {"schema": SCHEMA_NAME}).scalars())
+
+        assert setup.tenant_schemas([SCHEMA_NAME]) == [SCHEMA_NAME]
+
+        with engine.connect() as conn:
+            after = set(conn.execute(index_names, {"schema": SCHEMA_NAME}).scalars())
+            revisions = conn.execute(
+                text(f'SELECT version_num FROM "{SCHEMA_NAME}".alembic_version')
+            ).scalars()
+            assert "e3b7a915c2d4" in set(revisions)
+
+    read_path = {name for _, name, _ in _read_path_indexes()}
+    assert not read_path & before
+    assert read_path <= after
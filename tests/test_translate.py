@@ -0,0 +1,138 @@
+"""Test the translation of gene sets to their orthologs.
+
+The translation tests need a Postgres database, and are skipped unless
+`AON_TEST_DB_URI` is set, see `tests.test_query_plans`.
+"""
+
+import os
+from typing import Iterator, Optional
+
+import pytest
+from fastapi import FastAPI
+from geneweaver.aon import dependencies as deps
+from geneweaver.aon.controller import orthologs
+from geneweaver.aon.core.config import config
+from geneweaver.aon.schemas import GeneTranslationRequest
+from pydantic import ValidationError
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from tests.asgi import request
+from tests.tenant import tenant
+
+DB_URI = os.environ.get("AON_TEST_DB_URI")
+SCHEMA_NAME = "test_translate"
+
+requires_db = pytest.mark.skipif(
+    DB_URI is None, reason="AON_TEST_DB_URI is not set, no database to translate in"
+)
+
+
+def _app(engine: Optional[Engine] = None) -> FastAPI:
+    """Get an application serving the orthologs routes from an engine."""
+    app = FastAPI()
+    app.include_router(orthologs.router)
+
+    def session() -> Iterator[Session]:
+        with Session(engine) as db:
+            yield db
+
+    app.dependency_overrides[deps.session] = session if engine else lambda: None
+    return app
+
+
+@pytest.fixture(scope="module")
+def engine() -> Iterator[Engine]:
+    """Create and populate a temporary tenant schema."""
+    with tenant(DB_URI, SCHEMA_NAME) as engine:
+        yield engine
+
+
+def test_ref_ids_are_capped():
+    """Test that a request can ask for at most TRANSLATE_MAX_REF_IDS genes."""
+    cap = config.TRANSLATE_MAX_REF_IDS
+    assert len(GeneTranslationRequest(ref_ids=["MGI:1"] * cap).ref_ids) == cap
+    with pytest.raises(ValidationError):
+        GeneTranslationRequest(ref_ids=["MGI:1"] * (cap + 1))
+
+
+def test_translate_over_the_cap_is_rejected():
+    """Test that the endpoint answers 422, before the service is called."""
+    response = request(
+        _app(),
+        "POST",
+        "/orthologs/translate",
+        json={"ref_ids": ["MGI:1"] * (config.TRANSLATE_MAX_REF_IDS + 1)},
+    )
+    assert response.status_code == 422
+
+
+@requires_db
+def test_translate_aon_ref_ids(engine: Engine):
+    """Test that AON reference ids are translated to their orthologs, in order."""
+    response = request(
+        _app(engine),
+        "POST",
+        "/orthologs/translate",
+        json={"ref_ids": ["MGI:2", "MGI:1", "MGI:404"], "algorithm_id": None},
+    )
+    assert response.status_code == 200
+    assert response.json() == [
+        {
+            "ref_id": "MGI:2",
+            "gene": {"gn_id": 3, "gn_ref_id": "MGI:2", "sp_id": 1},
+            "orthologs": [
+                {
+                    "ort_id": 2,
+                    "ref_id": "HGNC:2",
+                    "gn_id": 4,
+                    "gn_ref_id": "HGNC:2",
+                    "sp_id": 2,
+                    "ort_is_best": False,
+                    "ort_is_best_revised": True,
+                }
+            ],
+        },
+        {
+            "ref_id": "MGI:1",
+            "gene": {"gn_id": 1, "gn_ref_id": "MGI:1", "sp_id": 1},
+            "orthologs": [
+                {
+                    "ort_id": 1,
+                    "ref_id": "HGNC:1",
+                    "gn_id": 2,
+                    "gn_ref_id": "HGNC:1",
+                    "sp_id": 2,
+                    "ort_is_best": True,
+                    "ort_is_best_revised": True,
+                }
+            ],
+        },
+        {"ref_id": "MGI:404", "gene": None, "orthologs": []},
+    ]
+
+    # The default algorithm only found the first ortholog.
+    response = request(
+        _app(engine), "POST", "/orthologs/translate", json={"ref_ids": ["MGI:2"]}
+    )
+    assert response.json()[0]["orthologs"] == []
+
+
+@requires_db
+def test_translate_geneweaver_ref_ids(engine: Engine):
+    """Test that Geneweaver reference ids are converted both ways."""
+    response = request(
+        _app(engine),
+        "POST",
+        "/orthologs/translate",
+        json={"ref_ids": ["RGD5", "MGI:1"], "ref_id_type": "gw", "to_species": 2},
+    )
+    assert response.status_code == 200
+    translations = response.json()
+    assert [t["ref_id"] for t in translations] == ["RGD5", "MGI:1"]
+    assert translations[0]["gene"] == {"gn_id": 5, "gn_ref_id": "RGD:5", "sp_id": 1}
+    assert [(o["ref_id"], o["gn_ref_id"]) for o in translations[0]["orthologs"]] == [
+        ("ZDB-GENE-6", "ZFIN:ZDB-GENE-6")
+    ]
+    # A reference without a Geneweaver gene is looked up as is.
+    assert [o["ref_id"] for o in translations[1]["orthologs"]] == ["HGNC:1"]
@@ -0,0 +1,156 @@
+"""Test the registration of versions completed while the API is running."""
+
+import asyncio
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+from geneweaver.aon.core.schema_version import (
+    DefaultVersion,
+    SchemaVersionRegistry,
+    SessionManagerCache,
+    request_default_version,
+)
+from geneweaver.aon.dependencies import register_new_versions
+from geneweaver.aon.models import Version
+
+
+class FakeSession:
+    """A session that records the queries run on it."""
+
+    def __init__(self: "FakeSession", queries: List[int]) -> None:
+        """Record queries into a shared list."""
+        self.queries = queries
+
+    def __enter__(self: "FakeSession") -> "FakeSession":
+        """Open the session."""
+        return self
+
+    def __exit__(self: "FakeSession", *args) -> None:  # noqa: ANN002
+        """Close the session."""
+
+    def execute(self: "FakeSession", statement: object) -> "FakeSession":
+        """Run a query."""
+        self.queries.append(statement)
+        return self
+
+    def all(self: "FakeSession") -> list:
+        """Fetch the rows."""
+        return []
+
+
+class FakeSessionManager:
+    """Creates fake sessions for one version."""
+
+    def __init__(self: "FakeSessionManager", version_id: int) -> None:
+        """Create sessions for a version."""
+        self.version_id = version_id
+        self.queries: List[object] = []
+
+    def __call__(self: "FakeSessionManager") -> FakeSession:
+        """Open a session."""
+        return FakeSession(self.queries)
+
+
+class FakeAsyncSession(FakeSession):
+    """An async session that records the queries run on it."""
+
+    async def __aenter__(self: "FakeAsyncSession") -> "FakeAsyncSession":
+        """Open the session."""
+        return self
+
+    async def __aexit__(self: "FakeAsyncSession", *args) -> None:  # noqa: ANN002
+        """Close the session."""
+
+    async def execute(
+        self: "FakeAsyncSession", statement: object
+    ) -> "FakeAsyncSession":
+        """Run a query."""
+        self.queries.append(statement)
+        return self
+
+
+class FakeAsyncSessionManager(FakeSessionManager):
+    """Creates fake async sessions for one version."""
+
+    def __call__(self: "FakeAsyncSessionManager") -> FakeAsyncSession:
+        """Open a session."""
+        return FakeAsyncSession(self.queries)
+
+
+def _version(version_id: int, load_complete: bool = True) -> Version:
+    return Version(
+        id=version_id, schema_name=f"agr_{version_id}", load_complete=load_complete
+    )
+
+
+@pytest.fixture()
+def versions() -> List[Version]:
+    """Get one complete version, and one still loading."""
+    return [_version(1), _version(2, load_complete=False)]
+
+
+@pytest.fixture()
+def app(versions: List[Version]) -> SimpleNamespace:
+    """Get an application started while only version 1 was complete."""
+    session_managers = SessionManagerCache(
+        max_size=4,
+        idle_seconds=3600,
+        factory=lambda v: (FakeSessionManager(v.id), (None, None)),
+    )
+    return SimpleNamespace(
+        version_registry=SchemaVersionRegistry(
+            ttl=60, negative_ttl=10, loader=lambda: list(versions)
+        ),
+        session_managers=session_managers,
+        async_session_managers=None,
+        complete_version_ids={1},
+        default_version=DefaultVersion(1, session_managers.pin(_version(1))),
+    )
+
+
+def test_nothing_changes_without_new_versions(app: SimpleNamespace):
+    """Test that a check without newly completed versions is a no-op."""
+    default_version = app.default_version
+    assert register_new_versions(app) == []
+    assert app.default_version is default_version
+    assert app.complete_version_ids == {1}
+
+
+def test_new_version_is_warmed_before_becoming_default(
+    app: SimpleNamespace, versions: List[Version]
+):
+    """Test that a completed version is warmed up, then made the default."""
+    in_flight = {"app": app}
+    assert request_default_version(in_flight).version_id == 1
+
+    versions[1] = _version(2)
+    assert register_new_versions(app) == [2]
+
+    assert app.complete_version_ids == {1, 2}
+    assert app.default_version.version_id == 2
+    assert app.default_version.session.version_id == 2
+    assert app.default_version.session.queries
+    # A request that started before the switch keeps its version.
+    assert request_default_version(in_flight).version_id == 1
+    assert request_default_version({"app": app}).version_id == 2
+
+
+def test_new_default_async_session_is_warmed_on_the_app_loop(
+    app: SimpleNamespace, versions: List[Version]
+):
+    """Test that the new default's async session manager is warmed on the loop."""
+    app.async_session_managers = SessionManagerCache(
+        max_size=4,
+        idle_seconds=3600,
+        factory=lambda v: (FakeAsyncSessionManager(v.id), (None, None)),
+    )
+    versions[1] = _version(2)
+
+    async def watch() -> List[int]:
+        loop = asyncio.get_running_loop()
+        return await asyncio.to_thread(register_new_versions, app, loop)
+
+    assert asyncio.run(watch()) == [2]
+    assert app.default_version.async_session.version_id == 2
+    assert app.default_version.async_session.queries